@@ -0,0 +1,90 @@
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from formation_assignment import OBJECTIVES, assign_slots, bottleneck_assignment, linear_sum_assignment
+
+SWARM_SIZES = [10, 100, 500]
+SPACING = 10  # meters between grid slots
+REPEATS = 5
+CHECK_CASES = 600  # random small cost matrices compared with an exhaustive search
+CHECK_SIZE = 6    # largest side of these matrices
+
+
+def grid_slots(num_drones, altitude=20):
+    side = int(np.ceil(np.sqrt(num_drones)))
+    index = np.arange(num_drones)
+    return np.column_stack((SPACING * (index % side), SPACING * (index // side), np.full(num_drones, altitude)))
+
+
+def brute_force(cost):
+    """Minimum total cost, minimum largest cost, and minimum total among the assignments reaching it."""
+    small = cost if cost.shape[0] <= cost.shape[1] else cost.T
+    rows = np.arange(small.shape[0])
+    values = np.array([small[rows, cols] for cols in itertools.permutations(range(small.shape[1]), len(rows))])
+    totals, largest = values.sum(axis=1), values.max(axis=1)
+    bottleneck = largest.min()
+    return totals.min(), bottleneck, totals[np.isclose(largest, bottleneck)].min()
+
+
+def is_assignment(rows, cols, shape):
+    """min(n, m) pairs, sorted by row, no row or column used twice."""
+    size = min(shape)
+    return (len(rows) == len(cols) == size and len(set(rows.tolist())) == len(set(cols.tolist())) == size
+            and np.all(np.diff(rows) > 0))
+
+
+def check_against_brute_force(rng):
+    """Compare both solvers with an exhaustive search on small matrices, square or not, with and without ties."""
+    mismatches = []
+    for case in range(CHECK_CASES):
+        shape = tuple(rng.integers(1, CHECK_SIZE + 1, 2))
+        if case % 3 == 0:
+            cost = rng.integers(0, 4, shape).astype(np.float64)  # many ties
+        elif case % 3 == 1:
+            cost = rng.uniform(0, 100, shape)
+        else:
+            cost = rng.uniform(-50, 50, shape)
+        total, bottleneck, total_at_bottleneck = brute_force(cost)
+        rows, cols = linear_sum_assignment(cost)
+        if not is_assignment(rows, cols, shape) or not np.isclose(cost[rows, cols].sum(), total):
+            mismatches.append(('linear_sum_assignment', cost))
+        rows, cols, value = bottleneck_assignment(cost)
+        if (not is_assignment(rows, cols, shape) or not np.isclose(value, bottleneck)
+                or not np.isclose(cost[rows, cols].max(), bottleneck)
+                or not np.isclose(cost[rows, cols].sum(), total_at_bottleneck)):
+            mismatches.append(('bottleneck_assignment', cost))
+    print(f"brute-force check: {CHECK_CASES} random matrices up to {CHECK_SIZE}x{CHECK_SIZE}, "
+          f"{len(mismatches)} mismatches")
+    if mismatches:
+        solver, cost = mismatches[0]
+        raise SystemExit(f"{solver} is not optimal for\n{cost}")
+
+
+def run_benchmark():
+    rng = np.random.default_rng(0)
+    check_against_brute_force(rng)
+    for num_drones in SWARM_SIZES:
+        slots = grid_slots(num_drones)
+        extent = SPACING * np.sqrt(num_drones)
+        # drones scattered over the formation area after the previous maneuver
+        positions = np.column_stack((rng.uniform(0, extent, (num_drones, 2)), rng.uniform(15, 25, num_drones)))
+        print(f"{num_drones} drones:")
+        for objective in OBJECTIVES:
+            timings = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                assignment = assign_slots(positions, slots, objective)
+                timings.append(time.perf_counter() - start)
+            distance = np.linalg.norm(positions - slots[assignment], axis=1)
+            print(f"  {objective:>12}: {min(timings) * 1e3:8.2f} ms, total distance {distance.sum():9.1f} m, "
+                  f"longest {distance.max():6.1f} m")
+
+
+if __name__ == '__main__':
+    run_benchmark()
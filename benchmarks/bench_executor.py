@@ -0,0 +1,37 @@
+import asyncio
+import logging
+import os
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config
+from multidrone_control import DroneSwarm
+from swarm_executor import SwarmExecutor
+from swarm_logging import setup_logging
+
+NUM_DRONES = 300
+MAX_IN_FLIGHT = [8, 32, 128, None]
+
+
+async def fan_out(max_in_flight):
+    config = read_config()
+    config['NUM_DRONES'] = NUM_DRONES
+    swarm = DroneSwarm(config, backend='fake')
+    await swarm.connect_swarm()
+    swarm.executor = SwarmExecutor(max_in_flight=max_in_flight, timeout=30)
+    takeoff = await swarm.takeoff_swarm()
+    goto = await swarm.run_goto_local([(10 * (i % 25), 10 * (i // 25), 20) for i in range(NUM_DRONES)])
+    return takeoff, goto
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    setup_logging(level=logging.WARNING)
+    for max_in_flight in MAX_IN_FLIGHT:
+        for report in asyncio.run(fan_out(max_in_flight)):
+            print(report)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config
+from multidrone_control import DroneSwarm
+from swarm_logging import setup_logging
+
+SWARM_SIZES = [10, 100, 500]
+
+
+async def fly_fake_swarm(num_drones):
+    config = read_config()
+    config['NUM_DRONES'] = num_drones
+    config['Fake_backend'] = dict(config['Fake_backend'], max_speed_m_s=20.0, climb_rate_m_s=10.0)
+    swarm = DroneSwarm(config, backend='fake')
+
+    timings = {}
+    start = time.perf_counter()
+    await swarm.connect_swarm()
+    timings['connect'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await swarm.takeoff_swarm()
+    timings['takeoff'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await swarm.run_goto_local([(10 * (i % 25), 10 * (i // 25), 20) for i in range(num_drones)])
+    timings['goto'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await swarm.return_swarm_to_launch()
+    timings['rtl+landed'] = time.perf_counter() - start
+    return timings
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    setup_logging(level=logging.WARNING)
+    for num_drones in SWARM_SIZES:
+        timings = asyncio.run(fly_fake_swarm(num_drones))
+        summary = ', '.join(f"{name} {seconds:.2f} s" for name, seconds in timings.items())
+        print(f"{num_drones:>5} drones: {summary}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
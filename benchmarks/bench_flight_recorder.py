@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from flight_recorder import FlightRecorder, FlightLog
+
+NUM_DRONES = 200
+RATE_HZ = 50
+DURATION_S = 60  # simulated flight time
+
+
+def run_benchmark():
+    samples = NUM_DRONES * RATE_HZ * DURATION_S
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flight.bin')
+        recorder = FlightRecorder(path)
+        t0 = time.monotonic()
+        start = time.perf_counter()
+        for tick in range(RATE_HZ * DURATION_S):
+            t = t0 + tick / RATE_HZ
+            for drone_id in range(NUM_DRONES):
+                recorder.record(drone_id, 'position', 47.39, 8.54, 500.0, 10.0, t=t)
+        elapsed = time.perf_counter() - start
+        recorder.close()
+        required = NUM_DRONES * RATE_HZ
+        print(f"write: {samples:,} records in {elapsed:.2f} s -> {samples / elapsed:,.0f} records/s "
+              f"({samples / elapsed / required:.0f}x the {required:,} records/s of {NUM_DRONES} drones at {RATE_HZ} Hz)")
+        print(f"file size: {os.path.getsize(path) / 1e6:.1f} MB")
+
+        log = FlightLog(path)
+        start = time.perf_counter()
+        window = log.read(t0 + 30, t0 + 31)
+        print(f"read 1 s of all drones: {len(window):,} records in {(time.perf_counter() - start) * 1e3:.2f} ms")
+        start = time.perf_counter()
+        one = log.read_kind('position', t0 + 10, t0 + 20, drone_ids=[7])
+        print(f"read 10 s of one drone: {len(one['t']):,} records in {(time.perf_counter() - start) * 1e3:.2f} ms")
+        assert np.all(one['drone_id'] == 7)
+        del log, window, one
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from multidrone_control import global_to_local, local_to_global
+from multidrone_control import global_to_local_batch, local_to_global_batch
+from local_frame import LocalFrame
+
+ORIGIN = (47.397606, 8.543060, 488.0)
+SIZES = [10, 1_000, 1_000_000]
+SCALAR_LIMIT = 10_000  # the scalar loop is too slow to be worth timing above this
+ERROR_EXTENTS = [100, 1_000, 10_000, 50_000]
+
+
+def _time(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark():
+    rng = np.random.default_rng(0)
+    print(f"{'points':>10} {'mode':>8} {'g2l pts/s':>14} {'l2g pts/s':>14}")
+    for n in SIZES:
+        local = rng.uniform(-500, 500, size=(n, 3))
+        glob = local_to_global_batch(local, *ORIGIN)
+
+        t_g2l = _time(lambda: global_to_local_batch(glob, *ORIGIN))
+        t_l2g = _time(lambda: local_to_global_batch(local, *ORIGIN))
+        print(f"{n:>10} {'batch':>8} {n / t_g2l:>14,.0f} {n / t_l2g:>14,.0f}")
+
+        if n <= SCALAR_LIMIT:
+            rows_g = glob.tolist()
+            rows_l = local.tolist()
+            t_g2l = _time(lambda: [global_to_local(*row, *ORIGIN) for row in rows_g])
+            t_l2g = _time(lambda: [local_to_global(*row, *ORIGIN) for row in rows_l])
+            print(f"{n:>10} {'scalar':>8} {n / t_g2l:>14,.0f} {n / t_l2g:>14,.0f}")
+
+        frame = LocalFrame(*ORIGIN, mode='ecef')
+        t_g2l = _time(lambda: frame.to_local(glob))
+        t_l2g = _time(lambda: frame.to_global(local))
+        print(f"{n:>10} {'ecef':>8} {n / t_g2l:>14,.0f} {n / t_l2g:>14,.0f}")
+
+
+def report_frame_error():
+    frame = LocalFrame(*ORIGIN)
+    print(f"\n{'extent m':>10} {'max horiz m':>12} {'mean horiz m':>13} {'max vert m':>11}")
+    for extent in ERROR_EXTENTS:
+        error = frame.fast_mode_error(extent)
+        print(f"{extent:>10} {error['max_horizontal_m']:>12.3f} {error['mean_horizontal_m']:>13.3f} "
+              f"{error['max_vertical_m']:>11.3f}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
+    report_frame_error()
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from geofence import KEEP_IN, KEEP_OUT, OUTSIDE_KEEP_IN, Geofence, Zone
+
+SWARM_SIZES = [10, 100, 1000, 5000]
+ZONE_COUNTS = [2, 10, 50]
+VERTICES = 12      # vertices of each keep-out polygon
+EXTENT = 500.0     # half side of the keep-in square, meters
+REPEATS = 20
+CHECK_CASES = 300  # random geofences whose check is compared with a point-by-point search
+CHECK_POINTS = 50  # points checked against each of them
+
+
+def make_geofence(num_zones, rng):
+    zones = [Zone([[-EXTENT, -EXTENT], [EXTENT, -EXTENT], [EXTENT, EXTENT], [-EXTENT, EXTENT]],
+                  KEEP_IN, floor=-5, ceiling=120, name='field')]
+    angles = np.linspace(0, 2 * np.pi, VERTICES, endpoint=False)
+    for index in range(num_zones - 1):
+        center = rng.uniform(-EXTENT, EXTENT, 2)
+        radius = rng.uniform(10, 40, VERTICES)
+        zones.append(Zone(center + np.column_stack((radius * np.cos(angles), radius * np.sin(angles))),
+                          KEEP_OUT, floor=-5, ceiling=200, name=f'obstacle {index}'))
+    return Geofence(zones)
+
+
+def random_zone(rng):
+    """Star-shaped polygon, often concave, in a random winding order, with an integer altitude band."""
+    num_vertices = int(rng.integers(3, 11))
+    angles = np.sort(rng.uniform(0, 2 * np.pi, num_vertices))
+    radius = rng.uniform(5, 30, num_vertices)
+    polygon = rng.uniform(-50, 50, 2) + np.column_stack((radius * np.cos(angles), radius * np.sin(angles)))
+    if rng.random() < 0.5:
+        polygon = polygon[::-1]
+    floor = float(rng.integers(-5, 20))
+    return Zone(polygon, KEEP_OUT if rng.random() < 0.5 else KEEP_IN, floor=floor,
+                ceiling=floor + float(rng.integers(0, 60)))
+
+
+def winding_number(x, y, polygon):
+    """Winding number of the polygon around (x, y), edge by edge."""
+    winding = 0
+    for (x0, y0), (x1, y1) in zip(polygon.tolist(), np.roll(polygon, -1, axis=0).tolist()):
+        side = (x1 - x0) * (y - y0) - (x - x0) * (y1 - y0)
+        if y0 <= y < y1 and side > 0:
+            winding += 1
+        elif y1 <= y < y0 and side < 0:
+            winding -= 1
+    return winding
+
+
+def brute_force(geofence, point):
+    """(allowed, zone breached) of one point, zone by zone; zone is None where allowed."""
+    if np.isnan(point).any():
+        return True, None
+    x, y, z = point.tolist()
+    inside = [winding_number(x, y, zone.polygon) != 0 and zone.floor <= z <= zone.ceiling
+              for zone in geofence.zones]
+    keep_out = [index for index, zone in enumerate(geofence.zones) if zone.kind == KEEP_OUT and inside[index]]
+    if keep_out:
+        return False, keep_out[0]
+    keep_in = [index for index, zone in enumerate(geofence.zones) if zone.kind == KEEP_IN]
+    if keep_in and not any(inside[index] for index in keep_in):
+        return False, OUTSIDE_KEEP_IN
+    return True, None
+
+
+def check_against_brute_force(rng):
+    """Compare Geofence.check with a point-by-point winding-number search on small random geofences."""
+    mismatches = []
+    for _ in range(CHECK_CASES):
+        geofence = Geofence([random_zone(rng) for _ in range(int(rng.integers(0, 5)))])
+        points = np.column_stack((rng.uniform(-80, 80, (CHECK_POINTS, 2)), rng.uniform(-10, 80, CHECK_POINTS)))
+        # altitudes exactly on the floor or the ceiling of a zone (both inclusive), and unknown positions
+        for index in np.flatnonzero(rng.random(CHECK_POINTS) < 0.3).tolist():
+            if len(geofence):
+                zone = geofence.zones[int(rng.integers(len(geofence)))]
+                points[index, 2] = zone.floor if rng.random() < 0.5 else zone.ceiling
+        points[rng.random(CHECK_POINTS) < 0.05] = np.nan
+        allowed, zone = geofence.check(points)
+        for index, point in enumerate(points):
+            expected_allowed, expected_zone = brute_force(geofence, point)
+            if allowed[index] != expected_allowed or (not expected_allowed and zone[index] != expected_zone):
+                mismatches.append((geofence, point))
+    print(f"brute-force check: {CHECK_CASES} random geofences x {CHECK_POINTS} points, {len(mismatches)} mismatches")
+    if mismatches:
+        geofence, point = mismatches[0]
+        zones = '\n'.join(f"{zone.kind} {zone.floor}..{zone.ceiling} m {zone.polygon.tolist()}"
+                          for zone in geofence.zones)
+        raise SystemExit(f"Geofence.check is wrong for the point {point.tolist()} and the zones\n{zones}")
+
+
+def run_benchmark():
+    rng = np.random.default_rng(0)
+    check_against_brute_force(rng)
+    for num_zones in ZONE_COUNTS:
+        geofence = make_geofence(num_zones, rng)
+        for num_drones in SWARM_SIZES:
+            # live positions and commanded targets, checked in the same pass
+            points = np.column_stack((rng.uniform(-1.1 * EXTENT, 1.1 * EXTENT, (2 * num_drones, 2)),
+                                      rng.uniform(0, 100, 2 * num_drones)))
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                allowed, _ = geofence.check(points)
+            elapsed = (time.perf_counter() - start) / REPEATS
+            print(f"{num_zones:>3} zones, {num_drones:>5} drones (positions + targets): {elapsed * 1e3:7.2f} ms, "
+                  f"{(~allowed).sum()} breaches")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config
+from px4_launcher import SwarmLauncher
+
+NUM_DRONES = 20
+SHELL_SCRIPT_DELAY = 8  # fixed sleep per instance in px4_multigazebo_drones.sh
+
+# Stand-ins for PX4 and mavsdk_server: start after a random boot delay, then
+# stream MAVLink-looking datagrams / accept TCP connections like the real ones.
+STUB_PX4 = '''
+import random, socket, sys, time
+udp_port = int(sys.argv[1])
+time.sleep(random.uniform(0.5, 2.0))
+sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+while True:
+    sock.sendto(bytes([0xFD]) + bytes(11), ('127.0.0.1', udp_port))
+    time.sleep(0.2)
+'''
+
+STUB_MAVSDK_SERVER = '''
+import random, socket, sys, time
+grpc_port = int(sys.argv[1])
+time.sleep(random.uniform(0.2, 1.0))
+server = socket.create_server(('127.0.0.1', grpc_port))
+while True:
+    server.accept()[0].close()
+'''
+
+
+async def launch(config, tmp):
+    stub_px4 = os.path.join(tmp, 'stub_px4.py')
+    stub_server = os.path.join(tmp, 'stub_mavsdk_server.py')
+    with open(stub_px4, 'w') as f:
+        f.write(STUB_PX4)
+    with open(stub_server, 'w') as f:
+        f.write(STUB_MAVSDK_SERVER)
+    launcher = SwarmLauncher(config,
+                             px4_command=[sys.executable, stub_px4, '{udp_port}'],
+                             mavsdk_server_command=[sys.executable, stub_server, '{grpc_port}'])
+    start = time.perf_counter()
+    await launcher.start()
+    elapsed = time.perf_counter() - start
+    await launcher.stop()
+    return elapsed
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    config = read_config()
+    with tempfile.TemporaryDirectory() as tmp:
+        config.update(NUM_DRONES=NUM_DRONES, Sim_Env=False, GRPC_PORT_BASE=61051, UDP_PORT_BASE=24540,
+                      Launcher=dict(config.get('Launcher', {}), log_dir=os.path.join(tmp, 'logs')))
+        for max_parallel in (1, 4, NUM_DRONES):
+            config['Launcher']['max_parallel'] = max_parallel
+            elapsed = asyncio.run(launch(config, tmp))
+            print(f"max_parallel={max_parallel:>3}: {NUM_DRONES} stub instances ready in {elapsed:.2f} s "
+                  f"(shell script sleeps alone: {NUM_DRONES * SHELL_SCRIPT_DELAY} s)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config, reached_goto_target, relative_altitude_above
+from multidrone_control import DroneSwarm
+from swarm_logging import setup_logging
+
+SWARM_SIZES = [10, 50, 100]
+LEG_M = 100.0
+
+
+def legs(num_drones, distance=10):
+    # north of each drone's spawn point (see fake_backend_options): the drones with a
+    # long first leg have a short second leg, so every drone flies LEG_M in total
+    homes = [((i % 3) * distance, (i // 3) * distance) for i in range(num_drones)]
+    first = [(x, y + LEG_M * (i + 1) / num_drones, 20.0) for i, (x, y) in enumerate(homes)]
+    second = [(x, y + LEG_M, 20.0) for x, y in homes]
+    return first, second
+
+
+async def make_swarm(num_drones):
+    config = read_config()
+    config['NUM_DRONES'] = num_drones
+    config['Fake_backend'] = dict(config['Fake_backend'], max_speed_m_s=20.0, climb_rate_m_s=10.0)
+    swarm = DroneSwarm(config, backend='fake')
+    await swarm.connect_swarm()
+    return swarm, config.get('drone_deploy_distance', 10)
+
+
+async def fly_lockstep(num_drones):
+    """The shape of run_swarm_mission: every step waits for the whole swarm."""
+    swarm, distance = await make_swarm(num_drones)
+    first, second = legs(num_drones, distance)
+    start = time.perf_counter()
+    await swarm.takeoff_swarm()
+    await swarm.wait_all(relative_altitude_above(2.0), timeout=60)
+    for coords in (first, second):
+        await swarm.run_goto_local(coords)
+        await swarm.wait_all(reached_goto_target(1.0), timeout=120)
+    return time.perf_counter() - start
+
+
+async def fly_dag(num_drones):
+    swarm, distance = await make_swarm(num_drones)
+    first, second = legs(num_drones, distance)
+    mission = {'name': 'bench', 'steps': [
+        {'id': 'takeoff', 'action': 'takeoff'},
+        {'id': 'climb', 'action': 'wait', 'after': ['takeoff'], 'condition': 'relative_altitude_above',
+         'args': {'altitude_m': 2.0}, 'timeout_s': 60},
+        {'id': 'first', 'action': 'goto_local', 'after': ['climb'], 'targets': first, 'timeout_s': 120},
+        {'id': 'second', 'action': 'goto_local', 'after': ['first'], 'targets': second, 'timeout_s': 120},
+    ]}
+    start = time.perf_counter()
+    report = await swarm.run_mission(mission)
+    elapsed = time.perf_counter() - start
+    return elapsed, report
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    setup_logging(level=logging.WARNING)
+    for num_drones in SWARM_SIZES:
+        lockstep = asyncio.run(fly_lockstep(num_drones))
+        dag, report = asyncio.run(fly_dag(num_drones))
+        path = ' -> '.join(node.label() for node in report.critical_path())
+        print(f"{num_drones:>5} drones: lockstep {lockstep:6.2f} s, DAG {dag:6.2f} s "
+              f"({'ok' if report.ok else 'FAILED'}), critical path {path}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config
+from mission_upload import MissionCompiler
+from multidrone_control import DroneSwarm
+from swarm_logging import setup_logging
+
+SWARM_SIZES = [10, 50, 100]
+WAYPOINTS = 30
+
+
+def missions(num_drones):
+    # a lawnmower pattern per drone, each in its own lane
+    k = np.arange(WAYPOINTS)
+    return {drone_id: np.column_stack((10.0 * drone_id + 5.0 * (k % 2), 10.0 * (k // 2), np.full(WAYPOINTS, 20.0)))
+            for drone_id in range(1, num_drones + 1)}
+
+
+async def upload(num_drones):
+    config = read_config()
+    config['NUM_DRONES'] = num_drones
+    swarm = DroneSwarm(config, backend='fake')
+    await swarm.connect_swarm()
+    plans = missions(num_drones)
+    frame = swarm._update_frame()
+    timings = {}
+
+    # the former way: compile and upload to one drone after the other
+    compiler = MissionCompiler(capacity=0)
+    start = time.perf_counter()
+    for drone in swarm.active_drones:
+        await drone.upload_mission(compiler.compile(plans[drone.id], frame, swarm.origin_alt), force=True)
+    timings['sequential'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await swarm.upload_missions(plans, force=True)
+    timings['concurrent'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = await swarm.upload_missions(plans)
+    timings['unchanged'] = time.perf_counter() - start
+    skipped = sum(result.value is False for result in report.results.values())
+
+    plans[1] = plans[1][::-1]
+    start = time.perf_counter()
+    await swarm.upload_missions(plans)
+    timings['one changed'] = time.perf_counter() - start
+    return timings, skipped, swarm.upload_executor.max_in_flight
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    setup_logging(level=logging.WARNING)
+    for num_drones in SWARM_SIZES:
+        timings, skipped, max_in_flight = asyncio.run(upload(num_drones))
+        summary = ', '.join(f"{name} {seconds:.3f} s" for name, seconds in timings.items())
+        print(f"{num_drones:>5} drones x {WAYPOINTS} waypoints (max in flight {max_in_flight}): {summary} "
+              f"({skipped} unchanged skipped)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import os
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config, relative_altitude_above
+from multidrone_control import DroneSwarm
+from setpoint_streamer import SetpointStreamer
+from swarm_logging import setup_logging
+
+SWARM_SIZES = [10, 100, 500]
+RATES_HZ = [20, 50]
+DURATION = 5.0  # seconds of streaming per run
+
+
+async def stream(num_drones, rates):
+    config = read_config()
+    config['NUM_DRONES'] = num_drones
+    swarm = DroneSwarm(config, backend='fake')
+    await swarm.connect_swarm()
+    await swarm.takeoff_swarm()
+    await swarm.wait_all(relative_altitude_above(2.0), timeout=30)
+    drones = swarm.active_drones
+    starts = swarm._drone_local_positions(drones)
+
+    def trajectory(t):
+        # every drone slides east and climbs slowly from where it hovers
+        return starts + (t, 0.0, 0.2 * t)
+
+    reports = []
+    for rate_hz in rates:
+        streamer = SetpointStreamer(drones, swarm.frame, rate_hz=rate_hz)
+        streamer.follow(trajectory)
+        await streamer.prime()
+        await swarm.executor.run('start_offboard', drones, lambda drone: drone.start_offboard())
+        reports.append(await streamer.run(DURATION))
+        await swarm.executor.run('stop_offboard', drones, lambda drone: drone.stop_offboard())
+    return reports
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    setup_logging(level=logging.WARNING)
+    for num_drones in SWARM_SIZES:
+        for report in asyncio.run(stream(num_drones, RATES_HZ)):
+            summary = report.as_dict()
+            jitter = summary['jitter']
+            print(f"{num_drones:>5} drones at {report.rate_hz:>2} Hz: {summary['achieved_rate_hz']:5.1f} ticks/s, "
+                  f"jitter p50 {jitter['p50'] * 1e3:6.2f} ms p95 {jitter['p95'] * 1e3:6.2f} ms "
+                  f"max {jitter['max'] * 1e3:6.2f} ms, {summary['missed_ticks']} missed ticks, "
+                  f"{summary['dropped']} dropped / {summary['sent']} sent")
+
+
+if __name__ == '__main__':
+    run_benchmark()
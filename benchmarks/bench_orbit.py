@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from local_frame import LocalFrame
+from orbit_trajectory import OrbitTrajectory, ring_phases
+
+SWARM_SIZES = [10, 100, 500, 1000, 5000]
+TICKS = 1000
+RATE_HZ = 50
+ORIGIN = (47.397742, 8.545594, 488.0)
+
+
+def run_benchmark():
+    frame = LocalFrame(*ORIGIN)
+    for num_drones in SWARM_SIZES:
+        orbit = OrbitTrajectory((0.0, 0.0), max(5.0 * num_drones / (2 * np.pi), 20.0), 30.0,
+                                ring_phases(num_drones), speed=5.0)
+        times = np.arange(TICKS) / RATE_HZ
+
+        start = time.perf_counter()
+        for t in times:
+            orbit.positions(t)
+            orbit.yaw(t)
+        generate = (time.perf_counter() - start) / TICKS
+
+        start = time.perf_counter()
+        for t in times:
+            frame.to_global(orbit.positions(t))
+        convert = (time.perf_counter() - start) / TICKS
+
+        start = time.perf_counter()
+        orbit.sample(times)
+        batch = time.perf_counter() - start
+        print(f"{num_drones:>5} drones: {generate * 1e6:8.1f} us/tick setpoints + yaw, "
+              f"{convert * 1e6:8.1f} us/tick with the global conversion, "
+              f"{TICKS} ticks precomputed in {batch * 1e3:6.1f} ms")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from proximity_monitor import close_pairs
+
+SWARM_SIZES = [100, 1000, 5000]
+THRESHOLD = 3.0    # meters
+DENSITY = 6.0      # meters of side of the area per drone
+REPEATS = 10
+CHECK_CASES = 500  # random small swarms compared with the all-pairs search
+
+
+def brute_force(positions, threshold):
+    distance = np.linalg.norm(positions[:, None] - positions[None, :], axis=2)
+    return np.argwhere(np.triu(distance < threshold, k=1))
+
+
+def random_swarm(rng, case, threshold):
+    """Up to 40 positions, some missing (NaN); every third swarm sits on the corners of the grid cells."""
+    num_drones = int(rng.integers(0, 41))
+    if case % 3 == 0:
+        # coincident drones, drones exactly threshold apart and on the cell boundaries
+        positions = threshold * rng.integers(-2, 3, (num_drones, 3)).astype(np.float64)
+    else:
+        positions = rng.uniform(-1, 1, (num_drones, 3)) * threshold * 2 * (case % 3)
+    positions[rng.random(num_drones) < 0.1] = np.nan
+    return positions
+
+
+def check_against_brute_force(rng):
+    """Compare the pairs and distances of close_pairs with the all-pairs search on small random swarms."""
+    mismatches = []
+    for case in range(CHECK_CASES):
+        threshold = rng.uniform(0.5, 5.0)
+        positions = random_swarm(rng, case, threshold)
+        pairs, distances = close_pairs(positions, threshold)
+        found = {(i, j): distance for (i, j), distance in zip(pairs.tolist(), distances.tolist())}
+        expected = {(i, j) for i, j in brute_force(positions, threshold).tolist()}
+        if (len(found) != len(pairs) or set(found) != expected
+                or any(not np.isclose(distance, np.linalg.norm(positions[i] - positions[j]))
+                       for (i, j), distance in found.items())):
+            mismatches.append((positions, threshold))
+    print(f"brute-force check: {CHECK_CASES} random swarms of up to 40 drones, {len(mismatches)} mismatches")
+    if mismatches:
+        positions, threshold = mismatches[0]
+        raise SystemExit(f"close_pairs is wrong at threshold {threshold} for\n{positions}")
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function(*args)
+    return (time.perf_counter() - start) / REPEATS, result
+
+
+def run_benchmark():
+    rng = np.random.default_rng(0)
+    check_against_brute_force(rng)
+    for num_drones in SWARM_SIZES:
+        side = DENSITY * np.sqrt(num_drones)
+        positions = np.column_stack((rng.uniform(0, side, (num_drones, 2)), rng.uniform(15, 25, num_drones)))
+        grid_time, (pairs, _) = timed(close_pairs, positions, THRESHOLD)
+        text = f"{num_drones:>5} drones: grid {grid_time * 1e3:7.2f} ms ({len(pairs)} close pairs)"
+        if num_drones <= 1000:
+            brute_time, brute_pairs = timed(brute_force, positions, THRESHOLD)
+            assert len(brute_pairs) == len(pairs)
+            text += f", all pairs {brute_time * 1e3:7.2f} ms"
+        print(text + f", max rate {1 / grid_time:7.0f} Hz")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from drone_control import read_config
+from flight_recorder import FlightRecorder
+from multidrone_control import DroneSwarm, run_swarm_mission
+
+NUM_DRONES = 3  # run_swarm_mission formations have three slots
+
+
+async def record_flight(config, path):
+    swarm = DroneSwarm(config, backend='fake')
+    recorder = FlightRecorder(path)
+    swarm.attach_recorder(recorder)
+    await swarm.connect_swarm()
+    await swarm._monitor_swarm()
+    start = time.perf_counter()
+    await run_swarm_mission(swarm)
+    elapsed = time.perf_counter() - start
+    recorder.close()
+    return elapsed
+
+
+async def replay_flight(config, path, speed):
+    config = dict(config, Replay={'log': path, 'speed': speed})
+    swarm = DroneSwarm(config, backend='replay')
+    start = time.perf_counter()
+    await run_swarm_mission(swarm)
+    return time.perf_counter() - start
+
+
+def run_benchmark():
+    os.chdir(REPO_ROOT)
+    config = read_config()
+    config['NUM_DRONES'] = NUM_DRONES
+    config['Fake_backend'] = dict(config['Fake_backend'], max_speed_m_s=5.0, climb_rate_m_s=3.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flight.bin')
+        recorded = asyncio.run(record_flight(config, path))
+        results = [('recorded (fake backend)', recorded)]
+        for speed in (10.0, 0):
+            label = 'as fast as possible' if not speed else f'replay x{speed:g}'
+            results.append((label, asyncio.run(replay_flight(config, path, speed))))
+    for label, seconds in results:
+        print(f"{label:>24}: run_swarm_mission with {NUM_DRONES} drones took {seconds:.2f} s")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from mavsdk_server_pool import MavsdkServerPool
+from swarm_logging import setup_logging
+
+NUM_DRONES = 20
+UDP_PORT_BASE = 24540
+
+# Stand-in for mavsdk_server: opens its gRPC port after a boot delay, like the
+# real one does once it discovered its vehicle.
+STUB_MAVSDK_SERVER = '''
+import socket, sys, time
+grpc_port = int(sys.argv[1])
+time.sleep(0.5)
+server = socket.create_server(('127.0.0.1', grpc_port))
+while True:
+    server.accept()[0].close()
+'''
+
+
+async def swarm(pool, addresses):
+    """What one DroneSwarm does with the pool: every drone acquires its server, then releases it."""
+    start = time.perf_counter()
+    ports = await asyncio.gather(*(pool.acquire(address) for address in addresses))
+    elapsed = time.perf_counter() - start
+    for address in addresses:
+        pool.release(address)
+    return elapsed, [port for _, port in ports]
+
+
+async def restart_after_crash(pool, address):
+    """Kill one server and wait for the health check of the running loop to bring it back."""
+    server = pool.servers[address]
+    pid = server.process.process.pid
+    os.killpg(pid, signal.SIGKILL)
+    start = time.perf_counter()
+    while server.process.process.pid == pid or not server.ready.done():
+        if time.perf_counter() - start > 10 * pool.health_interval:
+            return None
+        await asyncio.sleep(0.05)
+    await server.ready
+    return time.perf_counter() - start
+
+
+async def second_swarm(pool, addresses):
+    elapsed, ports = await swarm(pool, addresses)
+    return elapsed, ports, await restart_after_crash(pool, addresses[0])
+
+
+def run_benchmark():
+    setup_logging(level=logging.WARNING)
+    addresses = [f'udp://:{UDP_PORT_BASE + index}' for index in range(NUM_DRONES)]
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = os.path.join(tmp, 'stub_mavsdk_server.py')
+        with open(stub, 'w') as f:
+            f.write(STUB_MAVSDK_SERVER)
+        pool = MavsdkServerPool(server_command=[sys.executable, stub, '{grpc_port}'], port_range=(61100, 61199),
+                                health_interval=0.5, log_dir=os.path.join(tmp, 'logs'))
+        # every swarm runs in its own event loop, as a script creating a new DroneSwarm does
+        cold, first_ports = asyncio.run(swarm(pool, addresses))
+        warm, second_ports, restart = asyncio.run(second_swarm(pool, addresses))
+        asyncio.run(pool.close())
+    print(f"{NUM_DRONES} drones: first swarm {cold:.2f} s, re-created swarm in a new event loop {warm * 1e3:.1f} ms "
+          f"({'same' if first_ports == second_ports else 'NEW'} servers)")
+    print(f"  crashed server restarted by the health check of the second loop: "
+          f"{'in %.2f s' % restart if restart is not None else 'NEVER'}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,73 @@
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+from formation_assignment import SUM_SQUARED, assign_slots
+from swarm_logging import setup_logging
+from transition_planner import PlanningError, TransitionPlanner, sample_trajectories
+
+SWARM_SIZES = [10, 100, 200, 500]
+SPACINGS = [10, 3.5]  # meters between the slots of a formation: loose, then just above the minimum separation
+CHECK_STEP = 0.02  # seconds between the samples of the independent clearance check
+
+
+def grid(num_drones, altitude, spacing):
+    side = int(np.ceil(np.sqrt(num_drones)))
+    index = np.arange(num_drones)
+    return np.column_stack((spacing * (index % side), spacing * (index // side), np.full(num_drones, altitude)))
+
+
+def ring(num_drones, altitude, spacing):
+    radius = max(spacing * num_drones / (2 * np.pi), spacing)
+    angle = 2 * np.pi * np.arange(num_drones) / num_drones
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle), np.full(num_drones, altitude)))
+
+
+def clearance(plan):
+    """Smallest distance between two drones, sampled far finer than the planner does."""
+    grid_times = np.arange(0.0, plan.duration + CHECK_STEP, CHECK_STEP)
+    closest = np.inf
+    for start in range(0, len(grid_times), 256):
+        positions = sample_trajectories(plan.times, plan.waypoints, grid_times[start:start + 256])
+        for t in range(positions.shape[1]):
+            distance = np.linalg.norm(positions[:, None, t] - positions[None, :, t], axis=2)
+            np.fill_diagonal(distance, np.inf)
+            closest = min(closest, distance.min())
+    return closest
+
+
+def run_benchmark():
+    setup_logging(level=logging.WARNING)
+    # opt in to as many layers as the crowded swaps need, to report how many they use
+    planner = TransitionPlanner(min_separation=3.0, max_layers=30)
+    for spacing in SPACINGS:
+        for num_drones in SWARM_SIZES:
+            square = grid(num_drones, 20, spacing)
+            scenarios = {
+                'grid -> ring': (square, ring(num_drones, 25, spacing), True),
+                'grid -> rotated grid': (square, square[:, [1, 0, 2]] + (spacing / 2, spacing / 2, 0), True),
+                'ring -> grid': (ring(num_drones, 25, spacing), square, True),
+                # every drone takes the slot of the opposite one, all crossing the center
+                'swap (reversed order)': (square, square[::-1], False),
+            }
+            print(f"{num_drones} drones, {spacing} m spacing:")
+            for name, (starts, slots, assign) in scenarios.items():
+                targets = slots[assign_slots(starts, slots, SUM_SQUARED)] if assign else slots
+                start = time.perf_counter()
+                try:
+                    plan = planner.plan(starts, targets)
+                except PlanningError as error:
+                    print(f"  {name:>22}: failed after {time.perf_counter() - start:.2f} s ({error})")
+                    continue
+                elapsed = time.perf_counter() - start
+                checked = clearance(plan) if num_drones <= 200 else float('nan')
+                print(f"  {name:>22}: planned in {elapsed * 1e3:8.1f} ms, duration {plan.duration:5.1f} s, "
+                      f"clearance {checked:5.2f} m, {plan.as_dict()['layers']} layers")
+
+if __name__ == '__main__':
+    run_benchmark()
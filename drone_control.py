@@ -1,9 +1,20 @@
 import asyncio
-import mavsdk
+import time
 from mavsdk import System
-from mavsdk.action import OrbitYawBehavior
+from mavsdk.action import ActionError, OrbitYawBehavior
+from mavsdk.offboard import PositionGlobalYaw, VelocityNedYaw
 from mavsdk import telemetry
 import json
+from fake_system import FakeSystem
+from replay_system import ReplaySystem
+from telemetry_hub import TelemetryHub
+from local_frame import distance_m
+from swarm_state import SwarmState, StateField
+from ring_buffer import TelemetryHistory, DEFAULT_CAPACITY
+from readiness import ReadinessCache
+from instrumentation import METRICS
+from mission_upload import RAW
+from swarm_logging import get_logger, setup_logging_from_config
 
 
 def read_config():
@@ -23,29 +34,131 @@ def read_config():
         pass
         #TODO: Implement serial connection
     else:
-        print("Invalid connection_type specified in config.json")
+        get_logger().error("Invalid connection_type specified in config.json")
         # Handle the error or raise an exception
     return config
 
+# Wait predicates ---------------------------------------------------------------
+# A predicate is called with the drone and reads its cached telemetry; the
+# topics attribute tells Drone.wait_until which streams can change the outcome.
+
+def telemetry_predicate(topics, check):
+    """Wrap check(drone) as a wait predicate depending on the given telemetry topics."""
+    check.topics = tuple(topics)
+    return check
+
+def reached_goto_target(tolerance_m=1.0):
+    """True once the drone is within tolerance_m of the target of its last run_goto."""
+    def check(drone):
+        position = drone.telemetry_hub.latest('position')
+        if position is None or drone.goto_target is None:
+            return False
+        lat, lon, alt = drone.goto_target
+        return distance_m(position.latitude_deg, position.longitude_deg, position.absolute_altitude_m,
+                          lat, lon, alt) <= tolerance_m
+    return telemetry_predicate(['position'], check)
+
+def near_position(latitude_deg, longitude_deg, absolute_altitude_m, tolerance_m=1.0):
+    """True once the drone is within tolerance_m of a global position."""
+    def check(drone):
+        position = drone.telemetry_hub.latest('position')
+        return position is not None and distance_m(
+            position.latitude_deg, position.longitude_deg, position.absolute_altitude_m,
+            latitude_deg, longitude_deg, absolute_altitude_m) <= tolerance_m
+    return telemetry_predicate(['position'], check)
+
+def relative_altitude_above(altitude_m):
+    """True once the drone is higher than altitude_m above home."""
+    def check(drone):
+        position = drone.telemetry_hub.latest('position')
+        return position is not None and position.relative_altitude_m > altitude_m
+    return telemetry_predicate(['position'], check)
+
+def landed():
+    """True once the drone reports being on the ground."""
+    def check(drone):
+        return drone.telemetry_hub.latest('landed_state') == telemetry.LandedState.ON_GROUND
+    return telemetry_predicate(['landed_state'], check)
+
+def global_position_ok():
+    """True once the drone has a global position estimate and a home position."""
+    def check(drone):
+        health = drone.telemetry_hub.latest('health')
+        return health is not None and health.is_global_position_ok and health.is_home_position_ok
+    return telemetry_predicate(['health'], check)
+# ------------------------------------------------------------------------------
+
 class Drone:
-    def __init__(self, id, grpc_portbase=50051, connection_type='udp', server_address='', portbase=14540):
+    # Drone state properties, stored in a row of a SwarmState
+    is_connected = StateField('is_connected', cast=bool)
+    is_armed = StateField('is_armed', cast=bool)
+    in_air = StateField('in_air', cast=bool)
+    latitude = StateField('latitude', nullable=True)
+    longitude = StateField('longitude', nullable=True)
+    absolute_altitude = StateField('absolute_altitude', nullable=True)
+    relative_altitude = StateField('relative_altitude', nullable=True)
+    velocity_north = StateField('velocity_north', nullable=True)
+    velocity_east = StateField('velocity_east', nullable=True)
+    velocity_down = StateField('velocity_down', nullable=True)
+    battery_percent = StateField('battery_percent', nullable=True)
+    last_update = StateField('last_update', nullable=True)
+
+    def __init__(self, id, grpc_portbase=50051, connection_type='udp', server_address='', portbase=14540,
+                 backend='mavsdk', backend_options=None, state=None, state_index=0,
+                 history_capacity=DEFAULT_CAPACITY, metrics=None, server_pool=None, readiness_max_age=2.0):
+        """
+        Args:
+            backend (str): 'mavsdk' to talk to a mavsdk_server, 'fake' to use the in-process FakeSystem,
+                'replay' to replay a recorded flight log with ReplaySystem.
+            backend_options (dict): Keyword arguments for FakeSystem (home, latency_s, jitter_s, ...)
+                or ReplaySystem (log, drone_id, clock).
+            state (SwarmState): Shared state store, a private single-row store is created if None.
+            state_index (int): Row of this drone in the state store.
+            history_capacity (int): Samples kept per topic in the telemetry history ring buffers.
+            metrics (Metrics): Instrumentation registry, defaults to the shared instrumentation.METRICS.
+            server_pool (MavsdkServerPool): With the mavsdk backend, get the mavsdk_server from this pool
+                on connect instead of using grpc_portbase.
+            readiness_max_age (float): Seconds a health sample stays valid in the readiness cache.
+        """
         self.id = id
-        self.system = System(mavsdk_server_address=None, port=grpc_portbase)
+        self.log = get_logger('drone', drone_id=id)
+        if state is None:
+            state = SwarmState(1, ids=[id])
+            state_index = 0
+        self._state_row = state.row(state_index)
+        if backend == 'fake':
+            self.system = FakeSystem(**(backend_options or {}))
+        elif backend == 'replay':
+            self.system = ReplaySystem(**backend_options)
+        elif backend == 'mavsdk':
+            self.system = System(mavsdk_server_address=None, port=grpc_portbase)
+        else:
+            raise ValueError(f"Invalid backend '{backend}', expected 'mavsdk', 'fake' or 'replay'")
+        self.backend = backend
+        # one upstream stream per telemetry topic, shared by every consumer of this drone
+        self.telemetry_hub = TelemetryHub(self.system)
+        self.server_pool = server_pool if backend == 'mavsdk' else None
+        self._server_lease = False
+        self.link_started = False  # the System is connected to its mavsdk_server, see wait_connected
         self.connection_url = f'{connection_type}://{server_address}:{portbase}'
         self.connection_type = connection_type
         self.server_address = server_address
         self.portbase = portbase
         self.grpc_portbase = grpc_portbase
         
-        # Drone state properties
-        self.is_connected = False
-        self.is_armed = False
-        self.in_air = False
-        self.latitude = None
-        self.longitude = None
-        self.absolute_altitude = None
-        self.relative_altitude = None
         self.home_position = None
+        self.goto_target = None  # (lat, lon, absolute altitude) of the last run_goto
+        # optional callable(latitude_deg, longitude_deg, altitude_m) raising on a forbidden goto target
+        self.target_check = None
+        self.mission_key = None  # content hash of the last mission uploaded, see upload_mission
+        # health / home known-good state, refreshed by every telemetry sample, lets goto and orbit skip their gating
+        self.readiness = ReadinessCache(readiness_max_age)
+        self._monitor_tasks = []
+        # bounded per-topic telemetry history, filled by the monitors
+        self.history = TelemetryHistory(history_capacity)
+        self.recorder = None  # optional FlightRecorder, see attach_recorder
+        self.metrics = METRICS if metrics is None else metrics
+        self.telemetry_hub.observer = self._observe_telemetry
 
     # getter methods -----------------------------------------------------------
     def get_connection_info(self):
@@ -82,103 +195,359 @@ class Drone:
             'relative_altitude': self.relative_altitude
         }
 
+    def get_velocity(self):
+        """Get the drone's current NED velocity."""
+        return {
+            'north_m_s': self.velocity_north,
+            'east_m_s': self.velocity_east,
+            'down_m_s': self.velocity_down
+        }
+
+    def get_battery(self):
+        """Get the drone's remaining battery in percent."""
+        return self.battery_percent
+
     def get_home_position(self):
         """Get the drone's home position."""
         return self.home_position
     
     async def get_coordinates(self):
-        async for position in self.system.telemetry.position():
-            #return position.latitude_deg, position.longitude_deg, position.absolute_altitude_m, position.relative_altitude_m
-            return position
+        #return position.latitude_deg, position.longitude_deg, position.absolute_altitude_m, position.relative_altitude_m
+        return await self.telemetry_hub.get('position')
     # --------------------------------------------------------------------------
 
+    async def wait_until(self, predicate, timeout=None):
+        """
+        Wait until predicate(drone) holds, re-evaluating it on every update of the topics it depends on.
+
+        Args:
+            predicate (callable): A wait predicate such as reached_goto_target() or landed().
+            timeout (float): Maximum time to wait in seconds, None to wait forever.
+
+        Returns:
+            bool: True if the condition was met, False on timeout.
+        """
+        topics = getattr(predicate, 'topics', ('position',))
+        for topic in topics:
+            self.telemetry_hub.latest(topic)  # start the upstream streams the predicate depends on
+
+        async def _wait():
+            while not predicate(self):
+                await self.telemetry_hub.next_update(topics)
+
+        try:
+            await asyncio.wait_for(_wait(), timeout)
+        except asyncio.TimeoutError:
+            self.log.warning("Drone %s wait timed out after %s s", self.id, timeout)
+            return False
+        return True
+
+    def attach_recorder(self, recorder):
+        """Record every telemetry sample and issued command of this drone to a FlightRecorder."""
+        self.recorder = recorder
+
+    def _record(self, kind, *values):
+        if self.recorder is not None:
+            self.recorder.record(self.id, kind, *values)
+
+    def _observe_telemetry(self, topic, item):
+        if self.metrics.enabled:
+            self.metrics.telemetry(self.id, topic)
+        # once a gating started the health and home streams, every sample keeps the readiness cache fresh
+        if topic == 'health':
+            self.readiness.update_health(item)
+        elif topic == 'home':
+            self.readiness.update_home(item)
+
     async def connect(self):
-        print(f"Connecting to drone {self.id}...")
-        await self.system.connect(system_address=self.connection_url)
+        self.log.info("Connecting to drone %s...", self.id)
+        self._record('connect')
+        with self.metrics.command(self.id, 'connect'):
+            if self.server_pool is not None:
+                # attach to the warm mavsdk_server of this vehicle instead of spawning one
+                self.release_server()
+                host, port = await self.server_pool.acquire(self.connection_url)
+                self._server_lease = True
+                self.system = System(mavsdk_server_address=host, port=port)
+                self.telemetry_hub.system = self.system
+            self.link_started = False
+            await self.system.connect(system_address=self.connection_url)
+            self.link_started = True
+            await self.wait_connected()
+
+    async def wait_connected(self):
+        """
+        Wait until the vehicle is connected, once connect() started the link.
+
+        Retrying a connection should only repeat this wait: connecting the
+        System again restarts its mavsdk_server.
+        """
         async for state in self.system.core.connection_state():
             if state.is_connected:
-                print(f"Drone {self.id} connected!")
+                self.log.info("Drone %s connected!", self.id)
                 self.is_connected = True
                 break
-        
+
+    def release_server(self):
+        """Hand the pooled mavsdk_server back to the pool (it keeps running for the next connect)."""
+        if self._server_lease:
+            self.server_pool.release(self.connection_url)
+            self._server_lease = False
+
     async def _start_state_monitoring(self, print_status=False):
-        asyncio.ensure_future(self._monitor_armed(print_status))
-        asyncio.ensure_future(self._monitor_in_air(print_status))
-        asyncio.ensure_future(self._monitor_position(print_status))
-        asyncio.ensure_future(self._monitor_home(print_status))
-        print(f"Started monitoring drone {self.id} state ...")
+        # keep references to the tasks, the event loop only holds weak ones
+        self._monitor_tasks = [
+            asyncio.ensure_future(self._monitor_armed(print_status)),
+            asyncio.ensure_future(self._monitor_in_air(print_status)),
+            asyncio.ensure_future(self._monitor_position(print_status)),
+            asyncio.ensure_future(self._monitor_home(print_status)),
+            asyncio.ensure_future(self._monitor_health(print_status)),
+            asyncio.ensure_future(self._monitor_velocity(print_status)),
+            asyncio.ensure_future(self._monitor_battery(print_status)),
+            asyncio.ensure_future(self._monitor_attitude(print_status)),
+            asyncio.ensure_future(self._monitor_landed_state(print_status)),
+        ]
+        self.log.info("Started monitoring drone %s state ...", self.id)
 
     async def _monitor_armed(self, print_status=False):
-        async for is_armed in self.system.telemetry.armed():
+        async for is_armed in self.telemetry_hub.subscribe('armed'):
             self.is_armed = is_armed
+            self._state_row['last_update'] = time.monotonic()
+            self._record('armed', is_armed)
             if print_status:
-                print(f"Drone {self.id} armed: {is_armed}")
+                self.log.info("Drone %s armed: %s", self.id, is_armed, extra={'topic': 'armed'})
 
     async def _monitor_in_air(self, print_status=False):
-        async for in_air in self.system.telemetry.in_air():
+        async for in_air in self.telemetry_hub.subscribe('in_air'):
             self.in_air = in_air
+            self._state_row['last_update'] = time.monotonic()
+            self._record('in_air', in_air)
             if print_status:
-                print(f"Drone {self.id} in air: {in_air}")
+                self.log.info("Drone %s in air: %s", self.id, in_air, extra={'topic': 'in_air'})
 
     async def _monitor_position(self, print_status=False):
-        async for position in self.system.telemetry.position():
-            self.latitude = position.latitude_deg
-            self.longitude = position.longitude_deg
-            self.absolute_altitude = position.absolute_altitude_m
-            self.relative_altitude = position.relative_altitude_m
+        row = self._state_row
+        history = self.history['position']
+        async for position in self.telemetry_hub.subscribe('position'):
+            now = time.monotonic()
+            row['latitude'] = position.latitude_deg
+            row['longitude'] = position.longitude_deg
+            row['absolute_altitude'] = position.absolute_altitude_m
+            row['relative_altitude'] = position.relative_altitude_m
+            row['last_update'] = now
+            history.append(now, position.latitude_deg, position.longitude_deg,
+                           position.absolute_altitude_m, position.relative_altitude_m)
+            self._record('position', position.latitude_deg, position.longitude_deg,
+                         position.absolute_altitude_m, position.relative_altitude_m)
             if print_status:
-                print(f"Drone {self.id} position: ({self.latitude}, {self.longitude}, {self.absolute_altitude}, {self.relative_altitude})")
+                self.log.info("Drone %s position: (%s, %s, %s, %s)", self.id, position.latitude_deg, position.longitude_deg,
+                              position.absolute_altitude_m, position.relative_altitude_m, extra={'topic': 'position'})
 
     async def _monitor_home(self, print_status=False):
-        async for home in self.system.telemetry.home():
+        async for home in self.telemetry_hub.subscribe('home'):
             self.home_position = home
             if print_status:
-                print(f"Drone {self.id} home position: ({home.latitude_deg}, {home.longitude_deg}, {home.absolute_altitude_m})")
+                self.log.info("Drone %s home position: (%s, %s, %s)", self.id, home.latitude_deg, home.longitude_deg,
+                              home.absolute_altitude_m, extra={'topic': 'home'})
+
+    async def _monitor_health(self, print_status=False):
+        async for health in self.telemetry_hub.subscribe('health'):
+            if print_status:
+                self.log.info("Drone %s global position ok: %s, home position ok: %s", self.id,
+                              health.is_global_position_ok, health.is_home_position_ok, extra={'topic': 'health'})
+
+    async def _monitor_velocity(self, print_status=False):
+        row = self._state_row
+        async for velocity in self.telemetry_hub.subscribe('velocity_ned'):
+            row['velocity_north'] = velocity.north_m_s
+            row['velocity_east'] = velocity.east_m_s
+            row['velocity_down'] = velocity.down_m_s
+            row['last_update'] = time.monotonic()
+            self._record('velocity', velocity.north_m_s, velocity.east_m_s, velocity.down_m_s)
+            if print_status:
+                self.log.info("Drone %s velocity: (%s, %s, %s)", self.id, velocity.north_m_s, velocity.east_m_s,
+                              velocity.down_m_s, extra={'topic': 'velocity'})
+
+    async def _monitor_battery(self, print_status=False):
+        history = self.history['battery']
+        async for battery in self.telemetry_hub.subscribe('battery'):
+            now = time.monotonic()
+            self.battery_percent = battery.remaining_percent
+            self._state_row['last_update'] = now
+            history.append(now, battery.remaining_percent, battery.voltage_v)
+            self._record('battery', battery.remaining_percent, battery.voltage_v)
+            if print_status:
+                self.log.info("Drone %s battery: %s%%", self.id, battery.remaining_percent, extra={'topic': 'battery'})
+
+    async def _monitor_attitude(self, print_status=False):
+        history = self.history['attitude']
+        async for attitude in self.telemetry_hub.subscribe('attitude_euler'):
+            history.append(time.monotonic(), attitude.roll_deg, attitude.pitch_deg, attitude.yaw_deg)
+            self._record('attitude', attitude.roll_deg, attitude.pitch_deg, attitude.yaw_deg)
+            if print_status:
+                self.log.info("Drone %s attitude: (%s, %s, %s)", self.id, attitude.roll_deg, attitude.pitch_deg,
+                              attitude.yaw_deg, extra={'topic': 'attitude'})
+
+    async def _monitor_landed_state(self, print_status=False):
+        history = self.history['landed_state']
+        async for state in self.telemetry_hub.subscribe('landed_state'):
+            history.append(time.monotonic(), state.value)
+            self._record('landed_state', state.value)
+            if print_status:
+                self.log.info("Drone %s landed state: %s", self.id, state, extra={'topic': 'landed_state'})
 
     async def arm(self):
-        print(f"Arming drone {self.id}...")
+        self.log.info("Arming drone %s...", self.id)
+        self._record('arm')
         try:
-            await self.system.action.arm()
-        except mavsdk.ActionError as error:
-            print(f"Arming failed with error: {error}")
+            with self.metrics.command(self.id, 'arm'):
+                await self.system.action.arm()
+        except ActionError as error:
+            self.log.warning("Arming failed with error: %s", error)
+            self.metrics.retry(self.id, 'arm')
             await self.disarm()
             await asyncio.sleep(2)
-            await self.system.action.arm()
+            with self.metrics.command(self.id, 'arm'):
+                await self.system.action.arm()
         else:
             self.is_armed = True
 
-    async def takeoff(self):
+    # Commands are split in prepare_<command>, which resolves the preconditions
+    # (connection, health, position estimate, home altitude...) and returns a
+    # coroutine function that only sends the command, and the command itself,
+    # which runs both. SwarmExecutor.run_synchronized fires the prepared
+    # commands of the whole swarm together and times them with the event-loop
+    # time each fire coroutine function returns, taken right before its
+    # system.action call.
+
+    def _send_time(self):
+        return asyncio.get_running_loop().time()
+
+    async def prepare_takeoff(self):
+        """
+        Connect and wait until the drone is armable, return the coroutine
+        function sending the takeoff. Arming is left to the caller, right before
+        the takeoff (see takeoff): PX4 disarms a drone left armed on the ground.
+        """
         if not self.is_connected:
             await self.connect()
-        await self.arm()
-        print(f"Drone {self.id} taking off...")
-        await self.system.action.takeoff()
+        await self.telemetry_hub.wait_for('health', lambda health: health.is_armable)
+        return self._fire_takeoff
+
+    async def _fire_takeoff(self):
+        self.log.info("Drone %s taking off...", self.id)
+        self._record('takeoff')
+        with self.metrics.command(self.id, 'takeoff'):
+            sent = self._send_time()
+            await self.system.action.takeoff()
         self.in_air = True
-    
+        return sent
+
+    async def takeoff(self):
+        fire = await self.prepare_takeoff()
+        await self.arm()
+        await fire()
+
+    async def prepare_land(self):
+        """Return the coroutine function sending the land command and waiting for the touchdown."""
+        return self._fire_land
+
+    async def _fire_land(self):
+        sent = await self.send_land()
+        await self.wait_landed()
+        return sent
+
+    async def send_land(self):
+        """Send the land command without waiting for the touchdown (see wait_landed)."""
+        self.log.info("Drone %s landing...", self.id)
+        self._record('land')
+        with self.metrics.command(self.id, 'land'):
+            sent = self._send_time()
+            await self.system.action.land()
+        return sent
+
     async def land(self):
-        print(f"Drone {self.id} landing...")
-        await self.system.action.land()
-        await self._wait_for_landed()
-        self.in_air = False
+        fire = await self.prepare_land()
+        await fire()
+
+    async def prepare_return_to_launch(self):
+        """Return the coroutine function sending the RTL command and waiting for the touchdown."""
+        return self._fire_return_to_launch
+
+    async def _fire_return_to_launch(self):
+        sent = await self.send_return_to_launch()
+        await self.wait_landed()
+        return sent
+
+    async def send_return_to_launch(self):
+        """Send the RTL command without waiting for the touchdown (see wait_landed)."""
+        self.log.info("Drone %s returning to launch...", self.id)
+        self._record('return_to_launch')
+        with self.metrics.command(self.id, 'return_to_launch'):
+            sent = self._send_time()
+            await self.system.action.return_to_launch()
+        return sent
 
     async def return_to_launch(self):
-        print(f"Drone {self.id} returning to launch...")
-        await self.system.action.return_to_launch()
-        await self._wait_for_landed()
-        self.in_air = False
+        fire = await self.prepare_return_to_launch()
+        await fire()
     
     async def _wait_for_landed(self):
-        async for state in self.system.telemetry.landed_state():
-            if state == telemetry.LandedState.ON_GROUND:
-                print(f"Drone {self.id} has landed")
-                break
+        await self.telemetry_hub.wait_for('landed_state', lambda state: state == telemetry.LandedState.ON_GROUND)
+        self.log.info("Drone %s has landed", self.id)
+
+    async def wait_landed(self):
+        """Wait for the touchdown after a land or RTL command."""
+        await self._wait_for_landed()
+        self.in_air = False
         
     async def disarm(self):
-        print(f"Disarming drone {self.id}...")
-        await self.system.action.disarm()
+        self.log.info("Disarming drone %s...", self.id)
+        self._record('disarm')
+        with self.metrics.command(self.id, 'disarm'):
+            await self.system.action.disarm()
         self.is_armed = False
         self.in_air = False
 
+    async def _wait_for_global_position(self):
+        await self.telemetry_hub.wait_for(
+            'health', lambda health: health.is_global_position_ok and health.is_home_position_ok)
+        self.log.info("-- Global position estimate OK")
+
+    async def _ready_home(self):
+        """Home position, from the readiness cache when known-good, else after waiting for the position estimate."""
+        if self.readiness.is_ready():
+            return self.readiness.home
+        self.log.info("Waiting for drone to have a global position estimate...")
+        await self._wait_for_global_position()
+        self.log.info("Fetching amsl altitude at home location....")
+        return await self.telemetry_hub.get('home')
+
+    async def prepare_goto(self, latitude_deg, longitude_deg, altitude_m):
+        """
+        Wait for the position estimate and fetch the home altitude, return the
+        coroutine function sending the goto_location (see run_goto).
+        """
+        if self.target_check is not None:
+            self.target_check(latitude_deg, longitude_deg, altitude_m)
+        terrain_info = await self._ready_home()
+        absolute_altitude = terrain_info.absolute_altitude_m
+
+        self.log.info("The detected altitude at home is %s m from the ground", absolute_altitude)
+
+        # To fly drone m above the ground plane
+        flying_alt = absolute_altitude + altitude_m
+
+        async def fire():
+            self.goto_target = (latitude_deg, longitude_deg, flying_alt)
+            self.log.info("Drone %s flying to position...", self.id)
+            self._record('goto_location', latitude_deg, longitude_deg, flying_alt, 0)
+            with self.metrics.command(self.id, 'goto_location'):
+                sent = self._send_time()
+                await self.system.action.goto_location(latitude_deg, longitude_deg, flying_alt, 0)
+            return sent
+        return fire
+
     async def run_goto(self, latitude_deg, longitude_deg, altitude_m):
         """
         Commands the drone to fly to a specified global position and altitude.
@@ -193,24 +562,32 @@ class Drone:
         Returns:
             None
         """
+        fire = await self.prepare_goto(latitude_deg, longitude_deg, altitude_m)
+        await fire()
 
-        print("Waiting for drone to have a global position estimate...")
-        async for health in self.system.telemetry.health():
-            if health.is_global_position_ok and health.is_home_position_ok:
-                print("-- Global position estimate OK")
-                break
-
-        print("Fetching amsl altitude at home location....")
-        async for terrain_info in self.system.telemetry.home():
-            absolute_altitude = terrain_info.absolute_altitude_m
-            break
-
-        print(f"The detected altitude at home is {absolute_altitude} m from the ground")
-
-        # To fly drone m above the ground plane
-        flying_alt = absolute_altitude + altitude_m
-        print(f"Drone {self.id} flying to position...")
-        await self.system.action.goto_location(latitude_deg, longitude_deg, flying_alt, 0)
+    async def prepare_orbit(self, radius_m=30, velocity_ms=2, relative_altitude=10, latitude_deg=0, longitude_deg=0, yaw_behavior=OrbitYawBehavior.HOLD_FRONT_TO_CIRCLE_CENTER):
+        """Wait for the position estimate, return the coroutine function sending the do_orbit (see run_orbit)."""
+        await self._ready_home()
+        position = self.telemetry_hub.latest('position') or await self.telemetry_hub.get('position')
+        orbit_height = position.absolute_altitude_m+relative_altitude
+        if latitude_deg == 0 and longitude_deg == 0:
+            latitude_deg = position.latitude_deg
+            longitude_deg = position.longitude_deg
+
+        async def fire():
+            self.log.info("-- Orbiting")
+            self.log.info("Do orbit at %s m height from the ground", orbit_height)
+            self._record('do_orbit', latitude_deg, longitude_deg, orbit_height, radius_m)
+            with self.metrics.command(self.id, 'do_orbit'):
+                sent = self._send_time()
+                await self.system.action.do_orbit(radius_m=radius_m,
+                                            velocity_ms=velocity_ms,
+                                            yaw_behavior=yaw_behavior,
+                                            latitude_deg=latitude_deg,
+                                            longitude_deg=longitude_deg,
+                                            absolute_altitude_m=orbit_height)
+            return sent
+        return fire
 
     async def run_orbit(self, radius_m=30, velocity_ms=2, relative_altitude=10, latitude_deg=0, longitude_deg=0, yaw_behavior=OrbitYawBehavior.HOLD_FRONT_TO_CIRCLE_CENTER):
         """
@@ -225,32 +602,75 @@ class Drone:
         Returns:
             None
         """
+        fire = await self.prepare_orbit(radius_m, velocity_ms, relative_altitude, latitude_deg, longitude_deg,
+                                        yaw_behavior)
+        await fire()
+
+    # Offboard control: the setpoints are streamed at a fixed rate by
+    # setpoint_streamer.SetpointStreamer, so sending one is not logged.
+
+    async def start_offboard(self):
+        """Switch to offboard mode; PX4 refuses it until a setpoint was sent."""
+        self.log.info("Drone %s starting offboard control...", self.id)
+        self._record('offboard_start')
+        with self.metrics.command(self.id, 'start_offboard'):
+            await self.system.offboard.start()
+
+    async def stop_offboard(self):
+        """Leave offboard mode, the drone holds its position."""
+        self.log.info("Drone %s stopping offboard control...", self.id)
+        self._record('offboard_stop')
+        with self.metrics.command(self.id, 'stop_offboard'):
+            await self.system.offboard.stop()
+
+    async def send_position_setpoint(self, latitude_deg, longitude_deg, relative_altitude_m, yaw_deg=0.0):
+        """Send one global position setpoint, altitude relative to home."""
+        self._record('position_setpoint', latitude_deg, longitude_deg, relative_altitude_m, yaw_deg)
+        await self.system.offboard.set_position_global(PositionGlobalYaw(
+            latitude_deg, longitude_deg, relative_altitude_m, yaw_deg, PositionGlobalYaw.AltitudeType.REL_HOME))
+
+    async def send_velocity_setpoint(self, north_m_s, east_m_s, down_m_s, yaw_deg=0.0):
+        """Send one NED velocity setpoint."""
+        self._record('velocity_setpoint', north_m_s, east_m_s, down_m_s, yaw_deg)
+        await self.system.offboard.set_velocity_ned(VelocityNedYaw(north_m_s, east_m_s, down_m_s, yaw_deg))
+
+    async def upload_mission(self, compiled, force=False):
+        """
+        Upload a compiled mission (see mission_upload.MissionCompiler).
 
-        print("Waiting for drone to have a global position estimate...")
-        async for health in self.system.telemetry.health():
-            if health.is_global_position_ok and health.is_home_position_ok:
-                print("-- Global position estimate OK")
-                break
-
-        position = await self.system.telemetry.position().__aiter__().__anext__()
-        orbit_height = position.absolute_altitude_m+relative_altitude
+        The key of the last mission uploaded is kept, so uploading the same
+        mission again is skipped unless forced.
 
-        print("-- Orbiting")
-        print(f"Do orbit at {orbit_height} m height from the ground")
-        if latitude_deg == 0 and longitude_deg == 0:
-            await self.system.action.do_orbit(radius_m=radius_m,
-                                        velocity_ms=velocity_ms,
-                                        yaw_behavior=yaw_behavior,
-                                        latitude_deg=position.latitude_deg,
-                                        longitude_deg=position.longitude_deg,
-                                        absolute_altitude_m=orbit_height)
-        else:
-            await self.system.action.do_orbit(radius_m=radius_m,
-                                        velocity_ms=velocity_ms,
-                                        yaw_behavior=yaw_behavior,
-                                        latitude_deg=latitude_deg,
-                                        longitude_deg=longitude_deg,
-                                        absolute_altitude_m=orbit_height)
+        Returns:
+            bool: True if uploaded, False if the drone already had this mission.
+        """
+        if not force and self.mission_key == compiled.key:
+            self.log.debug("Drone %s already has mission %s, upload skipped", self.id, compiled.key[:8])
+            return False
+        self.log.info("Drone %s uploading a mission of %s waypoints...", self.id, len(compiled))
+        self.mission_key = None  # unknown until the upload completed
+        self._record('mission_upload', len(compiled))
+        with self.metrics.command(self.id, 'upload_mission'):
+            if compiled.format == RAW:
+                await self.system.mission_raw.upload_mission(compiled.items)
+            else:
+                await self.system.mission.upload_mission(compiled.plan())
+        self.mission_key = compiled.key
+        return True
+
+    async def clear_mission(self):
+        self.log.info("Drone %s clearing its mission...", self.id)
+        self._record('mission_clear')
+        with self.metrics.command(self.id, 'clear_mission'):
+            await self.system.mission.clear_mission()
+        self.mission_key = None
+
+    async def start_mission(self):
+        """Start the uploaded mission, the drone must be armed."""
+        self.log.info("Drone %s starting its mission...", self.id)
+        self._record('mission_start')
+        with self.metrics.command(self.id, 'start_mission'):
+            await self.system.mission.start_mission()
 
     def __str__(self):
         return (f"Drone {self.id}: Connected: {self.is_connected}, "
@@ -263,11 +683,11 @@ class Drone:
         print(str(self))
 
     async def print_status_updates(self):
-        async for status in self.system.telemetry.status_text():
-            print(f"Drone {self.id} status: {status.text}")
+        async for status in self.telemetry_hub.subscribe('status_text'):
+            self.log.info("Drone %s status: %s", self.id, status.text, extra={'topic': 'status_text'})
 
     def __del__(self):
-        print(f"Drone {self.id} object is being destroyed")
+        self.log.debug("Drone %s object is being destroyed", self.id)
 
 # Handle Ctrl+C interrupt -----------------------------------------------------
 # TODO: Implement a proper way to stop the drone when the user presses Ctrl+C
@@ -280,6 +700,7 @@ class Drone:
 
 async def main():
     config = read_config()
+    setup_logging_from_config(config)
     drone = Drone(0, grpc_portbase=config['GRPC_PORT_BASE'],
                   connection_type=config['Connection_type'],
                   server_address=config['Server_host_address'],
@@ -291,9 +712,9 @@ async def main():
     await asyncio.sleep(1)
     await drone.takeoff()
     print(drone.get_position())
-    await asyncio.sleep(8)
+    await drone.wait_until(relative_altitude_above(2.0), timeout=8)
     await drone.run_goto(47.397606, 9.543060, 20)
-    await asyncio.sleep(20)
+    await drone.wait_until(reached_goto_target(1.0), timeout=20)
     print(drone.get_position())
     await drone.land()
 
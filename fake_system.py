@@ -0,0 +1,480 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+from mavsdk import action
+from mavsdk import core
+from mavsdk import mission
+from mavsdk import mission_raw
+from mavsdk import offboard
+from mavsdk import telemetry
+
+from local_frame import LocalFrame
+
+# PX4 SITL default home location
+DEFAULT_HOME = (47.397742, 8.545594, 488.0)
+
+
+def _action_error(result, origin, text=''):
+    return action.ActionError(action.ActionResult(result, text), origin)
+
+
+def _offboard_error(result, origin, text=''):
+    return offboard.OffboardError(offboard.OffboardResult(result, text), origin)
+
+
+class _FakeVehicle:
+    """Simple kinematic multicopter: straight-line legs at bounded speeds plus orbit and offboard modes."""
+
+    def __init__(self, home, max_speed_m_s, climb_rate_m_s, battery_drain_per_s):
+        self.home = home
+        self.frame = LocalFrame(*home)
+        self.max_speed_m_s = max_speed_m_s
+        self.climb_rate_m_s = climb_rate_m_s
+        self.battery_drain_per_s = battery_drain_per_s
+
+        self.pos = np.zeros(3)  # east, north, up relative to home
+        self.vel = np.zeros(3)
+        self.armed = False
+        self.on_ground = True
+        self.battery = 1.0
+        self.takeoff_altitude_m = 2.5
+        self.rtl_altitude_m = 30.0
+
+        self.legs = deque()  # (kind, target) pairs flown one after the other
+        self.orbit = None    # (center_x, center_y, radius, omega) once on the circle
+        self._pending_orbit = None
+        self.offboard = False
+        self.setpoint = None  # ('position', local target) or ('velocity', local velocity)
+        self.mission_items = []
+        self.mission_current = 0
+        self.rtl_after_mission = False
+        self._t_last = time.monotonic()
+
+    def advance(self, now=None):
+        """Integrate the vehicle state up to now."""
+        now = time.monotonic() if now is None else now
+        dt = now - self._t_last
+        if dt <= 0:
+            return
+        self._t_last = now
+        start = self.pos.copy()
+        if self.armed:
+            self.battery = max(0.0, self.battery - self.battery_drain_per_s * dt)
+
+        remaining = dt
+        while remaining > 0 and self.legs:
+            kind, target = self.legs[0]
+            delta = target - self.pos
+            t_needed = max(math.hypot(delta[0], delta[1]) / self.max_speed_m_s,
+                           abs(delta[2]) / self.climb_rate_m_s)
+            if t_needed <= remaining:
+                self.pos = target.copy()
+                remaining -= t_needed
+                self.legs.popleft()
+                self._leg_done(kind, target)
+            else:
+                self.pos = self.pos + delta * (remaining / t_needed)
+                remaining = 0
+
+        if remaining > 0 and self.offboard and self.setpoint is not None:
+            self._track_setpoint(remaining)
+
+        if remaining > 0 and self.orbit is not None:
+            cx, cy, radius, omega = self.orbit
+            angle = math.atan2(self.pos[1] - cy, self.pos[0] - cx) + omega * remaining
+            self.pos[0] = cx + radius * math.cos(angle)
+            self.pos[1] = cy + radius * math.sin(angle)
+
+        self.vel = (self.pos - start) / dt
+
+    def _track_setpoint(self, dt):
+        kind, value = self.setpoint
+        if kind == 'position':
+            # head for the setpoint at bounded speeds, reaching it if close enough
+            delta = value - self.pos
+            t_needed = max(math.hypot(delta[0], delta[1]) / self.max_speed_m_s,
+                           abs(delta[2]) / self.climb_rate_m_s)
+            self.pos = value.copy() if t_needed <= dt else self.pos + delta * (dt / t_needed)
+        else:
+            velocity = value.copy()
+            horizontal = math.hypot(velocity[0], velocity[1])
+            if horizontal > self.max_speed_m_s:
+                velocity[:2] *= self.max_speed_m_s / horizontal
+            velocity[2] = min(max(velocity[2], -self.climb_rate_m_s), self.climb_rate_m_s)
+            self.pos = self.pos + velocity * dt
+        self.pos[2] = max(self.pos[2], 0.0)
+        if self.pos[2] > 0:
+            self.on_ground = False
+
+    def _leg_done(self, kind, target):
+        if kind == 'land':
+            self.on_ground = True
+            self.armed = False  # PX4 disarms automatically after landing
+        elif kind == 'waypoint':
+            self.mission_current += 1
+        elif kind == 'orbit_entry':
+            self.orbit = self._pending_orbit
+
+    def fly(self, legs):
+        """Replace the current flight plan with the given legs."""
+        self.advance()
+        self.legs = deque((kind, np.asarray(target, dtype=np.float64)) for kind, target in legs)
+        self.orbit = None
+        self.offboard = False
+        if self.legs:
+            self.on_ground = False
+
+    @property
+    def landed_state(self):
+        if self.on_ground:
+            return telemetry.LandedState.ON_GROUND
+        kind = self.legs[0][0] if self.legs else None
+        if kind == 'land':
+            return telemetry.LandedState.LANDING
+        if kind == 'takeoff':
+            return telemetry.LandedState.TAKING_OFF
+        return telemetry.LandedState.IN_AIR
+
+    def to_local(self, lat, lon, alt_amsl):
+        return self.frame.to_local((lat, lon, alt_amsl))[0]
+
+    def global_position(self):
+        return self.frame.to_global(self.pos)[0]
+
+    def rtl_legs(self, start=None):
+        start = self.pos if start is None else start
+        z = max(start[2], self.rtl_altitude_m)
+        return [('move', (start[0], start[1], z)),
+                ('move', (0.0, 0.0, z)),
+                ('land', (0.0, 0.0, 0.0))]
+
+
+class _FakePlugin:
+    def __init__(self, system):
+        self._system = system
+        self._vehicle = system._vehicle
+
+    async def _stream(self, make, rate_hz=None):
+        period = 1.0 / (rate_hz or self._system.telemetry_rate_hz)
+        while True:
+            self._vehicle.advance()
+            yield make()
+            await asyncio.sleep(period)
+
+
+class FakeCore(_FakePlugin):
+    async def connection_state(self):
+        async for state in self._stream(lambda: core.ConnectionState(self._system._is_connected())):
+            yield state
+
+
+class FakeTelemetry(_FakePlugin):
+    async def position(self):
+        def make():
+            lat, lon, alt = self._vehicle.global_position()
+            return telemetry.Position(float(lat), float(lon), float(alt), float(self._vehicle.pos[2]))
+        async for position in self._stream(make):
+            yield position
+
+    async def home(self):
+        lat, lon, alt = self._vehicle.home
+        async for home in self._stream(lambda: telemetry.Position(lat, lon, alt, 0.0), rate_hz=1):
+            yield home
+
+    async def health(self):
+        def make():
+            ok = self._system._is_connected()
+            return telemetry.Health(ok, ok, ok, ok, ok, ok, ok)
+        async for health in self._stream(make, rate_hz=1):
+            yield health
+
+    async def armed(self):
+        async for armed in self._stream(lambda: self._vehicle.armed):
+            yield armed
+
+    async def in_air(self):
+        async for in_air in self._stream(lambda: self._vehicle.landed_state != telemetry.LandedState.ON_GROUND):
+            yield in_air
+
+    async def landed_state(self):
+        async for state in self._stream(lambda: self._vehicle.landed_state):
+            yield state
+
+    async def velocity_ned(self):
+        def make():
+            vel = self._vehicle.vel
+            return telemetry.VelocityNed(float(vel[1]), float(vel[0]), float(-vel[2]))
+        async for velocity in self._stream(make):
+            yield velocity
+
+    async def attitude_euler(self):
+        def make():
+            vel = self._vehicle.vel
+            yaw = math.degrees(math.atan2(vel[0], vel[1])) if vel[0] or vel[1] else 0.0
+            return telemetry.EulerAngle(0.0, 0.0, yaw, int(time.monotonic() * 1e6))
+        async for attitude in self._stream(make):
+            yield attitude
+
+    async def battery(self):
+        def make():
+            remaining = self._vehicle.battery
+            return telemetry.Battery(0, 25.0, 12.6 * (0.8 + 0.2 * remaining), 10.0, 5.0 * (1 - remaining), 100 * remaining)
+        async for battery in self._stream(make, rate_hz=1):
+            yield battery
+
+    async def status_text(self):
+        queue = asyncio.Queue()
+        self._system._status_queues.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._system._status_queues.remove(queue)
+
+
+class FakeAction(_FakePlugin):
+    async def _command(self, origin):
+        await self._system._delay()
+        if not self._system._is_connected():
+            raise _action_error(action.ActionResult.Result.NO_SYSTEM, origin, 'No system')
+        self._vehicle.advance()
+
+    async def arm(self):
+        await self._command('arm()')
+        self._vehicle.armed = True
+
+    async def disarm(self):
+        await self._command('disarm()')
+        if self._vehicle.landed_state != telemetry.LandedState.ON_GROUND:
+            raise _action_error(action.ActionResult.Result.COMMAND_DENIED, 'disarm()', 'Vehicle in air')
+        self._vehicle.armed = False
+
+    async def set_takeoff_altitude(self, altitude):
+        await self._command('set_takeoff_altitude()')
+        self._vehicle.takeoff_altitude_m = altitude
+
+    async def set_return_to_launch_altitude(self, relative_altitude_m):
+        await self._command('set_return_to_launch_altitude()')
+        self._vehicle.rtl_altitude_m = relative_altitude_m
+
+    async def takeoff(self):
+        await self._command('takeoff()')
+        vehicle = self._vehicle
+        if not vehicle.armed:
+            raise _action_error(action.ActionResult.Result.COMMAND_DENIED, 'takeoff()', 'Not armed')
+        vehicle.fly([('takeoff', (vehicle.pos[0], vehicle.pos[1], vehicle.takeoff_altitude_m))])
+        self._system._status('Takeoff detected')
+
+    async def land(self):
+        await self._command('land()')
+        vehicle = self._vehicle
+        vehicle.fly([('land', (vehicle.pos[0], vehicle.pos[1], 0.0))])
+        self._system._status('Landing at current position')
+
+    async def return_to_launch(self):
+        await self._command('return_to_launch()')
+        self._vehicle.fly(self._vehicle.rtl_legs())
+        self._system._status('RTL: start return at 30 m')
+
+    async def hold(self):
+        await self._command('hold()')
+        self._vehicle.fly([])
+
+    async def goto_location(self, latitude_deg, longitude_deg, absolute_altitude_m, yaw_deg):
+        await self._command('goto_location()')
+        vehicle = self._vehicle
+        if not vehicle.armed:
+            raise _action_error(action.ActionResult.Result.COMMAND_DENIED, 'goto_location()', 'Not armed')
+        vehicle.fly([('move', vehicle.to_local(latitude_deg, longitude_deg, absolute_altitude_m))])
+
+    async def do_orbit(self, radius_m, velocity_ms, yaw_behavior, latitude_deg, longitude_deg, absolute_altitude_m):
+        await self._command('do_orbit()')
+        vehicle = self._vehicle
+        if not vehicle.armed:
+            raise _action_error(action.ActionResult.Result.COMMAND_DENIED, 'do_orbit()', 'Not armed')
+        center = vehicle.to_local(latitude_deg, longitude_deg, absolute_altitude_m)
+        offset = vehicle.pos[:2] - center[:2]
+        distance = math.hypot(offset[0], offset[1])
+        angle = math.atan2(offset[1], offset[0]) if distance > 0 else 0.0
+        entry = (center[0] + radius_m * math.cos(angle), center[1] + radius_m * math.sin(angle), center[2])
+        vehicle._pending_orbit = (center[0], center[1], radius_m, velocity_ms / radius_m)
+        vehicle.fly([('orbit_entry', entry)])
+
+
+class FakeOffboard(_FakePlugin):
+    async def _setpoint(self, kind, value):
+        # setpoints are streamed: no command latency
+        if not self._system._is_connected():
+            raise _offboard_error(offboard.OffboardResult.Result.NO_SYSTEM, f'set_{kind}()', 'No system')
+        self._vehicle.advance()
+        self._vehicle.setpoint = (kind, np.asarray(value, dtype=np.float64))
+
+    async def set_position_global(self, position_global_yaw):
+        setpoint = position_global_yaw
+        vehicle = self._vehicle
+        if setpoint.altitude_type == offboard.PositionGlobalYaw.AltitudeType.AMSL:
+            target = vehicle.to_local(setpoint.lat_deg, setpoint.lon_deg, setpoint.alt_m)
+        else:
+            target = vehicle.to_local(setpoint.lat_deg, setpoint.lon_deg, vehicle.home[2])
+            target[2] = setpoint.alt_m
+        await self._setpoint('position', target)
+
+    async def set_velocity_ned(self, velocity_ned_yaw):
+        velocity = velocity_ned_yaw
+        await self._setpoint('velocity', (velocity.east_m_s, velocity.north_m_s, -velocity.down_m_s))
+
+    async def start(self):
+        await self._system._delay()
+        vehicle = self._vehicle
+        if vehicle.setpoint is None:
+            raise _offboard_error(offboard.OffboardResult.Result.NO_SETPOINT_SET, 'start()', 'No setpoint set')
+        if not vehicle.armed:
+            raise _offboard_error(offboard.OffboardResult.Result.COMMAND_DENIED, 'start()', 'Not armed')
+        vehicle.fly([])
+        vehicle.offboard = True
+
+    async def stop(self):
+        await self._system._delay()
+        self._vehicle.fly([])  # hold
+        self._vehicle.setpoint = None
+
+    async def is_active(self):
+        await self._system._delay()
+        return self._vehicle.offboard
+
+
+class FakeMission(_FakePlugin):
+    async def _transfer(self, count):
+        # the MAVLink mission protocol takes one request / item round trip per item
+        for _ in range(count + 1):
+            await self._system._delay()
+
+    async def upload_mission(self, mission_plan):
+        await self._transfer(len(mission_plan.mission_items))
+        self._vehicle.mission_items = list(mission_plan.mission_items)
+        self._vehicle.mission_current = 0
+
+    async def clear_mission(self):
+        await self._system._delay()
+        self._vehicle.mission_items = []
+        self._vehicle.mission_current = 0
+
+    async def set_return_to_launch_after_mission(self, enable):
+        await self._system._delay()
+        self._vehicle.rtl_after_mission = enable
+
+    async def start_mission(self):
+        await self._system._delay()
+        vehicle = self._vehicle
+        if not vehicle.mission_items:
+            raise mission.MissionError(
+                mission.MissionResult(mission.MissionResult.Result.NO_MISSION_AVAILABLE, 'No mission'),
+                'start_mission()')
+        if not vehicle.armed:
+            raise mission.MissionError(
+                mission.MissionResult(mission.MissionResult.Result.DENIED, 'Not armed'), 'start_mission()')
+        legs = []
+        if vehicle.landed_state == telemetry.LandedState.ON_GROUND:
+            first = vehicle.mission_items[0]
+            legs.append(('takeoff', (vehicle.pos[0], vehicle.pos[1], first.relative_altitude_m)))
+        for item in vehicle.mission_items[vehicle.mission_current:]:
+            target = vehicle.to_local(item.latitude_deg, item.longitude_deg, 0.0)
+            legs.append(('waypoint', (target[0], target[1], item.relative_altitude_m)))
+        if vehicle.rtl_after_mission:
+            legs.extend(vehicle.rtl_legs(start=legs[-1][1]))
+        vehicle.fly(legs)
+
+    async def is_mission_finished(self):
+        await self._system._delay()
+        self._vehicle.advance()
+        return self._vehicle.mission_current >= len(self._vehicle.mission_items)
+
+    async def mission_progress(self):
+        def make():
+            return mission.MissionProgress(self._vehicle.mission_current, len(self._vehicle.mission_items))
+        async for progress in self._stream(make):
+            yield progress
+
+
+class FakeMissionRaw(FakeMission):
+    MAV_CMD_NAV_WAYPOINT = 16
+
+    async def upload_mission(self, mission_items):
+        await self._transfer(len(mission_items))
+        # only the waypoints move the vehicle, the other commands are accepted and ignored
+        nan = float('nan')
+        self._vehicle.mission_items = [
+            mission.MissionItem(item.x * 1e-7, item.y * 1e-7, item.z, nan, True, nan, nan,
+                                mission.MissionItem.CameraAction.NONE, nan, nan, item.param2, nan, nan,
+                                mission.MissionItem.VehicleAction.NONE)
+            for item in mission_items if item.command == self.MAV_CMD_NAV_WAYPOINT]
+        self._vehicle.mission_current = 0
+
+    async def mission_progress(self):
+        def make():
+            return mission_raw.MissionProgress(self._vehicle.mission_current, len(self._vehicle.mission_items))
+        async for progress in self._stream(make):
+            yield progress
+
+
+class FakeSystem:
+    """
+    In-process stand-in for mavsdk.System.
+
+    Exposes the core, telemetry, action, offboard, mission and mission_raw surfaces that Drone uses,
+    backed by a simple kinematic model, so hundreds of simulated drones can run
+    in a single event loop without PX4 or mavsdk_server.
+
+    Args:
+        home (tuple): (lat, lon, alt) of the home position.
+        latency_s (float): Mean delay applied to connect and every command.
+        jitter_s (float): Uniform jitter added to the latency (+/- jitter_s).
+        telemetry_rate_hz (float): Rate of the position-like telemetry streams.
+        max_speed_m_s (float): Horizontal speed of the kinematic model.
+        climb_rate_m_s (float): Vertical speed of the kinematic model.
+        connect_delay_s (float): Time between connect() and the vehicle reporting connected.
+        battery_drain_per_s (float): Battery fraction consumed per second while armed.
+        seed (int): Seed of the latency jitter generator.
+    """
+
+    def __init__(self, home=DEFAULT_HOME, latency_s=0.0, jitter_s=0.0, telemetry_rate_hz=10,
+                 max_speed_m_s=10.0, climb_rate_m_s=3.0, connect_delay_s=0.0,
+                 battery_drain_per_s=1 / 1200, seed=None):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.telemetry_rate_hz = telemetry_rate_hz
+        self.connect_delay_s = connect_delay_s
+        self._random = random.Random(seed)
+        self._connected_at = None
+        self._status_queues = []
+        self._vehicle = _FakeVehicle(tuple(home), max_speed_m_s, climb_rate_m_s, battery_drain_per_s)
+
+        self.core = FakeCore(self)
+        self.telemetry = FakeTelemetry(self)
+        self.action = FakeAction(self)
+        self.offboard = FakeOffboard(self)
+        self.mission = FakeMission(self)
+        self.mission_raw = FakeMissionRaw(self)
+
+    async def connect(self, system_address=None):
+        await self._delay()
+        self._connected_at = time.monotonic() + self.connect_delay_s
+
+    def _is_connected(self):
+        return self._connected_at is not None and time.monotonic() >= self._connected_at
+
+    async def _delay(self):
+        delay = self.latency_s
+        if self.jitter_s:
+            delay += self._random.uniform(-self.jitter_s, self.jitter_s)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _status(self, text):
+        status = telemetry.StatusText(telemetry.StatusTextType.INFO, text)
+        for queue in self._status_queues:
+            queue.put_nowait(status)
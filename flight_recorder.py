@@ -0,0 +1,274 @@
+import json
+import mmap
+import os
+import threading
+import time
+import numpy as np
+
+# Fixed 48-byte record shared by telemetry samples and issued commands
+RECORD_DTYPE = np.dtype([
+    ('t', np.float64),         # time.monotonic() of the sample
+    ('drone_id', np.int32),
+    ('kind', np.int32),        # code from RECORD_KINDS
+    ('values', np.float64, (4,)),
+])
+
+# name -> (code, meaning of the values columns)
+RECORD_KINDS = {
+    # telemetry
+    'position': (1, ('latitude', 'longitude', 'absolute_altitude', 'relative_altitude')),
+    'velocity': (2, ('north_m_s', 'east_m_s', 'down_m_s')),
+    'attitude': (3, ('roll_deg', 'pitch_deg', 'yaw_deg')),
+    'battery': (4, ('remaining_percent', 'voltage_v')),
+    'landed_state': (5, ('state',)),
+    'armed': (6, ('armed',)),
+    'in_air': (7, ('in_air',)),
+    # commands
+    'connect': (64, ()),
+    'arm': (65, ()),
+    'disarm': (66, ()),
+    'takeoff': (67, ()),
+    'land': (68, ()),
+    'return_to_launch': (69, ()),
+    'goto_location': (70, ('latitude', 'longitude', 'absolute_altitude', 'yaw_deg')),
+    'do_orbit': (71, ('latitude', 'longitude', 'absolute_altitude', 'radius_m')),
+    'offboard_start': (72, ()),
+    'offboard_stop': (73, ()),
+    'position_setpoint': (74, ('latitude', 'longitude', 'relative_altitude', 'yaw_deg')),
+    'velocity_setpoint': (75, ('north_m_s', 'east_m_s', 'down_m_s', 'yaw_deg')),
+    'mission_upload': (76, ('items',)),
+    'mission_clear': (77, ()),
+    'mission_start': (78, ()),
+}
+KIND_NAMES = {code: name for name, (code, _) in RECORD_KINDS.items()}
+
+# sidecar index: one row per block of BLOCK_RECORDS records, plus the drones present in each block
+BLOCK_RECORDS = 4096
+BLOCK_DTYPE = np.dtype([('start', np.int64), ('count', np.int64), ('t_min', np.float64), ('t_max', np.float64)])
+BLOCK_DRONE_DTYPE = np.dtype([('block', np.int64), ('drone_id', np.int32), ('count', np.int32)])
+
+
+def _paths(path):
+    base = os.path.splitext(path)[0]
+    return path, base + '.meta.json', base + '.blocks.npy', base + '.drones.npy'
+
+
+class FlightRecorder:
+    """
+    Append-only binary flight recorder backed by a memory-mapped file.
+
+    Every record is a fixed RECORD_DTYPE row written straight into the mapped
+    file, so recording costs a few array stores on the event loop. A background
+    thread flushes the mapping and maintains the sidecar files: a JSON metadata
+    file (record count, kind codes, wall-clock offset) and a per-block index by
+    time and drone id used by FlightLog to load a time range without parsing
+    the whole log.
+
+    Args:
+        path (str): Path of the binary log (sidecars are written next to it).
+        chunk_records (int): The file grows by this many records at a time.
+        flush_interval (float): Seconds between background flushes.
+    """
+
+    def __init__(self, path, chunk_records=1 << 20, flush_interval=1.0):
+        self.path = path
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self.wall_clock_offset = time.time() - time.monotonic()
+        self._file = open(path, 'w+b')
+        self._mmap = None
+        self._records = None
+        self._capacity = 0
+        self._count = 0
+        self._indexed_blocks = []
+        self._block_drones = []
+        self._indexed = 0  # records covered by the index
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._grow()
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name='flight-recorder', daemon=True)
+        self._thread.start()
+
+    def _grow(self):
+        with self._lock:
+            self._capacity += self.chunk_records
+            self._file.truncate(self._capacity * RECORD_DTYPE.itemsize)
+            # the previous mapping is released once nothing references it any more
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity * RECORD_DTYPE.itemsize)
+            self._records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE)
+            self._t = self._records['t']
+            self._drone_id = self._records['drone_id']
+            self._kind = self._records['kind']
+            self._values = self._records['values']
+
+    def record(self, drone_id, kind, *values, t=None):
+        """Append one record of the given kind (a key of RECORD_KINDS)."""
+        if self._count == self._capacity:
+            self._grow()
+        i = self._count
+        self._t[i] = time.monotonic() if t is None else t
+        self._drone_id[i] = drone_id
+        self._kind[i] = RECORD_KINDS[kind][0]
+        row = self._values[i]
+        row[:len(values)] = values
+        self._count = i + 1
+
+    record_telemetry = record
+    record_command = record
+
+    def __len__(self):
+        return self._count
+
+    def _index_until(self, records, count, final=False):
+        # index complete blocks (and the trailing partial block on close)
+        while self._indexed < count:
+            end = min(self._indexed + BLOCK_RECORDS, count)
+            if end - self._indexed < BLOCK_RECORDS and not final:
+                break
+            block = records[self._indexed:end]
+            self._indexed_blocks.append((self._indexed, end - self._indexed, block['t'].min(), block['t'].max()))
+            ids, counts = np.unique(block['drone_id'], return_counts=True)
+            block_number = len(self._indexed_blocks) - 1
+            self._block_drones.extend((block_number, drone_id, n) for drone_id, n in zip(ids, counts))
+            self._indexed = end
+
+    def flush(self, final=False):
+        """Flush the mapping to disk and rewrite the sidecar files."""
+        with self._flush_lock:
+            self._flush(final)
+
+    def _flush(self, final):
+        with self._lock:
+            mapping, records, count = self._mmap, self._records, self._count
+        mapping.flush()
+        self._index_until(records, count, final)
+
+        path, meta_path, blocks_path, drones_path = _paths(self.path)
+        np.save(blocks_path, np.array(self._indexed_blocks, dtype=BLOCK_DTYPE))
+        np.save(drones_path, np.array(self._block_drones, dtype=BLOCK_DRONE_DTYPE))
+        meta = {
+            'record_dtype': RECORD_DTYPE.descr,
+            'count': count,
+            'indexed': self._indexed,
+            'block_records': BLOCK_RECORDS,
+            'wall_clock_offset': self.wall_clock_offset,
+            'kinds': {name: {'code': code, 'values': list(fields)} for name, (code, fields) in RECORD_KINDS.items()},
+        }
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread, index the remaining records and trim the file."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush(final=True)
+        self._records = self._t = self._drone_id = self._kind = self._values = None
+        self._mmap.close()
+        self._file.truncate(self._count * RECORD_DTYPE.itemsize)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FlightLog:
+    """
+    Reader for the logs written by FlightRecorder.
+
+    The log is memory-mapped and the sidecar index selects the blocks that
+    overlap the requested time range and drones, so only those pages are read.
+
+    Example:
+        log = FlightLog('flight.bin')
+        positions = log.read(t_start, t_end, drone_ids=[1, 2], kinds=['position'])
+    """
+
+    def __init__(self, path):
+        path, meta_path, blocks_path, drones_path = _paths(path)
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        self.wall_clock_offset = self.meta['wall_clock_offset']
+        count = self.meta['count']
+        self.records = (np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+                        if count else np.zeros(0, dtype=RECORD_DTYPE))
+        self.blocks = np.load(blocks_path)
+        self.block_drones = np.load(drones_path)
+        self.indexed = self.meta['indexed']
+
+    def __len__(self):
+        return len(self.records)
+
+    def _candidate_ranges(self, t_start, t_end, drone_ids):
+        blocks = self.blocks
+        selected = np.ones(len(blocks), dtype=bool)
+        if t_start is not None:
+            selected &= blocks['t_max'] >= t_start
+        if t_end is not None:
+            selected &= blocks['t_min'] <= t_end
+        if drone_ids is not None:
+            with_drone = np.zeros(len(blocks), dtype=bool)
+            rows = self.block_drones[np.isin(self.block_drones['drone_id'], drone_ids)]
+            with_drone[rows['block']] = True
+            selected &= with_drone
+        ranges = [(int(b['start']), int(b['start'] + b['count'])) for b in blocks[selected]]
+        if self.indexed < len(self.records):
+            ranges.append((self.indexed, len(self.records)))  # records not covered by the index yet
+        return ranges
+
+    def read(self, t_start=None, t_end=None, drone_ids=None, kinds=None):
+        """
+        Load the records in [t_start, t_end] (monotonic time) as a structured array.
+
+        Args:
+            t_start, t_end (float): Time range, None for open-ended.
+            drone_ids (list): Only these drones, None for all.
+            kinds (list): Only these record kinds (keys of RECORD_KINDS), None for all.
+        """
+        parts = []
+        codes = None if kinds is None else [RECORD_KINDS[kind][0] for kind in kinds]
+        for start, end in self._candidate_ranges(t_start, t_end, drone_ids):
+            chunk = self.records[start:end]
+            mask = np.ones(len(chunk), dtype=bool)
+            if t_start is not None:
+                mask &= chunk['t'] >= t_start
+            if t_end is not None:
+                mask &= chunk['t'] <= t_end
+            if drone_ids is not None:
+                mask &= np.isin(chunk['drone_id'], drone_ids)
+            if codes is not None:
+                mask &= np.isin(chunk['kind'], codes)
+            parts.append(np.asarray(chunk[mask]))
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def read_kind(self, kind, t_start=None, t_end=None, drone_ids=None):
+        """
+        Load the records of one kind as a dict of named columns.
+
+        Returns:
+            dict with 't', 'drone_id' and one array per value of the kind (see RECORD_KINDS).
+        """
+        records = self.read(t_start, t_end, drone_ids, kinds=[kind])
+        columns = {'t': records['t'], 'drone_id': records['drone_id']}
+        for i, name in enumerate(RECORD_KINDS[kind][1]):
+            columns[name] = records['values'][:, i]
+        return columns
+
+    def time_range(self):
+        """(first, last) monotonic time stored in the log."""
+        if not len(self.records):
+            return None
+        return float(self.records['t'][0]), float(self.records['t'][-1])
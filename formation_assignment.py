@@ -0,0 +1,192 @@
+import numpy as np
+
+SUM = 'sum'                  # minimum total travel distance
+SUM_SQUARED = 'sum_squared'  # minimum total squared distance (discourages long crossing legs)
+BOTTLENECK = 'bottleneck'    # minimum longest travel distance, then minimum total among those
+ORDER = 'order'              # i-th drone to the i-th slot (no assignment)
+OBJECTIVES = (SUM, SUM_SQUARED, BOTTLENECK, ORDER)
+
+
+def _column_reduction(cost, row4col, col4row):
+    # give every column to its cheapest row while that row is free, cheapest columns first
+    n, m = cost.shape
+    best_rows = cost.argmin(axis=0)
+    best = cost[best_rows, np.arange(m)]
+    for j in np.argsort(best, kind='stable'):
+        i = best_rows[j]
+        if col4row[i] == -1:
+            col4row[i] = j
+            row4col[j] = i
+
+
+def _augment(path, row4col, col4row, start, sink):
+    j = sink
+    while True:
+        i = path[j]
+        row4col[j] = i
+        col4row[i], j = j, col4row[i]
+        if i == start:
+            return
+
+
+def _solve_sum(cost):
+    """Shortest augmenting path solver (Jonker-Volgenant / Crouse) for n <= m."""
+    n, m = cost.shape
+    u = np.zeros(n)
+    v = np.zeros(m)
+    row4col = np.full(m, -1)
+    col4row = np.full(n, -1)
+    if n == m:
+        # warm start; with spare columns the duals of the unused ones must stay at zero
+        v = cost.min(axis=0)
+        _column_reduction(cost, row4col, col4row)
+
+    for start in np.flatnonzero(col4row == -1):
+        # Dijkstra on the reduced costs, one row of the cost matrix per step;
+        # visited columns are blocked with +inf so every step is a few array ops
+        shortest = np.full(m, np.inf)
+        final = np.empty(m)
+        blocked = np.zeros(m)
+        path = np.full(m, -1)
+        visited_rows = []
+        visited_cols = []
+        i = start
+        min_value = 0.0
+        while True:
+            reduced = cost[i] - (u[i] - min_value) - v + blocked
+            better = reduced < shortest
+            path[better] = i
+            np.minimum(shortest, reduced, out=shortest)
+            j = int(shortest.argmin())
+            min_value = shortest[j]
+            final[j] = min_value
+            shortest[j] = np.inf
+            blocked[j] = np.inf
+            visited_cols.append(j)
+            i = row4col[j]
+            if i == -1:
+                break
+            visited_rows.append(i)
+
+        # update the dual variables, then flip the augmenting path
+        u[start] += min_value
+        if visited_rows:
+            rows = np.array(visited_rows)
+            u[rows] += min_value - final[col4row[rows]]
+        cols = np.array(visited_cols)
+        v[cols] -= min_value - final[cols]
+        _augment(path, row4col, col4row, start, j)
+    return col4row
+
+
+def _bottleneck_value(cost):
+    """Smallest threshold T such that a complete assignment exists using only costs <= T (n <= m)."""
+    n, m = cost.shape
+    row4col = np.full(m, -1)
+    col4row = np.full(n, -1)
+    threshold = -np.inf
+    if n == m:
+        # every column is used, so the cheapest entry of each column is a lower bound
+        _column_reduction(cost, row4col, col4row)
+        threshold = cost.min(axis=0).max()
+
+    for start in np.flatnonzero(col4row == -1):
+        # minimax Dijkstra: the value of a path is its most expensive edge
+        best = np.full(m, np.inf)
+        blocked = np.zeros(m)
+        path = np.full(m, -1)
+        i = start
+        level = -np.inf
+        while True:
+            value = np.maximum(cost[i], level) + blocked
+            better = value < best
+            path[better] = i
+            np.minimum(best, value, out=best)
+            j = int(best.argmin())
+            level = best[j]
+            best[j] = np.inf
+            blocked[j] = np.inf
+            i = row4col[j]
+            if i == -1:
+                break
+        threshold = max(threshold, level)
+        _augment(path, row4col, col4row, start, j)
+    return threshold
+
+
+def linear_sum_assignment(cost):
+    """
+    Minimum-cost assignment of the rows of a cost matrix to distinct columns.
+
+    Pure NumPy shortest augmenting path solver, with the same conventions as
+    scipy.optimize.linear_sum_assignment: a rectangular matrix assigns
+    min(n, m) pairs.
+
+    Args:
+        cost (array_like): (n, m) matrix of finite costs.
+
+    Returns:
+        tuple: (rows, cols) index arrays, sorted by row.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = linear_sum_assignment(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+    col4row = _solve_sum(cost)
+    return np.arange(cost.shape[0]), col4row
+
+
+def bottleneck_assignment(cost):
+    """
+    Assignment minimizing the largest cost, then the total cost among those.
+
+    Returns:
+        tuple: (rows, cols, bottleneck) with the same conventions as linear_sum_assignment.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), None
+    small = cost if cost.shape[0] <= cost.shape[1] else cost.T
+    threshold = _bottleneck_value(small)
+    # forbid everything above the bottleneck with a cost no feasible assignment can reach
+    penalty = (np.abs(cost).max() + 1) * (min(cost.shape) + 1)
+    rows, cols = linear_sum_assignment(np.where(cost > threshold, penalty, cost))
+    return rows, cols, threshold
+
+
+def assign_slots(positions, slots, objective=SUM):
+    """
+    Choose a formation slot for every drone.
+
+    Args:
+        positions (array_like): (N, 3) current local positions of the drones; rows
+            with NaN (no telemetry yet) may take any slot.
+        slots (array_like): (M, 3) local coordinates of the slots.
+        objective (str): One of OBJECTIVES.
+
+    Returns:
+        numpy.ndarray: (N,) slot index of each drone, -1 for drones left without a
+        slot when there are more drones than slots.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    slots = np.asarray(slots, dtype=np.float64).reshape(-1, 3)
+    n, m = len(positions), len(slots)
+    assignment = np.full(n, -1)
+    if objective == ORDER:
+        k = min(n, m)
+        assignment[:k] = np.arange(k)
+        return assignment
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid assignment objective '{objective}', expected one of {OBJECTIVES}")
+
+    distance = np.linalg.norm(positions[:, None, :] - slots[None, :, :], axis=2)
+    distance[np.isnan(distance)] = 0.0
+    if objective == BOTTLENECK:
+        rows, cols, _ = bottleneck_assignment(distance)
+    else:
+        rows, cols = linear_sum_assignment(distance ** 2 if objective == SUM_SQUARED else distance)
+    assignment[rows] = cols
+    return assignment
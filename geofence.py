@@ -0,0 +1,229 @@
+import asyncio
+import inspect
+import time
+
+import numpy as np
+
+from periodic_check import PeriodicCheck
+from swarm_logging import get_logger
+
+log = get_logger('geofence')
+
+KEEP_IN = 'keep_in'    # the drones must stay inside one of these zones
+KEEP_OUT = 'keep_out'  # the drones must never enter these zones
+ZONE_TYPES = (KEEP_IN, KEEP_OUT)
+
+OUTSIDE_KEEP_IN = -1   # zone index reported for a point outside every keep-in zone
+
+CHUNK_BUDGET = 1_000_000  # (points x edges) compared at once
+
+
+class GeofenceError(Exception):
+    """A command was rejected because its target breaches the geofence."""
+
+
+class Zone:
+    """
+    Polygonal zone with an altitude band, in the local frame of the swarm.
+
+    Args:
+        polygon (array_like): (M, 2) vertices (x east, y north) in meters, M >= 3,
+            in either winding order.
+        kind (str): KEEP_IN or KEEP_OUT.
+        floor (float): Lowest z of the zone (above the origin) in meters.
+        ceiling (float): Highest z of the zone in meters.
+        name (str): Name used in the messages.
+    """
+
+    def __init__(self, polygon, kind=KEEP_IN, floor=-np.inf, ceiling=np.inf, name=None):
+        polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        if len(polygon) < 3:
+            raise ValueError(f"A geofence zone needs at least 3 vertices, got {len(polygon)}")
+        if kind not in ZONE_TYPES:
+            raise ValueError(f"Invalid zone type '{kind}', expected one of {ZONE_TYPES}")
+        self.polygon = polygon
+        self.kind = kind
+        self.floor = floor
+        self.ceiling = ceiling
+        self.name = name
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(options['polygon'],
+                   kind=options.get('type', KEEP_IN),
+                   floor=options.get('floor_m', -np.inf),
+                   ceiling=options.get('ceiling_m', np.inf),
+                   name=options.get('name'))
+
+
+class Geofence:
+    """
+    Vectorized keep-in / keep-out check of many points against many zones.
+
+    The edges of every zone are stored once as flat arrays; a check casts a
+    ray from every point across every edge in one pass and counts the
+    crossings per zone (even-odd rule), then applies the altitude bands. A
+    point is allowed when it lies in at least one keep-in zone (if there are
+    any) and in no keep-out zone. Drone positions and commanded targets are
+    checked the same way.
+
+    Args:
+        zones (list): Zone objects.
+    """
+
+    def __init__(self, zones):
+        self.zones = list(zones)
+        polygons = [zone.polygon for zone in self.zones]
+        starts = np.concatenate(polygons) if polygons else np.zeros((0, 2))
+        ends = np.concatenate([np.roll(polygon, -1, axis=0) for polygon in polygons]) if polygons else starts
+        self._x0, self._y0 = starts[:, 0], starts[:, 1]
+        self._x1, self._y1 = ends[:, 0], ends[:, 1]
+        dy = self._y1 - self._y0
+        # x of the crossing of each edge = x0 + (y - y0) * slope; horizontal edges never cross
+        self._slope = np.divide(self._x1 - self._x0, dy, out=np.zeros_like(dy), where=dy != 0)
+        self._offsets = np.cumsum([0] + [len(polygon) for polygon in polygons])[:-1]
+        self._floor = np.array([zone.floor for zone in self.zones], dtype=np.float64)
+        self._ceiling = np.array([zone.ceiling for zone in self.zones], dtype=np.float64)
+        self._keep_out = np.array([zone.kind == KEEP_OUT for zone in self.zones], dtype=bool)
+        self._has_keep_in = not self._keep_out.all()
+
+    @classmethod
+    def from_config(cls, options):
+        return cls([Zone.from_config(zone) for zone in options.get('zones', [])])
+
+    def __len__(self):
+        return len(self.zones)
+
+    def inside(self, points):
+        """(N, Z) whether every point lies inside every zone (polygon and altitude band)."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        inside = np.zeros((len(points), len(self.zones)), dtype=bool)
+        if not len(self.zones):
+            return inside
+        chunk = max(1, CHUNK_BUDGET // len(self._x0))
+        for start in range(0, len(points), chunk):
+            x = points[start:start + chunk, 0:1]
+            y = points[start:start + chunk, 1:2]
+            straddles = (self._y0 > y) != (self._y1 > y)
+            crossings = straddles & (x < self._x0 + (y - self._y0) * self._slope)
+            inside[start:start + chunk] = np.add.reduceat(crossings, self._offsets, axis=1) % 2 == 1
+        z = points[:, 2:3]
+        return inside & (z >= self._floor) & (z <= self._ceiling)
+
+    def check(self, points):
+        """
+        Check points against the geofence; points with NaN (unknown position) are allowed.
+
+        Returns:
+            tuple: (N,) bool allowed, and (N,) index of the zone breached: the
+            keep-out zone containing the point, OUTSIDE_KEEP_IN when it lies
+            outside every keep-in zone (meaningless where allowed).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(self.zones):
+            return np.ones(len(points), dtype=bool), np.full(len(points), OUTSIDE_KEEP_IN)
+        inside = self.inside(points)
+        in_keep_out = inside & self._keep_out
+        zone = np.where(in_keep_out.any(axis=1), in_keep_out.argmax(axis=1), OUTSIDE_KEEP_IN)
+        allowed = ~in_keep_out.any(axis=1)
+        if self._has_keep_in:
+            allowed &= (inside & ~self._keep_out).any(axis=1)
+        allowed |= np.isnan(points).any(axis=1)
+        return allowed, zone
+
+    def describe(self, zone):
+        """Text of a breach reported by check."""
+        if zone == OUTSIDE_KEEP_IN:
+            return "outside the keep-in zones"
+        return f"inside keep-out zone '{self.zones[zone].name or zone}'"
+
+    def validate(self, points, labels=None):
+        """
+        Raise GeofenceError if any point breaches the geofence.
+
+        Args:
+            points (array_like): (N, 3) local points, e.g. commanded targets.
+            labels (list): Name of each point in the message, e.g. the drone ids.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        allowed, zone = self.check(points)
+        if allowed.all():
+            return
+        rejected = np.flatnonzero(~allowed).tolist()
+        labels = labels if labels is not None else [f'target {index}' for index in range(len(points))]
+        details = ', '.join(f"{labels[index]} {tuple(np.round(points[index], 1).tolist())} "
+                            f"{self.describe(zone[index])}" for index in rejected[:5])
+        more = f" and {len(rejected) - 5} more" if len(rejected) > 5 else ""
+        raise GeofenceError(f"{len(rejected)} target(s) breach the geofence: {details}{more}")
+
+
+class GeofenceMonitor(PeriodicCheck):
+    """
+    Checks the live positions of the swarm against a Geofence at the telemetry rate.
+
+    Every check evaluates all drones in one pass; a drone entering a breach
+    triggers the breach callbacks once, callback(drone_id, zone, position),
+    and is reported again only after it came back inside the fence.
+    Coroutine callbacks run as tasks without blocking the checks; stop()
+    cancels those still running.
+
+    Args:
+        geofence (Geofence): Zones to enforce.
+        positions (callable): () -> (drone ids (N,), local positions (N, 3)), or None when unknown yet.
+        rate_hz (float): Checks per second.
+    """
+
+    def __init__(self, geofence, positions, rate_hz=10.0):
+        super().__init__('geofence', rate_hz)
+        self.geofence = geofence
+        self.positions = positions
+        self.breaches = {}  # drone id -> zone index of the drones currently breaching
+        self.callbacks = []
+        self._callback_tasks = set()  # running coroutine callbacks, referenced until done
+
+    def add_callback(self, callback):
+        """Register callback(drone_id, zone, position), a function or a coroutine function."""
+        self.callbacks.append(callback)
+
+    def check(self):
+        """
+        Run one check now.
+
+        Returns:
+            dict: drone id -> zone index of the drones that started breaching.
+        """
+        current = self.positions()
+        if current is None or not len(self.geofence):
+            return {}
+        start = time.perf_counter()
+        ids, positions = current
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        allowed, zone = self.geofence.check(positions)
+        breaching = {drone_id: int(zone[index]) for index, drone_id in enumerate(ids) if not allowed[index]}
+        started = {drone_id: zone for drone_id, zone in breaching.items() if drone_id not in self.breaches}
+        self.breaches = breaching
+        self._observe(start)
+        index = {drone_id: position for drone_id, position in zip(ids, positions.tolist())}
+        for drone_id, zone in started.items():
+            log.error("Drone %s breached the geofence: %s at %s", drone_id, self.geofence.describe(zone),
+                      tuple(round(value, 1) for value in index[drone_id]))
+            for callback in self.callbacks:
+                result = callback(drone_id, zone, index[drone_id])
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._callback_tasks.add(task)
+                    task.add_done_callback(self._callback_done)
+        return started
+
+    def _callback_done(self, task):
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Geofence breach callback failed: %s", task.exception())
+
+    def stop(self):
+        super().stop()
+        for task in list(self._callback_tasks):
+            task.cancel()
+
+    def stats(self):
+        return dict(super().stats(), breaches=len(self.breaches))
@@ -0,0 +1,224 @@
+import asyncio
+import bisect
+import math
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INTERARRIVAL_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+JITTER_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style upper bounds, plus +Inf)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for upper, n in zip(self.buckets + (self.max,), self.counts):
+            if n and seen + n >= rank:
+                return lower + (min(upper, self.max) - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max if self.count else None,
+        }
+
+
+class _CommandTimer:
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics = self.metrics
+        if exc_type is None:
+            if self.key not in metrics.command_latency:
+                metrics.command_latency[self.key] = Histogram(LATENCY_BUCKETS)
+            metrics.command_latency[self.key].observe(time.perf_counter() - self.start)
+        elif not issubclass(exc_type, asyncio.CancelledError):
+            metrics.failures[self.key] = metrics.failures.get(self.key, 0) + 1
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    In-process registry of command and telemetry instrumentation.
+
+    Keys are (drone_id, command) or (drone_id, topic). While disabled every
+    hook returns after a single attribute check.
+
+    Example:
+        with metrics.command(drone.id, 'takeoff'):
+            await drone.system.action.takeoff()
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.command_latency = {}
+        self.failures = {}
+        self.retries = {}
+        self.telemetry_interarrival = {}
+        self.telemetry_last = {}  # (drone_id, topic) -> time.monotonic() of the last sample
+
+    def command(self, drone_id, command):
+        """Context manager timing one command; an exception counts as a failure."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _CommandTimer(self, (drone_id, command))
+
+    def retry(self, drone_id, command):
+        if self.enabled:
+            key = (drone_id, command)
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def failure(self, drone_id, command):
+        if self.enabled:
+            key = (drone_id, command)
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+    def telemetry(self, drone_id, topic, now=None):
+        """Register the arrival of one telemetry sample."""
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        key = (drone_id, topic)
+        last = self.telemetry_last.get(key)
+        if last is not None:
+            if key not in self.telemetry_interarrival:
+                self.telemetry_interarrival[key] = Histogram(INTERARRIVAL_BUCKETS)
+            self.telemetry_interarrival[key].observe(now - last)
+        self.telemetry_last[key] = now
+
+    def staleness(self, now=None):
+        """Seconds since the last sample of every (drone_id, topic)."""
+        now = time.monotonic() if now is None else now
+        return {key: now - last for key, last in self.telemetry_last.items()}
+
+    def reset(self):
+        self.command_latency.clear()
+        self.failures.clear()
+        self.retries.clear()
+        self.telemetry_interarrival.clear()
+        self.telemetry_last.clear()
+
+    def snapshot(self):
+        """Plain-dict view of every metric, grouped by drone id."""
+        drones = {}
+
+        def entry(drone_id, group, name):
+            return drones.setdefault(drone_id, {}).setdefault(group, {}).setdefault(name, {})
+
+        for (drone_id, command), histogram in self.command_latency.items():
+            entry(drone_id, 'commands', command).update(histogram.summary())
+        for (drone_id, command), n in self.failures.items():
+            entry(drone_id, 'commands', command)['failures'] = n
+        for (drone_id, command), n in self.retries.items():
+            entry(drone_id, 'commands', command)['retries'] = n
+        for (drone_id, topic), histogram in self.telemetry_interarrival.items():
+            stats = entry(drone_id, 'telemetry', topic)
+            stats['interarrival'] = histogram.summary()
+            stats['rate_hz'] = histogram.count / histogram.sum if histogram.sum else None
+        for (drone_id, topic), age in self.staleness().items():
+            entry(drone_id, 'telemetry', topic)['staleness_s'] = age
+        return drones
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, help_text, label, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (drone_id, value), h in sorted(series.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+                labels = f'drone="{drone_id}",{label}="{value}"'
+                cumulative = 0
+                for upper, n in zip(h.buckets + (math.inf,), h.counts):
+                    cumulative += n
+                    le = '+Inf' if upper == math.inf else repr(upper)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {h.sum}')
+                lines.append(f'{name}_count{{{labels}}} {h.count}')
+
+        def series(name, kind, help_text, label, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (drone_id, value), n in sorted(values.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+                lines.append(f'{name}{{drone="{drone_id}",{label}="{value}"}} {n}')
+
+        histogram('drone_command_latency_seconds', 'Latency of drone commands.', 'command', self.command_latency)
+        series('drone_command_failures_total', 'counter', 'Failed drone commands.', 'command', self.failures)
+        series('drone_command_retries_total', 'counter', 'Retried drone commands.', 'command', self.retries)
+        histogram('drone_telemetry_interarrival_seconds', 'Time between telemetry samples.', 'topic',
+                  self.telemetry_interarrival)
+        series('drone_telemetry_staleness_seconds', 'gauge', 'Age of the latest telemetry sample.', 'topic',
+               self.staleness())
+        return '\n'.join(lines) + '\n'
+
+    async def start_http_server(self, port=9100, host='127.0.0.1'):
+        """
+        Serve render_prometheus() on http://host:port/metrics from the running event loop.
+
+        Returns:
+            asyncio.Server: Close it to stop serving.
+        """
+        async def handle(reader, writer):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # skip the headers
+                path = request.split()[1] if len(request.split()) > 1 else b'/'
+                if path == b'/metrics':
+                    status, body = '200 OK', self.render_prometheus().encode()
+                else:
+                    status, body = '404 Not Found', b'Not Found\n'
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+
+# Shared registry used by drones that are not given their own
+METRICS = Metrics(enabled=False)
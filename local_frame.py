@@ -0,0 +1,221 @@
+import math
+import numpy as np
+
+EARTH_RADIUS = 6378137.0  # Earth's radius in meters
+
+# WGS-84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_EP2 = (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+
+FAST = 'fast'
+ECEF = 'ecef'
+FRAME_MODES = (FAST, ECEF)
+
+
+def geodetic_to_ecef(lat_deg, lon_deg, alt_m):
+    """
+    Convert WGS-84 geodetic coordinates to ECEF.
+
+    Args:
+    lat_deg, lon_deg, alt_m: arrays (or scalars) of latitude, longitude and ellipsoidal height
+
+    Returns:
+    ndarray of shape (N, 3) with (X, Y, Z) rows in meters
+    """
+    lat = np.radians(np.asarray(lat_deg, dtype=np.float64))
+    lon = np.radians(np.asarray(lon_deg, dtype=np.float64))
+    alt = np.asarray(alt_m, dtype=np.float64)
+
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+
+    ecef = np.empty((lat.size, 3))
+    ecef[:, 0] = ((n + alt) * cos_lat * np.cos(lon)).ravel()
+    ecef[:, 1] = ((n + alt) * cos_lat * np.sin(lon)).ravel()
+    ecef[:, 2] = ((n * (1 - WGS84_E2) + alt) * sin_lat).ravel()
+    return ecef
+
+
+def ecef_to_geodetic(ecef):
+    """
+    Convert ECEF coordinates to WGS-84 geodetic coordinates (Heikkinen's closed form).
+
+    Args:
+    ecef: array-like of shape (N, 3) with (X, Y, Z) rows in meters
+
+    Returns:
+    ndarray of shape (N, 3) with (lat, lon, alt) rows
+    """
+    ecef = np.asarray(ecef, dtype=np.float64).reshape(-1, 3)
+    x, y, z = ecef[:, 0], ecef[:, 1], ecef[:, 2]
+    a, b, e2 = WGS84_A, WGS84_B, WGS84_E2
+
+    p = np.hypot(x, y)
+    f = 54 * b ** 2 * z ** 2
+    g = p ** 2 + (1 - e2) * z ** 2 - e2 * (a ** 2 - b ** 2)
+    c = e2 ** 2 * f * p ** 2 / g ** 3
+    s = np.cbrt(1 + c + np.sqrt(c ** 2 + 2 * c))
+    k = s + 1 + 1 / s
+    big_p = f / (3 * k ** 2 * g ** 2)
+    q = np.sqrt(1 + 2 * e2 ** 2 * big_p)
+    r0 = (-(big_p * e2 * p) / (1 + q)
+          + np.sqrt(a ** 2 / 2 * (1 + 1 / q)
+                    - big_p * (1 - e2) * z ** 2 / (q * (1 + q))
+                    - big_p * p ** 2 / 2))
+    u = np.hypot(p - e2 * r0, z)
+    v = np.sqrt((p - e2 * r0) ** 2 + (1 - e2) * z ** 2)
+    z0 = b ** 2 * z / (a * v)
+
+    geodetic = np.empty_like(ecef)
+    geodetic[:, 0] = np.degrees(np.arctan2(z + WGS84_EP2 * z0, p))
+    geodetic[:, 1] = np.degrees(np.arctan2(y, x))
+    geodetic[:, 2] = u * (1 - b ** 2 / (a * v))
+    return geodetic
+
+
+def distance_m(lat1, lon1, alt1, lat2, lon2, alt2):
+    """
+    Approximate 3D distance in meters between two nearby global positions (equirectangular).
+    """
+    mean_lat = math.radians((lat1 + lat2) / 2)
+    dx = EARTH_RADIUS * math.radians(lon2 - lon1) * math.cos(mean_lat)
+    dy = EARTH_RADIUS * math.radians(lat2 - lat1)
+    return math.sqrt(dx * dx + dy * dy + (alt2 - alt1) ** 2)
+
+
+class LocalFrame:
+    """
+    East-North-Up projection around a fixed origin.
+
+    The frame is built once per origin and caches every term that only depends
+    on it, so converting a point costs a few multiply-adds.
+
+    Modes:
+    'fast': equirectangular approximation (the historical global_to_local / local_to_global)
+    'ecef': exact WGS-84 geodetic -> ECEF -> ENU rotation
+    """
+
+    def __init__(self, origin_lat, origin_lon, origin_alt=0, mode=FAST):
+        if mode not in FRAME_MODES:
+            raise ValueError(f"Invalid frame mode '{mode}', expected one of {FRAME_MODES}")
+        self.origin_lat = origin_lat
+        self.origin_lon = origin_lon
+        self.origin_alt = origin_alt
+        self.mode = mode
+
+        # equirectangular terms
+        self._lat0_rad = math.radians(origin_lat)
+        self._lat_scale = math.degrees(1.0 / EARTH_RADIUS)
+        self._lon_scale = math.degrees(1.0 / (EARTH_RADIUS * math.cos(self._lat0_rad)))
+
+        # ECEF -> ENU rotation, built on first use of the exact mode
+        self._rotation = None
+        self._origin_ecef = None
+        if mode == ECEF:
+            self._build_ecef_terms()
+
+    def _build_ecef_terms(self):
+        sin_lat, cos_lat = math.sin(self._lat0_rad), math.cos(self._lat0_rad)
+        lon0_rad = math.radians(self.origin_lon)
+        sin_lon, cos_lon = math.sin(lon0_rad), math.cos(lon0_rad)
+        self._rotation = np.array([
+            [-sin_lon, cos_lon, 0.0],
+            [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+            [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat],
+        ])
+        self._origin_ecef = geodetic_to_ecef(self.origin_lat, self.origin_lon, self.origin_alt)[0]
+
+    def has_origin(self, lat, lon, alt=0):
+        """Check whether the frame was built for the given origin."""
+        return (self.origin_lat, self.origin_lon, self.origin_alt) == (lat, lon, alt)
+
+    def to_local(self, global_coords, mode=None):
+        """
+        Convert global coordinates to local coordinates.
+
+        Args:
+        global_coords: array-like of shape (N, 3) with (lat, lon, alt) rows
+        mode: override the frame mode for this call
+
+        Returns:
+        ndarray of shape (N, 3) with (x, y, z) rows (east, north, up)
+        """
+        coords = np.asarray(global_coords, dtype=np.float64).reshape(-1, 3)
+        if (mode or self.mode) == ECEF:
+            if self._rotation is None:
+                self._build_ecef_terms()
+            ecef = geodetic_to_ecef(coords[:, 0], coords[:, 1], coords[:, 2])
+            return (ecef - self._origin_ecef) @ self._rotation.T
+
+        lat = coords[:, 0]
+        local = np.empty_like(coords)
+        local[:, 0] = (EARTH_RADIUS * np.radians(coords[:, 1] - self.origin_lon)
+                       * np.cos((self._lat0_rad + np.radians(lat)) / 2))
+        local[:, 1] = EARTH_RADIUS * np.radians(lat - self.origin_lat)
+        local[:, 2] = coords[:, 2] - self.origin_alt
+        return local
+
+    def to_global(self, local_coords, mode=None):
+        """
+        Convert local coordinates to global coordinates.
+
+        Args:
+        local_coords: array-like of shape (N, 3) with (x, y, z) rows (east, north, up)
+        mode: override the frame mode for this call
+
+        Returns:
+        ndarray of shape (N, 3) with (lat, lon, alt) rows
+        """
+        coords = np.asarray(local_coords, dtype=np.float64).reshape(-1, 3)
+        if (mode or self.mode) == ECEF:
+            if self._rotation is None:
+                self._build_ecef_terms()
+            return ecef_to_geodetic(coords @ self._rotation + self._origin_ecef)
+
+        global_coords = np.empty_like(coords)
+        global_coords[:, 0] = self.origin_lat + coords[:, 1] * self._lat_scale
+        global_coords[:, 1] = self.origin_lon + coords[:, 0] * self._lon_scale
+        global_coords[:, 2] = self.origin_alt + coords[:, 2]
+        return global_coords
+
+    def fast_mode_error(self, extent_m, altitude_m=0, samples=64):
+        """
+        Measure the error of the fast mode against the exact ECEF mode.
+
+        Local points on rings up to extent_m from the origin are projected to
+        global coordinates with the exact mode and back with the fast mode.
+
+        Args:
+        extent_m: radius of the mission area in meters
+        altitude_m: altitude of the sampled points above the origin
+        samples: number of points per ring
+
+        Returns:
+        dict with the max and mean horizontal and vertical errors in meters
+        """
+        angles = np.linspace(0, 2 * np.pi, samples, endpoint=False)
+        radii = np.linspace(extent_m / 4, extent_m, 4)
+        r, theta = np.meshgrid(radii, angles)
+        points = np.column_stack((
+            (r * np.cos(theta)).ravel(),
+            (r * np.sin(theta)).ravel(),
+            np.full(r.size, float(altitude_m)),
+        ))
+
+        error = self.to_local(self.to_global(points, mode=ECEF), mode=FAST) - points
+        horizontal = np.hypot(error[:, 0], error[:, 1])
+        vertical = np.abs(error[:, 2])
+        return {
+            'extent_m': extent_m,
+            'max_horizontal_m': float(horizontal.max()),
+            'mean_horizontal_m': float(horizontal.mean()),
+            'max_vertical_m': float(vertical.max()),
+        }
+
+    def __repr__(self):
+        return (f"LocalFrame(origin=({self.origin_lat}, {self.origin_lon}, {self.origin_alt}), "
+                f"mode='{self.mode}')")
@@ -0,0 +1,204 @@
+import asyncio
+import collections.abc
+import os
+import time
+
+from instrumentation import Histogram
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STEP_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def coroutine_name(coro):
+    """Qualified name of a coroutine, e.g. 'Drone._monitor_position'."""
+    return getattr(coro, '__qualname__', None) or type(coro).__name__
+
+
+class CoroutineStats:
+    """Wall time spent on the loop by the steps of one coroutine function."""
+
+    def __init__(self, name):
+        self.name = name
+        self.tasks = 0
+        self.steps = 0
+        self.total = 0.0
+        self.steps_histogram = Histogram(STEP_BUCKETS)
+
+
+class _ProfiledCoroutine(collections.abc.Coroutine):
+    """
+    Wraps the coroutine of a task so that every step (one resumption by the
+    event loop, up to the next suspension) is timed and counted.
+    """
+
+    def __init__(self, coro, stats):
+        self._coro = coro
+        self._stats = stats
+        self.__qualname__ = coroutine_name(coro)
+
+    def _step(self, resume, value):
+        stats = self._stats
+        start = time.perf_counter()
+        try:
+            return resume(value)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.steps += 1
+            stats.total += elapsed
+            stats.steps_histogram.observe(elapsed)
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, typ, val=None, tb=None):
+        if val is None and tb is None:
+            return self._step(self._coro.throw, typ)
+        return self._step(lambda _: self._coro.throw(typ, val, tb), None)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def __getattr__(self, name):
+        # cr_frame, cr_await, ... (used by Task.get_stack and repr)
+        return getattr(self._coro, name)
+
+
+class LoopProfiler:
+    """
+    Opt-in profiler for the asyncio event loop of a swarm run.
+
+    Measures:
+      - event-loop lag: how late a periodic sampler wakes up compared to its
+        deadline, i.e. how long the loop was busy with something else;
+      - per-coroutine scheduling counts and wall time: every task created
+        while the profiler runs has its coroutine wrapped so that each step
+        on the loop is timed, grouped by the coroutine's qualified name
+        (Drone._monitor_position, Drone.goto_location, TelemetryHub._pump...).
+
+    Only tasks created after start() are profiled, so start it before
+    connecting the swarm.
+
+    Args:
+        lag_interval (float): Period of the lag sampler in seconds.
+        loop (asyncio.AbstractEventLoop): Loop to profile (defaults to the running loop).
+    """
+
+    def __init__(self, lag_interval=0.05, loop=None):
+        self.lag_interval = lag_interval
+        self.loop = loop
+        self.lag = Histogram(LAG_BUCKETS)
+        self.coroutines = {}
+        self.started_at = None
+        self.stopped_at = None
+        self._previous_factory = None
+        self._sampler = None
+
+    def _stats(self, name):
+        stats = self.coroutines.get(name)
+        if stats is None:
+            stats = self.coroutines[name] = CoroutineStats(name)
+        return stats
+
+    def _task_factory(self, loop, coro, **kwargs):
+        stats = self._stats(coroutine_name(coro))
+        stats.tasks += 1
+        wrapped = _ProfiledCoroutine(coro, stats)
+        if self._previous_factory is not None:
+            return self._previous_factory(loop, wrapped, **kwargs)
+        return asyncio.Task(wrapped, loop=loop, **kwargs)
+
+    async def _sample_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lag.observe(max(0.0, loop.time() - deadline))
+
+    def start(self):
+        """Install the task factory and the lag sampler on the (running) loop."""
+        if self.started_at is not None and self.stopped_at is None:
+            return self
+        self.loop = self.loop or asyncio.get_running_loop()
+        self._previous_factory = self.loop.get_task_factory()
+        self.loop.set_task_factory(self._task_factory)
+        # the sampler itself is created before the factory would count it
+        self._sampler = asyncio.Task(self._sample_lag(), loop=self.loop)
+        self.started_at = time.perf_counter()
+        self.stopped_at = None
+        return self
+
+    def stop(self):
+        """Restore the previous task factory and stop sampling. Tasks already wrapped keep being timed."""
+        if self.started_at is None or self.stopped_at is not None:
+            return self
+        self.loop.set_task_factory(self._previous_factory)
+        self._sampler.cancel()
+        self.stopped_at = time.perf_counter()
+        return self
+
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def report(self, top=20):
+        """
+        Plain-text report of the loop lag and the busiest coroutines.
+
+        Args:
+            top (int): Number of coroutines listed, sorted by total wall time.
+
+        Returns:
+            str: The report.
+        """
+        duration = self.duration()
+        lag = self.lag.summary()
+        busy = sum(stats.total for stats in self.coroutines.values())
+        lines = [f"Event loop profile over {duration:.1f} s",
+                 f"  loop busy in profiled tasks: {busy:.3f} s ({100 * busy / duration if duration else 0:.1f}%)"]
+        if lag['count']:
+            lines.append(f"  lag: samples={lag['count']} mean={lag['mean'] * 1e3:.2f} ms "
+                         f"p50={lag['p50'] * 1e3:.2f} ms p95={lag['p95'] * 1e3:.2f} ms max={lag['max'] * 1e3:.2f} ms")
+        lines.append(f"  {'coroutine':<40} {'tasks':>6} {'steps':>9} {'total s':>9} {'share':>6} "
+                     f"{'mean us':>9} {'p95 us':>9} {'max us':>9}")
+        ranked = sorted(self.coroutines.values(), key=lambda stats: stats.total, reverse=True)
+        for stats in ranked[:top]:
+            histogram = stats.steps_histogram
+            mean = stats.total / stats.steps if stats.steps else 0.0
+            p95 = histogram.quantile(0.95) or 0.0
+            lines.append(f"  {stats.name[:40]:<40} {stats.tasks:>6} {stats.steps:>9} {stats.total:>9.3f} "
+                         f"{100 * stats.total / busy if busy else 0:>5.1f}% {mean * 1e6:>9.1f} "
+                         f"{p95 * 1e6:>9.1f} {histogram.max * 1e6:>9.1f}")
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self):
+        """
+        Profile in the collapsed-stack format of flamegraph.pl / speedscope:
+        one 'frame;frame value' line per coroutine, value in microseconds.
+        Loop lag is reported under the 'loop-lag' frame.
+        """
+        lines = [f"asyncio;{stats.name.replace(';', ':')} {int(stats.total * 1e6)}"
+                 for stats in self.coroutines.values() if stats.total > 0]
+        if self.lag.count:
+            lines.append(f"asyncio;loop-lag {int(self.lag.sum * 1e6)}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, top=20):
+        """Write the text report to path + '.txt' and the collapsed stacks to path + '.folded'."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.txt', 'w') as f:
+            f.write(self.report(top) + '\n')
+        with open(path + '.folded', 'w') as f:
+            f.write(self.collapsed_stacks())
+        return path + '.txt', path + '.folded'
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import socket
+
+import mavsdk
+
+from px4_launcher import LaunchError, ManagedProcess, wait_for_tcp
+from swarm_logging import get_logger
+
+log = get_logger('server_pool')
+
+SERVER_COMMAND = ['{mavsdk_server_path}', '-p', '{grpc_port}', '{system_address}']
+BUNDLED_SERVER_PATH = os.path.join(os.path.dirname(mavsdk.__file__), 'bin', 'mavsdk_server')
+
+
+def port_is_free(port, host=''):
+    """True if a TCP listener could be bound to the port right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        # like the gRPC server, ignore connections of a previous server still in TIME_WAIT
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+class PortAllocator:
+    """
+    Hands out TCP ports of a range that are neither allocated nor bound by another process.
+
+    Args:
+        start, end (int): Inclusive port range.
+    """
+
+    def __init__(self, start=50100, end=50999):
+        self.start = start
+        self.end = end
+        self.allocated = set()
+        self._next = start
+
+    def allocate(self):
+        for _ in range(self.end - self.start + 1):
+            port = self._next
+            self._next = self.start if port == self.end else port + 1
+            if port not in self.allocated and port_is_free(port):
+                self.allocated.add(port)
+                return port
+        raise LaunchError(f"No free port left in {self.start}-{self.end}")
+
+    def release(self, port):
+        self.allocated.discard(port)
+
+
+class PooledServer:
+    """One mavsdk_server process serving one vehicle (system address)."""
+
+    def __init__(self, system_address, grpc_port):
+        self.system_address = system_address
+        self.grpc_port = grpc_port
+        self.process = None
+        self.ready = None  # asyncio.Future resolved once the gRPC port accepts connections
+        self.was_ready = False
+        self.restarts = 0
+        self.users = 0
+
+    @property
+    def name(self):
+        return f'mavsdk_server-{self.grpc_port}'
+
+
+class MavsdkServerPool:
+    """
+    Pool of warm mavsdk_server processes, one per vehicle, shared across swarms.
+
+    acquire() returns the gRPC address of the server connected to a vehicle,
+    starting it on a freshly allocated port the first time; the server keeps
+    running after release(), so re-creating a DroneSwarm or reconnecting a
+    Drone attaches to it instantly. A background health check restarts servers
+    that died or stopped answering, on the same port when possible so the gRPC
+    channels of the drones reconnect by themselves.
+
+    The pool outlives event loops (every asyncio.run of a new swarm has its
+    own): the first call from another loop adopts the running servers into it
+    and restarts the health checks there.
+
+    Args:
+        server_path (str): mavsdk_server executable (defaults to the one bundled with mavsdk).
+        server_command (list): Command template, formatted with mavsdk_server_path, grpc_port, system_address.
+        port_range (tuple): gRPC ports the pool may use.
+        ready_timeout (float): Seconds to wait for a server to open its gRPC port
+            (mavsdk_server only does so once it discovered its vehicle).
+        health_interval (float): Seconds between health checks.
+        log_dir (str): Directory receiving one log file per server.
+        host (str): Address the drones use to reach the servers.
+    """
+
+    def __init__(self, server_path=None, server_command=None, port_range=(50100, 50999), ready_timeout=30,
+                 health_interval=2.0, log_dir='logs/mavsdk_server', host='127.0.0.1'):
+        self.server_path = os.path.expanduser(server_path) if server_path else BUNDLED_SERVER_PATH
+        self.server_command = server_command or SERVER_COMMAND
+        self.ports = PortAllocator(*port_range)
+        self.ready_timeout = ready_timeout
+        self.health_interval = health_interval
+        self.log_dir = log_dir
+        self.host = host
+        self.servers = {}  # system address -> PooledServer
+        self._health_task = None
+        self._loop = None  # event loop the futures and the health task belong to
+
+    def _start(self, server):
+        os.makedirs(self.log_dir, exist_ok=True)
+        values = {'mavsdk_server_path': self.server_path, 'grpc_port': server.grpc_port,
+                  'system_address': server.system_address}
+        argv = [arg.format(**values) for arg in self.server_command]
+        server.process = ManagedProcess(server.name, argv, os.path.join(self.log_dir, f'{server.name}.log'))
+        server.ready = asyncio.ensure_future(self._launch(server))
+
+    async def _launch(self, server):
+        await server.process.start()
+        await server.process.wait_ready(lambda: wait_for_tcp(server.grpc_port, self.host), self.ready_timeout)
+        server.was_ready = True
+        log.info("%s ready for %s", server.name, server.system_address)
+
+    def _adopt_loop(self):
+        """
+        Move the pool to the running event loop when another one used it before.
+
+        The servers keep running; their readiness is carried over to futures of
+        the new loop, and a server whose start was interrupted with its loop is
+        marked failed so the next acquire() starts it again. The health task of
+        the old loop can no longer run and is replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            log.info("Adopting %s mavsdk_server(s) into a new event loop", len(self.servers))
+        self._loop = loop
+        self._health_task = None
+        for server in self.servers.values():
+            ready = loop.create_future()
+            if server.ready.done() and not server.ready.cancelled() and server.ready.exception() is None:
+                ready.set_result(None)
+            else:
+                ready.set_exception(LaunchError(f"{server.name} start interrupted by the end of its event loop"))
+                ready.exception()  # acquire() and check_health() test it, never worth a "never retrieved" log
+            server.ready = ready
+
+    async def acquire(self, system_address):
+        """
+        Address of a ready server for the vehicle at system_address, e.g. 'udp://:14541'.
+
+        Returns:
+            tuple: (host, grpc_port) to give to mavsdk.System.
+
+        Raises:
+            LaunchError: The server could not be started or did not become ready in time.
+        """
+        self._adopt_loop()
+        server = self.servers.get(system_address)
+        if server is None or (server.ready.done() and server.ready.exception() is not None):
+            if server is not None:
+                await self._discard(server)
+            server = PooledServer(system_address, self.ports.allocate())
+            self.servers[system_address] = server
+            self._start(server)
+        await asyncio.shield(server.ready)
+        server.users += 1
+        self._ensure_health_checks()
+        return self.host, server.grpc_port
+
+    def release(self, system_address):
+        """Give a server back to the pool; it stays warm for the next acquire()."""
+        server = self.servers.get(system_address)
+        if server is not None and server.users > 0:
+            server.users -= 1
+
+    async def warm(self, system_addresses):
+        """Start (or check) the servers of several vehicles concurrently, ahead of the swarm."""
+        results = await asyncio.gather(*(self.acquire(address) for address in system_addresses),
+                                       return_exceptions=True)
+        for address in system_addresses:
+            self.release(address)
+        return results
+
+    async def _healthy(self, server):
+        if not server.process.running:
+            return False
+        try:
+            await asyncio.wait_for(wait_for_tcp(server.grpc_port, self.host), 1.0)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _restart(self, server):
+        await server.process.stop()
+        server.restarts += 1
+        if not port_is_free(server.grpc_port):
+            self.ports.release(server.grpc_port)
+            server.grpc_port = self.ports.allocate()
+            log.warning("gRPC port of %s taken, moving it to port %s (drones must reconnect)",
+                        server.system_address, server.grpc_port)
+        log.warning("Restarting %s for %s (restart %s)", server.name, server.system_address, server.restarts)
+        self._start(server)
+
+    async def check_health(self):
+        """Restart the servers that exited, or stopped answering after having been ready once."""
+        self._adopt_loop()
+        for server in list(self.servers.values()):
+            if not server.ready.done():
+                continue  # still waiting for its vehicle
+            if server.ready.exception() is None and server.was_ready and await self._healthy(server):
+                continue
+            try:
+                await self._restart(server)
+            except LaunchError as error:
+                log.error("%s", error)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def _ensure_health_checks(self):
+        if (self._health_task is None or self._health_task.done()
+                or self._health_task.get_loop() is not asyncio.get_running_loop()):
+            self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def _discard(self, server):
+        await server.process.stop()
+        self.ports.release(server.grpc_port)
+        self.servers.pop(server.system_address, None)
+
+    async def close(self):
+        """Stop the health checks and every server."""
+        self._adopt_loop()
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for server in list(self.servers.values()):
+            if not server.ready.done():
+                server.ready.cancel()
+        await asyncio.gather(*(self._discard(server) for server in list(self.servers.values())))
+
+
+_shared_pool = None
+
+
+def shared_server_pool(config):
+    """
+    Process-wide pool configured by the Mavsdk_server_pool section of config.json,
+    so successive DroneSwarm instances reuse the same warm servers.
+    """
+    global _shared_pool
+    if _shared_pool is None:
+        options = config.get('Mavsdk_server_pool', {})
+        _shared_pool = MavsdkServerPool(server_path=options.get('server_path') or None,
+                                        port_range=tuple(options.get('port_range', (50100, 50999))),
+                                        ready_timeout=options.get('ready_timeout_s', 30),
+                                        health_interval=options.get('health_interval_s', 2.0),
+                                        log_dir=options.get('log_dir', 'logs/mavsdk_server'))
+    return _shared_pool
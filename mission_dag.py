@@ -0,0 +1,388 @@
+import asyncio
+import json
+
+from drone_control import global_position_ok, landed, near_position, reached_goto_target, relative_altitude_above
+from swarm_logging import get_logger
+
+log = get_logger('mission')
+
+# actions run by every drone of the step on its own, and actions run once for the whole group
+DRONE_ACTIONS = ('takeoff', 'goto_local', 'wait', 'land', 'return_to_launch')
+GROUP_ACTIONS = ('orbit',)
+ACTIONS = DRONE_ACTIONS + GROUP_ACTIONS
+
+# conditions of the wait steps, by name (see the wait predicates of drone_control)
+CONDITIONS = {
+    'global_position_ok': global_position_ok,
+    'relative_altitude_above': relative_altitude_above,
+    'reached_goto_target': reached_goto_target,
+    'near_position': near_position,
+    'landed': landed,
+}
+
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'  # a dependency did not complete
+
+
+class MissionError(Exception):
+    """Invalid mission definition, or a group step that could not run."""
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class MissionStep:
+    """
+    One step of a mission.
+
+    Args:
+        id (str): Unique name of the step.
+        action (str): One of ACTIONS.
+        drones (list or str): Ids of the drones of the step, 'all' for every connected drone.
+        after (list): Ids of the steps it depends on. A drone starts the step as
+            soon as it finished its own part of these steps; for a step it
+            does not take part in, the whole step must have finished. A group
+            step starts once all its drones are ready.
+        timeout (float): Seconds allowed to each drone (or to the group), None for no limit.
+        params (dict): Parameters of the action:
+            goto_local: targets ({drone id: [x, y, z]} or one [x, y, z] per drone of the step),
+                tolerance_m (wait until reached, 1.0 by default; null to return once sent);
+            wait: condition (name in CONDITIONS) and args (its keyword arguments);
+            orbit: center [x, y], radius_m, altitude_m, velocity_m_s, duration_s.
+    """
+
+    def __init__(self, id, action, drones='all', after=(), timeout=None, params=None):
+        if action not in ACTIONS:
+            raise MissionError(f"Step '{id}': unknown action '{action}', expected one of {ACTIONS}")
+        self.id = id
+        self.action = action
+        self.drones = drones
+        self.after = list(after)
+        self.timeout = timeout
+        self.params = params or {}
+        if action == 'wait' and self.params.get('condition') not in CONDITIONS:
+            raise MissionError(f"Step '{id}': unknown condition '{self.params.get('condition')}', "
+                               f"expected one of {tuple(CONDITIONS)}")
+
+    @property
+    def group(self):
+        return self.action in GROUP_ACTIONS
+
+    @classmethod
+    def from_config(cls, options):
+        options = dict(options)
+        try:
+            step_id = options.pop('id')
+            action = options.pop('action')
+        except KeyError as error:
+            raise MissionError(f"Mission step without {error.args[0]}: {options}")
+        return cls(step_id, action,
+                   drones=options.pop('drones', 'all'),
+                   after=options.pop('after', ()),
+                   timeout=options.pop('timeout_s', None),
+                   params=options)
+
+
+class Mission:
+    """
+    Mission as a DAG of steps.
+
+    Loaded from JSON like config.json:
+        {"name": "demo", "steps": [
+            {"id": "takeoff", "action": "takeoff"},
+            {"id": "climb", "action": "wait", "after": ["takeoff"], "condition": "relative_altitude_above",
+             "args": {"altitude_m": 2.0}, "timeout_s": 30},
+            {"id": "line", "action": "goto_local", "after": ["climb"], "targets": {"1": [0, 0, 20], "2": [0, 0, 30]}},
+            {"id": "land", "action": "land", "after": ["line"]}]}
+
+    Args:
+        steps (list): MissionStep objects.
+        name (str): Name of the mission.
+
+    Raises:
+        MissionError: Duplicate step ids, unknown dependencies or a dependency cycle.
+    """
+
+    def __init__(self, steps, name='mission'):
+        self.name = name
+        self.steps = {}
+        for step in steps:
+            if step.id in self.steps:
+                raise MissionError(f"Duplicate step id '{step.id}'")
+            self.steps[step.id] = step
+        for step in steps:
+            for dependency in step.after:
+                if dependency not in self.steps:
+                    raise MissionError(f"Step '{step.id}' depends on unknown step '{dependency}'")
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_config(cls, options):
+        return cls([MissionStep.from_config(step) for step in options.get('steps', [])],
+                   name=options.get('name', 'mission'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_config(json.load(f))
+
+    def _topological_order(self):
+        remaining = {step_id: set(step.after) for step_id, step in self.steps.items()}
+        order = []
+        while remaining:
+            ready = [step_id for step_id, after in remaining.items() if not after]
+            if not ready:
+                raise MissionError(f"Dependency cycle between steps {sorted(remaining)}")
+            for step_id in ready:
+                del remaining[step_id]
+                order.append(step_id)
+            for after in remaining.values():
+                after.difference_update(ready)
+        return order
+
+
+class NodeResult:
+    """Outcome of one step for one drone (drone_id None for a group step)."""
+
+    def __init__(self, step, drone_id):
+        self.step = step
+        self.drone_id = drone_id
+        self.status = None
+        self.start = None       # seconds since the start of the mission, None if skipped
+        self.end = None         # when it finished or was skipped
+        self.error = None
+        self.waited_on = None   # key of the dependency that finished last
+
+    @property
+    def key(self):
+        return self.step, self.drone_id
+
+    @property
+    def duration(self):
+        return None if self.start is None else self.end - self.start
+
+    def label(self):
+        return self.step if self.drone_id is None else f"{self.step}[{self.drone_id}]"
+
+    def as_dict(self):
+        return {'status': self.status, 'start_s': self.start, 'end_s': self.end, 'duration_s': self.duration,
+                'error': self.error}
+
+
+class MissionReport:
+    """
+    Per-step timings of a mission run and its critical path.
+
+    Attributes:
+        mission (Mission): The mission run.
+        nodes (dict): (step id, drone id or None) -> NodeResult.
+        elapsed (float): Duration of the whole mission in seconds.
+    """
+
+    def __init__(self, mission, nodes, elapsed):
+        self.mission = mission
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return all(node.status == DONE for node in self.nodes.values())
+
+    def step_summary(self, step_id):
+        nodes = [node for node in self.nodes.values() if node.step == step_id]
+        ran = [node for node in nodes if node.start is not None]
+        return {
+            'nodes': len(nodes),
+            'done': sum(node.status == DONE for node in nodes),
+            'failed': sum(node.status == FAILED for node in nodes),
+            'skipped': sum(node.status == SKIPPED for node in nodes),
+            'start_s': min((node.start for node in ran), default=None),
+            'end_s': max((node.end for node in ran), default=None),
+            'slowest_s': max((node.duration for node in ran), default=None),
+        }
+
+    def critical_path(self):
+        """
+        Chain of nodes that determined the end of the mission: from the last
+        node to finish, back through the dependency each node waited for last.
+        """
+        finished = [node for node in self.nodes.values() if node.start is not None]
+        if not finished:
+            return []
+        node = max(finished, key=lambda node: node.end)
+        path = [node]
+        while node.waited_on is not None:
+            node = self.nodes[node.waited_on]
+            path.append(node)
+        return path[::-1]
+
+    def as_dict(self):
+        return {
+            'mission': self.mission.name,
+            'ok': self.ok,
+            'elapsed_s': self.elapsed,
+            'steps': {step_id: self.step_summary(step_id) for step_id in self.mission.order},
+            'critical_path': [{'node': node.label(), **node.as_dict()} for node in self.critical_path()],
+            'nodes': {node.label(): node.as_dict() for node in self.nodes.values()},
+        }
+
+    def __str__(self):
+        done = sum(node.status == DONE for node in self.nodes.values())
+        text = f"mission '{self.mission.name}': {done}/{len(self.nodes)} nodes done in {self.elapsed:.2f} s"
+        for step_id in self.mission.order:
+            summary = self.step_summary(step_id)
+            text += f"\n  {step_id:<20} {summary['done']}/{summary['nodes']} done"
+            if summary['start_s'] is not None:
+                text += (f", {summary['start_s']:7.2f} -> {summary['end_s']:7.2f} s, "
+                         f"slowest {summary['slowest_s']:.2f} s")
+            if summary['failed'] or summary['skipped']:
+                text += f" ({summary['failed']} failed, {summary['skipped']} skipped)"
+        path = self.critical_path()
+        if path:
+            text += "\n  critical path: " + " -> ".join(f"{node.label()} {node.duration:.2f} s" for node in path)
+        for node in self.nodes.values():
+            if node.status == FAILED:
+                text += f"\n  {node.label()} failed: {node.error}"
+        return text
+
+
+class MissionExecutor:
+    """
+    Runs a Mission on a DroneSwarm as a DAG on the event loop.
+
+    Every step is expanded into one node per drone (one node for a group
+    step); each node is a task waiting only for the nodes it depends on, so
+    a drone moves on as soon as its own dependencies are met instead of
+    waiting for the slowest drone of the swarm. A node that fails or times
+    out makes its dependents SKIPPED, the independent branches carry on.
+
+    Args:
+        swarm (DroneSwarm): Connected swarm, its origin set.
+    """
+
+    def __init__(self, swarm):
+        self.swarm = swarm
+
+    def _step_drones(self, step):
+        active = {drone.id: drone for drone in self.swarm.active_drones}
+        if step.drones == 'all':
+            return list(active.values())
+        missing = [drone_id for drone_id in step.drones if drone_id not in active]
+        if missing:
+            log.warning("Step '%s': drones %s are not connected, left out", step.id, missing)
+        return [active[drone_id] for drone_id in step.drones if drone_id in active]
+
+    def _dependencies(self, mission, step_drones, step, drone_id):
+        keys = []
+        for dependency_id in step.after:
+            dependency = mission.steps[dependency_id]
+            if dependency.group:
+                keys.append((dependency_id, None))
+                continue
+            dependency_drones = [drone.id for drone in step_drones[dependency_id]]
+            own = [drone.id for drone in step_drones[step.id]] if drone_id is None else [drone_id]
+            shared = [other for other in own if other in dependency_drones]
+            keys.extend((dependency_id, other) for other in (shared or dependency_drones))
+        return keys
+
+    def _target(self, step, drones, drone):
+        targets = step.params['targets']
+        if isinstance(targets, dict):
+            return targets[str(drone.id)]
+        return targets[drones.index(drone)]
+
+    async def _run_drone_step(self, step, drones, drone):
+        swarm = self.swarm
+        if step.action == 'takeoff':
+            await drone.takeoff()
+        elif step.action == 'land':
+            await drone.land()
+        elif step.action == 'return_to_launch':
+            await drone.return_to_launch()
+        elif step.action == 'wait':
+            await drone.wait_until(CONDITIONS[step.params['condition']](**step.params.get('args', {})))
+        elif step.action == 'goto_local':
+            target = self._target(step, drones, drone)
+            swarm.geofence.validate(target)
+            lat, lon, alt = swarm._update_frame().to_global(target)[0].tolist()
+            await drone.run_goto(lat, lon, alt - swarm.origin_alt)
+            tolerance = step.params.get('tolerance_m', 1.0)
+            if tolerance is not None:
+                await drone.wait_until(reached_goto_target(tolerance))
+
+    async def _run_group_step(self, step, drones):
+        params = step.params
+        if step.action == 'orbit':
+            center = params.get('center', (0.0, 0.0))
+            _, _, report = await self.swarm.run_orbit_formation_local(
+                center[0], center[1], params['radius_m'], params['altitude_m'],
+                velocity_ms=params.get('velocity_m_s', 2.0), duration=params.get('duration_s', 60.0),
+                drones=drones)
+            if report is None:
+                raise MissionError("Not every drone entered offboard mode")
+
+    async def _run_node(self, node, dependencies, futures, results, start_time):
+        loop = asyncio.get_running_loop()
+        step = node.step_object
+        statuses = [await futures[key] for key in dependencies]
+        if dependencies:
+            node.waited_on = max(dependencies, key=lambda key: results[key].end)
+        if any(status != DONE for status in statuses):
+            node.status = SKIPPED
+            failed = [results[key].label() for key in dependencies if results[key].status != DONE]
+            node.error = f"dependencies not done: {', '.join(failed)}"
+            node.end = loop.time() - start_time
+        else:
+            node.start = loop.time() - start_time
+            try:
+                if node.drone_id is None:
+                    run = self._run_group_step(step, node.drones)
+                else:
+                    run = self._run_drone_step(step, node.drones, node.drone)
+                await asyncio.wait_for(run, step.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:  # asyncio.TimeoutError included
+                node.status = FAILED
+                node.error = _describe(error)
+                log.warning("Mission step %s failed: %s", node.label(), node.error)
+            else:
+                node.status = DONE
+            node.end = loop.time() - start_time
+        futures[node.key].set_result(node.status)
+
+    async def run(self, mission):
+        """
+        Run every step of the mission.
+
+        Returns:
+            MissionReport
+        """
+        loop = asyncio.get_running_loop()
+        step_drones = {step_id: self._step_drones(mission.steps[step_id]) for step_id in mission.order}
+        results = {}
+        dependencies = {}
+        for step_id in mission.order:
+            step = mission.steps[step_id]
+            drones = step_drones[step_id]
+            owners = [None] if step.group else drones
+            for drone in owners:
+                node = NodeResult(step_id, None if drone is None else drone.id)
+                node.step_object = step
+                node.drone = drone
+                node.drones = drones
+                results[node.key] = node
+                dependencies[node.key] = self._dependencies(mission, step_drones, step, node.drone_id)
+
+        futures = {key: loop.create_future() for key in results}
+        start_time = loop.time()
+        await asyncio.gather(*(self._run_node(node, dependencies[key], futures, results, start_time)
+                               for key, node in results.items()))
+        report = MissionReport(mission, results, loop.time() - start_time)
+        if report.ok:
+            log.info("%s", report)
+        else:
+            log.warning("%s", report)
+        return report
@@ -0,0 +1,145 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from mavsdk import mission, mission_raw
+
+from swarm_logging import get_logger
+
+log = get_logger('mission_upload')
+
+PLAN = 'plan'  # mavsdk.mission.MissionPlan, uploaded with mission.upload_mission
+RAW = 'raw'    # mavsdk.mission_raw items, uploaded with mission_raw.upload_mission
+FORMATS = (PLAN, RAW)
+
+# MAVLink constants of the raw items
+MAV_FRAME_MISSION = 2
+MAV_FRAME_GLOBAL_RELATIVE_ALT_INT = 6
+MAV_CMD_NAV_WAYPOINT = 16
+MAV_CMD_DO_CHANGE_SPEED = 178
+
+
+class CompiledMission:
+    """
+    Mission items of one waypoint list, ready to upload to any drone.
+
+    Attributes:
+        key (str): Content hash of the waypoints, the frame and the options it was compiled from.
+        format (str): PLAN or RAW.
+        items (list): mission.MissionItem or mission_raw.MissionItem objects.
+        waypoints (ndarray): (N, 3) latitude, longitude and altitude relative to the origin.
+    """
+
+    def __init__(self, key, format, items, waypoints):
+        self.key = key
+        self.format = format
+        self.items = items
+        self.waypoints = waypoints
+
+    def __len__(self):
+        return len(self.waypoints)
+
+    def plan(self):
+        """MissionPlan of the items (PLAN format)."""
+        return mission.MissionPlan(self.items)
+
+
+def mission_key(local_waypoints, frame, origin_alt, format, speed_m_s, acceptance_radius_m):
+    """
+    Content hash of a waypoint list and of everything its compilation depends on.
+
+    The waypoints are rounded to the millimeter, so recomputed but identical
+    lists give the same key.
+    """
+    digest = hashlib.sha1()
+    header = (format, frame.origin_lat, frame.origin_lon, frame.origin_alt, frame.mode, origin_alt, speed_m_s,
+              acceptance_radius_m)
+    digest.update(repr(header).encode())
+    digest.update(np.round(local_waypoints, 3).tobytes())
+    return digest.hexdigest()
+
+
+class MissionCompiler:
+    """
+    Compiles local-frame waypoint lists into mission items, with an LRU cache by content hash.
+
+    All the waypoints of a list are converted to global coordinates in one
+    batch; a list compiled before (same waypoints, origin and options) is
+    served from the cache, and its key lets a drone skip the upload of the
+    mission it already has (see Drone.upload_mission).
+
+    Args:
+        format (str): PLAN (mavsdk.mission) or RAW (mavsdk.mission_raw).
+        speed_m_s (float): Horizontal speed between the waypoints.
+        acceptance_radius_m (float): Distance at which a waypoint counts as reached.
+        capacity (int): Compiled missions kept in the cache.
+    """
+
+    def __init__(self, format=PLAN, speed_m_s=10.0, acceptance_radius_m=1.0, capacity=256):
+        if format not in FORMATS:
+            raise ValueError(f"Invalid mission format '{format}', expected one of {FORMATS}")
+        self.format = format
+        self.speed_m_s = speed_m_s
+        self.acceptance_radius_m = acceptance_radius_m
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(format=options.get('format', PLAN),
+                   speed_m_s=options.get('speed_m_s', 10.0),
+                   acceptance_radius_m=options.get('acceptance_radius_m', 1.0),
+                   capacity=options.get('cache_size', 256))
+
+    def compile(self, local_waypoints, frame, origin_alt=0):
+        """
+        Compile one waypoint list, or return it from the cache.
+
+        Args:
+            local_waypoints (array_like): (N, 3) local waypoints (x east, y north, z above the origin).
+            frame (LocalFrame): Local frame of the swarm.
+            origin_alt (float): Absolute altitude the relative altitudes of the items refer to.
+
+        Returns:
+            CompiledMission
+        """
+        local_waypoints = np.asarray(local_waypoints, dtype=np.float64).reshape(-1, 3)
+        key = mission_key(local_waypoints, frame, origin_alt, self.format, self.speed_m_s,
+                          self.acceptance_radius_m)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return compiled
+        self.misses += 1
+        waypoints = frame.to_global(local_waypoints)
+        waypoints[:, 2] -= origin_alt
+        items = self._raw_items(waypoints) if self.format == RAW else self._plan_items(waypoints)
+        compiled = CompiledMission(key, self.format, items, waypoints)
+        self._cache[key] = compiled
+        if len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        return compiled
+
+    def _plan_items(self, waypoints):
+        nan = float('nan')
+        return [mission.MissionItem(lat, lon, alt, self.speed_m_s, True, nan, nan, mission.MissionItem.CameraAction.NONE,
+                                    nan, nan, self.acceptance_radius_m, nan, nan,
+                                    mission.MissionItem.VehicleAction.NONE)
+                for lat, lon, alt in waypoints.tolist()]
+
+    def _raw_items(self, waypoints):
+        # the speed is set once by a DO_CHANGE_SPEED item ahead of the waypoints
+        items = [mission_raw.MissionItem(0, MAV_FRAME_MISSION, MAV_CMD_DO_CHANGE_SPEED, 1, 1,
+                                         1, self.speed_m_s, -1, 0, 0, 0, 0.0, 0)]
+        x = np.round(waypoints[:, 0] * 1e7).astype(np.int64).tolist()
+        y = np.round(waypoints[:, 1] * 1e7).astype(np.int64).tolist()
+        for seq, (lat, lon, alt) in enumerate(zip(x, y, waypoints[:, 2].tolist()), start=1):
+            items.append(mission_raw.MissionItem(seq, MAV_FRAME_GLOBAL_RELATIVE_ALT_INT, MAV_CMD_NAV_WAYPOINT, 0, 1,
+                                                 0, self.acceptance_radius_m, 0, float('nan'), lat, lon, alt, 0))
+        return items
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self._cache)}
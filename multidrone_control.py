@@ -1,7 +1,54 @@
 import asyncio
-import math
+import numpy as np
 from drone_control import Drone
 from drone_control import read_config
+from drone_control import global_position_ok, reached_goto_target, relative_altitude_above
+from local_frame import LocalFrame
+from fake_system import DEFAULT_HOME
+from flight_recorder import FlightLog
+from replay_system import ReplayClock
+from swarm_state import SwarmState
+from ring_buffer import DEFAULT_CAPACITY
+from instrumentation import Metrics
+from loop_profiler import LoopProfiler
+from swarm_logging import get_logger, logging_configured, setup_logging_from_config
+from mavsdk_server_pool import shared_server_pool
+from swarm_connect import RetryPolicy, connect_drones
+from swarm_executor import SwarmExecutor
+from formation_assignment import ORDER, SUM_SQUARED, assign_slots
+from transition_planner import TransitionPlanner
+from setpoint_streamer import POSITION, SetpointStreamer
+from orbit_trajectory import OrbitTrajectory, ring_phases, ring_positions
+from proximity_monitor import ProximityMonitor
+from geofence import Geofence, GeofenceMonitor
+from mission_dag import Mission, MissionExecutor
+from mission_upload import MissionCompiler
+
+def global_to_local_batch(global_coords, origin_lat, origin_lon, origin_alt=0):
+    """
+    Convert an array of global coordinates to local coordinates.
+
+    Args:
+    global_coords: array-like of shape (N, 3) with (lat, lon, alt) rows
+    origin_lat, origin_lon, origin_alt: Global coordinates of the origin point
+
+    Returns:
+    ndarray of shape (N, 3) with (x, y, z) rows
+    """
+    return LocalFrame(origin_lat, origin_lon, origin_alt).to_local(global_coords)
+
+def local_to_global_batch(local_coords, origin_lat, origin_lon, origin_alt=0):
+    """
+    Convert an array of local coordinates to global coordinates.
+
+    Args:
+    local_coords: array-like of shape (N, 3) with (x, y, z) rows
+    origin_lat, origin_lon, origin_alt: Global coordinates of the origin point
+
+    Returns:
+    ndarray of shape (N, 3) with (lat, lon, alt) rows
+    """
+    return LocalFrame(origin_lat, origin_lon, origin_alt).to_global(local_coords)
 
 def global_to_local(global_lat, global_lon, global_alt, origin_lat, origin_lon, origin_alt=0):
     """
@@ -14,19 +61,9 @@ def global_to_local(global_lat, global_lon, global_alt, origin_lat, origin_lon,
     Returns:
     x, y, z: Local coordinates
     """
-    EARTH_RADIUS = 6378137.0  # Earth's radius in meters
-
-    d_lat = math.radians(global_lat - origin_lat)
-    d_lon = math.radians(global_lon - origin_lon)
-    
-    lat1 = math.radians(origin_lat)
-    lat2 = math.radians(global_lat)
-
-    x = EARTH_RADIUS * d_lon * math.cos((lat1 + lat2) / 2)
-    y = EARTH_RADIUS * d_lat
-    z = global_alt - origin_alt
-
-    return x, y, z
+    x, y, z = global_to_local_batch((global_lat, global_lon, global_alt),
+                                    origin_lat, origin_lon, origin_alt)[0]
+    return float(x), float(y), float(z)
 
 def local_to_global(local_x, local_y, local_z, origin_lat, origin_lon, origin_alt=0):
     """
@@ -39,125 +76,618 @@ def local_to_global(local_x, local_y, local_z, origin_lat, origin_lon, origin_al
     Returns:
     lat, lon, alt: Global coordinates
     """
-    EARTH_RADIUS = 6378137.0  # Earth's radius in meters
-
-    d_lat = local_y / EARTH_RADIUS
-    d_lon = local_x / (EARTH_RADIUS * math.cos(math.radians(origin_lat)))
+    lat, lon, alt = local_to_global_batch((local_x, local_y, local_z),
+                                          origin_lat, origin_lon, origin_alt)[0]
+    return float(lat), float(lon), float(alt)
 
-    lat = origin_lat + math.degrees(d_lat)
-    lon = origin_lon + math.degrees(d_lon)
-    alt = origin_alt + local_z
+def fake_backend_options(config, index):
+    """
+    Build the FakeSystem options for the drone at the given 0-based index.
 
-    return lat, lon, alt
+    Drones are spawned on the same 3xN grid used by px4_multigazebo_drones.sh,
+    spaced by drone_deploy_distance around the configured home.
+    """
+    options = dict(config.get('Fake_backend', {}))
+    home = options.pop('home', DEFAULT_HOME)
+    distance = config.get('drone_deploy_distance', 10)
+    offset = ((index % 3) * distance, (index // 3) * distance, 0)
+    lat, lon, alt = LocalFrame(*home).to_global(offset)[0]
+    options['home'] = (float(lat), float(lon), float(alt))
+    if options.get('seed') is not None:
+        options['seed'] += index
+    return options
 
 class DroneSwarm:
-    def __init__(self, config):
+    def __init__(self, config, backend=None):
+        """
+        Args:
+            config (dict): Configuration as returned by read_config.
+            backend (str): 'mavsdk', 'fake' or 'replay', overrides the Backend key of the configuration.
+        """
         self.num_drones = config['NUM_DRONES']
+        if not logging_configured():
+            # the Logging section applies unless the program set logging up itself
+            setup_logging_from_config(config)
+        self.log = get_logger()
+        self.backend = backend or config.get('Backend', 'mavsdk')
+        self.replay_clock = None
+        # per-drone command latency / telemetry rate instrumentation, off unless enabled in the config
+        metrics_config = config.get('Metrics', {})
+        self.metrics = Metrics(enabled=metrics_config.get('enabled', False))
+        self.metrics_port = metrics_config.get('http_port', 9100)
+        self.metrics_server = None
+        # event-loop lag / coroutine profiling, started by start_profiling()
+        self.profiling_config = config.get('Profiling', {})
+        self.profiler = None
+        if self.backend == 'replay':
+            # every drone replays its own records of the same log against one shared clock
+            replay = config['Replay']
+            replay_log = FlightLog(replay['log'])
+            self.replay_clock = ReplayClock(speed=replay.get('speed', 1.0))
+        # warm mavsdk_server processes shared by every swarm of the process, instead of one server per connect
+        self.server_pool = None
+        if self.backend == 'mavsdk' and config.get('Mavsdk_server_pool', {}).get('enabled', False):
+            self.server_pool = shared_server_pool(config)
+        self.connect_config = config.get('Connect', {})
+        # bounded fan-out of the swarm-wide commands
+        self.executor = SwarmExecutor.from_config(config.get('Executor', {}))
+        self.sync_lead_time = config.get('Executor', {}).get('sync_lead_time_s', 0.05)
+        # how the drones are matched to the slots of a formation (see formation_assignment)
+        self.assignment = config.get('Formation_assignment', 'sum')
+        # deconflicted formation changes streamed as offboard setpoints (see run_transition)
+        self.transition_config = config.get('Transition', {})
+        self.transition_planner = TransitionPlanner.from_config(self.transition_config)
+        self.offboard_config = config.get('Offboard', {})
+        # separation of every pair of drones, checked at the telemetry rate once started
+        self.proximity_config = config.get('Proximity', {})
+        self.proximity = ProximityMonitor.from_config(self._live_positions, self.proximity_config)
+        # keep-in / keep-out zones: targets are validated before being sent, positions watched once started
+        self.geofence_config = config.get('Geofence', {})
+        self.geofence = Geofence.from_config(self.geofence_config if self.geofence_config.get('enabled') else {})
+        self.geofence_monitor = GeofenceMonitor(self.geofence, self._live_positions,
+                                                self.geofence_config.get('rate_hz', 10.0))
+        self.geofence_monitor.add_callback(self._on_geofence_breach)
+        # ids of the drones sent home by the breach_action, left out of the swarm commands from then on
+        self.breached = set()
+        self._streamers = set()  # running SetpointStreamers, a breaching drone is disabled in them
+        # PX4 missions compiled once per waypoint list and uploaded with their own concurrency limit
+        self.mission_upload_config = config.get('Mission_upload', {})
+        self.mission_compiler = MissionCompiler.from_config(self.mission_upload_config)
+        self.upload_executor = SwarmExecutor.from_config(
+            dict(config.get('Executor', {}), max_in_flight=self.mission_upload_config.get('max_in_flight', 8)))
+        self.connect_report = None
         self.alldrones = []
+        # one row per drone, the drones' monitors write straight into it
+        self.state = SwarmState(self.num_drones, ids=range(1, self.num_drones + 1))
         for i in range(self.num_drones):
+            options = None
+            if self.backend == 'fake':
+                options = fake_backend_options(config, i)
+            elif self.backend == 'replay':
+                options = {'log': replay_log, 'drone_id': i + 1, 'clock': self.replay_clock}
             i=i+1 # for 1-indexed drone numbering: PX4 when manually starting the simulation starts the server at port 50051 + 1 (px4-BUG)
             drone = Drone(i, 
                           grpc_portbase=config['GRPC_PORT_BASE'] + i,
                           connection_type=config['Connection_type'],
                           server_address=config['Server_host_address'],
-                          portbase=config['Connection_port'] + i)
+                          portbase=config['Connection_port'] + i,
+                          backend=self.backend,
+                          backend_options=options,
+                          state=self.state,
+                          state_index=i - 1,
+                          history_capacity=config.get('Telemetry_history_capacity', DEFAULT_CAPACITY),
+                          metrics=self.metrics,
+                          server_pool=self.server_pool,
+                          readiness_max_age=config.get('Readiness_max_age_s', 2.0))
+            if len(self.geofence):
+                drone.target_check = self._check_global_target
             self.alldrones.append(drone)
+        # drones the swarm commands address, narrowed to the connected ones by connect_swarm
+        self.active_drones = list(self.alldrones)
 
         self.origin_lat = None
         self.origin_lon = None
         self.origin_alt = None
+        self.frame_mode = config.get('Local_frame_mode', 'fast')
+        self.frame = None
+
+    def _update_frame(self):
+        # Rebuild the local projection only when the origin or the mode has changed
+        if self.origin_lat is None or self.origin_lon is None:
+            self.frame = None
+        elif (self.frame is None or self.frame.mode != self.frame_mode
+              or not self.frame.has_origin(self.origin_lat, self.origin_lon, self.origin_alt)):
+            self.frame = LocalFrame(self.origin_lat, self.origin_lon, self.origin_alt, mode=self.frame_mode)
+        return self.frame
 
     def set_origin_coords(self, lat, lon, alt=0): # Set the origin to a specific point
         self.origin_lat = lat
         self.origin_lon = lon
         self.origin_alt = alt
+        self._update_frame()
+
+    def set_frame_mode(self, mode):
+        """Select the local projection: 'fast' (equirectangular) or 'ecef' (exact WGS-84)."""
+        self.frame_mode = mode
+        self._update_frame()
+
+    def frame_error(self, extent_m, altitude_m=0):
+        """Report the fast mode error against the exact mode for a mission area of extent_m meters."""
+        frame = self._update_frame()
+        if frame is None:
+            raise RuntimeError("Origin not set, call set_origin_coords or set_origin_to_home first")
+        return frame.fast_mode_error(extent_m, altitude_m)
 
     async def get_local_coords(self, drone_id):
         drone = self.alldrones[drone_id]
         position = await drone.get_coordinates()
-        local_coords = global_to_local(position.latitude_deg, position.longitude_deg, position.absolute_altitude_m,
-                               self.origin_lat, self.origin_lon, self.origin_alt)
+        local_coords = self._update_frame().to_local(
+            (position.latitude_deg, position.longitude_deg, position.absolute_altitude_m))[0]
         return {
-            'x': local_coords[0],
-            'y': local_coords[1],
-            'z': local_coords[2]
+            'x': float(local_coords[0]),
+            'y': float(local_coords[1]),
+            'z': float(local_coords[2])
         }
 
+    async def get_all_local_coords(self):
+        """Return an (N, 3) array with the local coordinates of every drone."""
+        positions = await asyncio.gather(*[drone.get_coordinates() for drone in self.alldrones])
+        global_coords = [(p.latitude_deg, p.longitude_deg, p.absolute_altitude_m) for p in positions]
+        return self._update_frame().to_local(global_coords)
+
     async def set_origin_to_home(self, drone_id=0):
         # Set the origin to the home position of the first drone
-        home = await self.alldrones[drone_id].system.telemetry.home().__aiter__().__anext__()
-        self.origin_lat = home.latitude_deg - 0.00005
-        self.origin_lon = home.longitude_deg - 0.00005
-        self.origin_alt = 0 #home.absolute_altitude_m
-        print(f"Origin set to: {self.origin_lat}, {self.origin_lon}, {self.origin_alt}")
-
-    async def connect_swarm(self):
-        await asyncio.gather(*[drone.connect() for drone in self.alldrones])
-        if self.origin_lat is None or self.origin_lon is None:
-            await self.set_origin_to_home()
-
-    async def takeoff_swarm(self):
-        await asyncio.gather(*[drone.takeoff() for drone in self.alldrones])
-
-    async def land_swarm(self):
-        await asyncio.gather(*[drone.land() for drone in self.alldrones])
-
-    async def return_swarm_to_launch(self):
-        await asyncio.gather(*[drone.return_to_launch() for drone in self.alldrones])
-
-    async def run_goto_formation(self, formation_coords):
-        tasks = []
-        for drone, coords in zip(self.alldrones, formation_coords):
-            lat, lon, alt = coords
-            tasks.append(drone.run_goto(lat, lon, alt))
-        await asyncio.gather(*tasks)
-
-    async def run_orbit_formation(self, center_lat, center_lon, radius, altitude):
-        #TODO: not tested
-        tasks = []
-        for i, drone in enumerate(self.alldrones[:self.num_drones]):
-            angle = (2 * 3.14159 * i) / self.num_drones
-            lat = center_lat + (radius * 0.00001 * math.cos(angle))
-            lon = center_lon + (radius * 0.00001 * math.sin(angle))
-            tasks.append(drone.run_orbit(radius=5, velocity_ms=2, relative_altitude=altitude, 
-                                         latitude_deg=lat, longitude_deg=lon))
-        await asyncio.gather(*tasks)
-
-    async def run_goto_local(self, local_coords):
-        tasks = []
-        for drone, coords in zip(self.alldrones, local_coords):
-            x, y, z = coords
-            lat, lon, alt = local_to_global(x, y, z, self.origin_lat, self.origin_lon, self.origin_alt)
-            tasks.append(drone.run_goto(lat, lon, alt - self.origin_alt))  # alt is relative to origin
-        await asyncio.gather(*tasks)
-
-    async def run_orbit_formation_local(self, center_x, center_y, radius, altitude, num_drones):
-        #TODO: not tested
-        center_lat, center_lon, _ = local_to_global(center_x, center_y, 0, self.origin_lat, self.origin_lon, self.origin_alt)
-        tasks = []
-        for i, drone in enumerate(self.alldrones[:num_drones]):
-            angle = (2 * math.pi * i) / num_drones
-            x = center_x + (radius * math.cos(angle))
-            y = center_y + (radius * math.sin(angle))
-            lat, lon, _ = local_to_global(x, y, 0, self.origin_lat, self.origin_lon, self.origin_alt)
-            tasks.append(drone.run_orbit(radius=5, velocity_ms=2, relative_altitude=altitude, 
-                                         latitude_deg=lat, longitude_deg=lon))
-        await asyncio.gather(*tasks)
+        home = await self.alldrones[drone_id].telemetry_hub.get('home')
+        self.set_origin_coords(home.latitude_deg - 0.00005,
+                               home.longitude_deg - 0.00005,
+                               0) #home.absolute_altitude_m
+        self.log.info("Origin set to: %s, %s, %s", self.origin_lat, self.origin_lon, self.origin_alt)
+
+    async def connect_swarm(self, timeout=None, quorum=None, policy=None):
+        """
+        Connect every drone within a deadline, retrying failed attempts (see swarm_connect.connect_drones).
+
+        The drones that did not connect are left out of active_drones, so the
+        following swarm commands only address the connected ones.
+
+        Args:
+            timeout (float): Deadline of the connect phase, Connect.timeout_s of the config by default.
+            quorum (float): Fraction of drones required, Connect.quorum of the config by default.
+            policy (RetryPolicy): Retry schedule, built from the Connect section of the config by default.
+
+        Returns:
+            ConnectReport: Check report.quorum_met before flying.
+        """
+        options = self.connect_config
+        report = await connect_drones(self.alldrones,
+                                      timeout=timeout or options.get('timeout_s', 15.0),
+                                      quorum=options.get('quorum', 1.0) if quorum is None else quorum,
+                                      policy=policy or RetryPolicy.from_config(options),
+                                      grace=options.get('grace_s'))
+        connected = set(report.connected)
+        self.active_drones = [drone for drone in self.alldrones
+                              if drone.id in connected and drone.id not in self.breached]
+        self.connect_report = report
+        if self.active_drones and (self.origin_lat is None or self.origin_lon is None):
+            await self.set_origin_to_home(self.alldrones.index(self.active_drones[0]))
+        return report
+
+    def release_servers(self):
+        """Hand the pooled mavsdk_servers back to the pool, they stay warm for the next swarm."""
+        for drone in self.alldrones:
+            drone.release_server()
+
+    # Swarm commands fan out through self.executor and return its FanOutReport. With
+    # synchronized=True the preconditions of every drone are resolved first and the
+    # commands are then sent together (SwarmExecutor.run_synchronized), which reports
+    # the send-time skew between drones.
+
+    async def _dispatch(self, command, drones, run, prepare, synchronized, settle=None, finalize=None):
+        if synchronized:
+            return await self.executor.run_synchronized(command, drones, prepare, self.sync_lead_time, finalize)
+        return await self.executor.run(command, drones, run, settle)
+
+    async def takeoff_swarm(self, synchronized=False):
+        # synchronized: the drones are armed all at once right before the release, not while
+        # the rest of the swarm is still preparing
+        return await self._dispatch('takeoff', self.active_drones, lambda drone: drone.takeoff(),
+                                    lambda drone: drone.prepare_takeoff(), synchronized,
+                                    finalize=lambda drone: drone.arm())
+
+    async def land_swarm(self, synchronized=False):
+        # only sending the command takes an executor slot, the drones descend together
+        return await self._dispatch('land', self.active_drones, lambda drone: drone.send_land(),
+                                    lambda drone: drone.prepare_land(), synchronized,
+                                    lambda drone: drone.wait_landed())
+
+    async def return_swarm_to_launch(self, synchronized=False):
+        return await self._dispatch('return_to_launch', self.active_drones,
+                                    lambda drone: drone.send_return_to_launch(),
+                                    lambda drone: drone.prepare_return_to_launch(), synchronized,
+                                    lambda drone: drone.wait_landed())
+
+    def _drone_local_positions(self, drones):
+        """(N, 3) local positions (z above the origin) of drones, NaN for the drones without position yet."""
+        rows = self.state.array[[drone.id - 1 for drone in drones]]
+        global_coords = np.column_stack((rows['latitude'], rows['longitude'], rows['relative_altitude']))
+        # the state store is only filled while the drones are monitored, fall back to the telemetry cache
+        for index in np.flatnonzero(np.isnan(global_coords).any(axis=1)):
+            position = drones[index].telemetry_hub.latest('position')
+            if position is not None:
+                global_coords[index] = (position.latitude_deg, position.longitude_deg, position.relative_altitude_m)
+        global_coords[:, 2] += self.origin_alt
+        return self._update_frame().to_local(global_coords)
+
+    def _live_positions(self):
+        if self._update_frame() is None:
+            return None
+        # every connected drone, including the breached ones still flying home
+        drones = [drone for drone in self.alldrones if drone.is_connected]
+        return [drone.id for drone in drones], self._drone_local_positions(drones)
+
+    def _check_global_target(self, latitude_deg, longitude_deg, altitude_m):
+        # altitude_m is relative, as passed to Drone.run_goto
+        frame = self._update_frame()
+        if frame is not None:
+            self.geofence.validate(frame.to_local((latitude_deg, longitude_deg, altitude_m + self.origin_alt)))
+
+    async def _on_geofence_breach(self, drone_id, zone, position):
+        action = self.geofence_config.get('breach_action', 'return_to_launch')
+        if action not in ('return_to_launch', 'land') or drone_id in self.breached:
+            return
+        drone = self.alldrones[drone_id - 1]
+        # take the drone out of the swarm first, so that no later command or setpoint overrides the breach action
+        self.breached.add(drone_id)
+        self.active_drones = [active for active in self.active_drones if active.id != drone_id]
+        for streamer in self._streamers:
+            streamer.disable([drone_id])
+        # only send the command (with the executor's timeout and retries), the touchdown is not awaited
+        if action == 'return_to_launch':
+            await self.executor.run(action, [drone], lambda drone: drone.send_return_to_launch())
+        else:
+            await self.executor.run(action, [drone], lambda drone: drone.send_land())
+
+    def _formation_targets(self, coords, slot_positions=None):
+        """
+        Map the connected drones to the slots of a formation.
+
+        With the 'order' assignment, slot i belongs to the i-th drone of the
+        swarm, whether or not it connected. Otherwise every connected drone
+        gets the slot minimizing the total (or worst) travel distance of the
+        swarm, see formation_assignment.assign_slots.
+
+        Args:
+            coords (list): Target of each slot, as passed to the drones.
+            slot_positions (array_like): (M, 3) local positions of the slots
+                (z above the origin), needed by every assignment but 'order'.
+
+        Returns:
+            dict: drone -> target.
+        """
+        if self.assignment == ORDER or slot_positions is None or self._update_frame() is None:
+            active = set(self.active_drones)
+            return {drone: target for drone, target in zip(self.alldrones, coords) if drone in active}
+        drones = self.active_drones
+        slots = assign_slots(self._drone_local_positions(drones), slot_positions, self.assignment)
+        return {drone: coords[slot] for drone, slot in zip(drones, slots.tolist()) if slot >= 0}
+
+    async def run_goto_formation(self, formation_coords, synchronized=False):
+        frame = self._update_frame()
+        slot_positions = None
+        if frame is not None:
+            slot_positions = frame.to_local([(lat, lon, alt + self.origin_alt) for lat, lon, alt in formation_coords])
+            self.geofence.validate(slot_positions)
+        targets = self._formation_targets(formation_coords, slot_positions)
+        return await self._dispatch('goto_location', list(targets), lambda drone: drone.run_goto(*targets[drone]),
+                                    lambda drone: drone.prepare_goto(*targets[drone]), synchronized)
+
+    async def run_goto_local(self, local_coords, synchronized=False):
+        self.geofence.validate(local_coords)
+        global_coords = self._update_frame().to_global(local_coords)
+        # alt is relative to origin
+        targets = self._formation_targets([(lat, lon, alt - self.origin_alt) for lat, lon, alt in global_coords.tolist()],
+                                          local_coords)
+        return await self._dispatch('goto_location', list(targets), lambda drone: drone.run_goto(*targets[drone]),
+                                    lambda drone: drone.prepare_goto(*targets[drone]), synchronized)
+
+    def _plan_transition(self, slot_positions, drones=None):
+        """
+        Assign the slots to the connected drones by minimum sum of squared
+        distances and plan their transition (see run_transition).
+
+        Args:
+            slot_positions (ndarray): (M, 3) local positions of the slots.
+            drones (list): Drones to move, the connected drones by default.
+
+        Returns:
+            tuple: (drones given a slot, their slot indices, TransitionPlan).
+        """
+        self.geofence.validate(slot_positions)
+        candidates = self.active_drones if drones is None else list(drones)
+        starts = self._drone_local_positions(candidates)
+        slots = assign_slots(starts, slot_positions, SUM_SQUARED)
+        flying = np.flatnonzero(slots >= 0)
+        drones = [candidates[index] for index in flying.tolist()]
+        plan = self.transition_planner.plan(starts[flying], slot_positions[slots[flying]])
+        # layers and detours leave the straight lines: their waypoints must be inside the fence too
+        self.geofence.validate(plan.waypoints.reshape(-1, 3))
+        return drones, slots[flying], plan
+
+    async def _stream_offboard(self, drones, trajectory, duration, heading=None):
+        """
+        Stream the positions trajectory(t) to the drones as offboard setpoints for duration seconds.
+
+        Returns:
+            StreamReport, None when some drone could not enter offboard mode (nothing was streamed then).
+        """
+        # plans and orbits are trajectories of positions, whatever mode the Offboard section sets
+        options = dict(self.offboard_config, mode=POSITION)
+        streamer = SetpointStreamer.from_config(drones, self._update_frame(), options)
+        streamer.follow(trajectory, heading)
+        self._streamers.add(streamer)
+        try:
+            primed = await streamer.prime()
+            started = await self.executor.run('start_offboard', primed, lambda drone: drone.start_offboard())
+            entered = [drone for drone in primed if drone.id in set(started.succeeded)]
+            if len(entered) < len(drones):
+                # the trajectories assume every drone moves: a drone left behind is in the way of the others
+                self.log.error("%s of %s drones did not enter offboard mode, maneuver aborted",
+                               len(drones) - len(entered), len(drones))
+                report = None
+            else:
+                report = await streamer.run(duration)
+        finally:
+            self._streamers.discard(streamer)
+        # stopping offboard puts a drone in hold, which would cancel the breach action
+        entered = [drone for drone in entered if drone.id not in self.breached]
+        await self.executor.run('stop_offboard', entered, lambda drone: drone.stop_offboard())
+        return report
+
+    async def run_transition(self, local_coords):
+        """
+        Fly the connected drones to a formation along trajectories keeping them apart.
+
+        The slots are assigned by minimum sum of squared distances, whatever
+        Formation_assignment says: the synchronized straight lines of that
+        assignment are free of conflicts whenever the formations are spaced
+        sqrt(2) * min_separation or more (see transition_planner). The plan is
+        then streamed to every drone as offboard position setpoints at the
+        Offboard rate; the call returns once the last drone arrived and settled.
+
+        Args:
+            local_coords (list): (x, y, z) of each slot, z above the origin.
+
+        Returns:
+            tuple: (TransitionPlan, StreamReport), the report is None when some
+            drone could not enter offboard mode (the transition is then aborted).
+
+        Raises:
+            PlanningError: No transition keeping the separation was found, no drone moved.
+        """
+        drones, _, plan = self._plan_transition(np.asarray(local_coords, dtype=np.float64).reshape(-1, 3))
+        report = await self._stream_offboard(drones, plan.positions,
+                                             plan.duration + self.offboard_config.get('settle_s', 2.0))
+        return plan, report
+
+    async def run_orbit_formation(self, center_lat, center_lon, radius, altitude, velocity_ms=2, duration=60):
+        """run_orbit_formation_local around a global center, see there."""
+        center = self._update_frame().to_local((center_lat, center_lon, self.origin_alt))[0]
+        return await self.run_orbit_formation_local(center[0], center[1], radius, altitude,
+                                                    velocity_ms=velocity_ms, duration=duration)
+
+    async def run_orbit_formation_local(self, center_x, center_y, radius, altitude, num_drones=None, velocity_ms=2,
+                                        duration=60, drones=None):
+        """
+        Orbit the connected drones as an evenly spaced ring around one shared center.
+
+        The drones first fly to the slots of the ring along a deconflicted
+        transition (see run_transition), then every drone follows the same
+        circle with a fixed phase offset (orbit_trajectory.OrbitTrajectory),
+        facing the center. Both are streamed as time-indexed offboard
+        setpoints in a single stream, so the ring keeps its spacing instead of
+        each drone orbiting on its own.
+
+        Args:
+            center_x (float): Local x (east) of the center in meters.
+            center_y (float): Local y (north) of the center in meters.
+            radius (float): Radius of the ring in meters.
+            altitude (float): Altitude of the ring above the origin in meters.
+            num_drones (int): Slots of the ring, the number of orbiting drones by default.
+            velocity_ms (float): Speed along the circle in m/s (negative: clockwise).
+            duration (float): Seconds of orbit once on the ring.
+            drones (list): Drones of the ring, the connected drones by default.
+
+        Returns:
+            tuple: (TransitionPlan to the ring, OrbitTrajectory, StreamReport or None as in run_transition).
+
+        Raises:
+            PlanningError: The ring is too tight for the minimum separation, or no transition was found.
+        """
+        phases = ring_phases(num_drones or len(self.active_drones if drones is None else drones))
+        slot_positions = ring_positions((center_x, center_y), radius, altitude, phases)
+        drones, slots, plan = self._plan_transition(slot_positions, drones)
+        orbit = OrbitTrajectory((center_x, center_y), radius, altitude, phases[slots], speed=velocity_ms)
+
+        def trajectory(t):
+            return plan.positions(t) if t < plan.duration else orbit.positions(t - plan.duration)
+
+        def heading(t):
+            return orbit.yaw(max(t - plan.duration, 0.0))
+
+        report = await self._stream_offboard(drones, trajectory, plan.duration + duration, heading)
+        return plan, orbit, report
+
+    async def upload_missions(self, local_missions, force=False):
+        """
+        Upload one PX4 mission per drone, to all the drones concurrently.
+
+        Every waypoint list is compiled once (see mission_upload.MissionCompiler)
+        and the compiled missions are cached by content, so identical lists are
+        shared and a list sent again is not recompiled. A drone that already
+        has the same mission is skipped. Uploads run with at most
+        Mission_upload.max_in_flight in flight, each under the Executor
+        timeout and retries of 'upload_mission'.
+
+        Args:
+            local_missions (dict or list): drone id -> (N, 3) local waypoints (z above the origin),
+                or one waypoint list per connected drone.
+            force (bool): Upload the missions even to the drones that already have them.
+
+        Returns:
+            FanOutReport: The value of each result is True if uploaded, False if skipped.
+
+        Raises:
+            GeofenceError: A waypoint breaches the geofence, nothing was uploaded.
+        """
+        frame = self._update_frame()
+        if not isinstance(local_missions, dict):
+            local_missions = {drone.id: waypoints for drone, waypoints in zip(self.active_drones, local_missions)}
+        active = {drone.id: drone for drone in self.active_drones}
+        missing = [drone_id for drone_id in local_missions if drone_id not in active]
+        if missing:
+            self.log.warning("Drones %s are not connected, their missions are not uploaded", missing)
+        drones = [active[drone_id] for drone_id in local_missions if drone_id in active]
+        waypoints = {drone.id: np.asarray(local_missions[drone.id], dtype=np.float64).reshape(-1, 3)
+                     for drone in drones}
+        if waypoints:
+            labels = [f"drone {drone_id} waypoint {index}" for drone_id, points in waypoints.items()
+                      for index in range(len(points))]
+            self.geofence.validate(np.concatenate(list(waypoints.values())), labels)
+        compiled = {drone_id: self.mission_compiler.compile(points, frame, self.origin_alt)
+                    for drone_id, points in waypoints.items()}
+        report = await self.upload_executor.run('upload_mission', drones,
+                                                lambda drone: drone.upload_mission(compiled[drone.id], force))
+        skipped = [drone_id for drone_id, result in report.results.items() if result.ok and result.value is False]
+        self.log.info("Missions uploaded to %s drones, %s unchanged, %s failed",
+                      len(report.succeeded) - len(skipped), len(skipped), len(report.failed))
+        return report
+
+    async def run_mission(self, mission):
+        """
+        Run a declarative mission as a DAG, every drone moving on as soon as its own dependencies are met.
+
+        Args:
+            mission (Mission, dict or str): Mission, its JSON definition or the path of its JSON file
+                (see mission_dag.Mission).
+
+        Returns:
+            MissionReport: Per-step timings and critical path.
+        """
+        if isinstance(mission, str):
+            mission = Mission.load(mission)
+        elif isinstance(mission, dict):
+            mission = Mission.from_config(mission)
+        return await MissionExecutor(self).run(mission)
+
+    def attach_recorder(self, recorder):
+        """Record the telemetry and commands of every drone to one FlightRecorder."""
+        for drone in self.alldrones:
+            drone.attach_recorder(recorder)
+
+    async def start_metrics_server(self, port=None, host='127.0.0.1'):
+        """Enable the instrumentation and serve it as Prometheus text on http://host:port/metrics."""
+        self.metrics.enabled = True
+        self.metrics_server = await self.metrics.start_http_server(port or self.metrics_port, host)
+        self.log.info("Serving swarm metrics on http://%s:%s/metrics", host, port or self.metrics_port)
+        return self.metrics_server
+
+    def start_profiling(self, lag_interval=None):
+        """
+        Start profiling the event loop: loop lag plus wall time and step count per coroutine.
+        Only tasks created from now on are profiled, so call it before connect_swarm.
+        """
+        interval = lag_interval or self.profiling_config.get('lag_interval_s', 0.05)
+        self.profiler = LoopProfiler(lag_interval=interval).start()
+        return self.profiler
+
+    def stop_profiling(self, report_path=None):
+        """
+        Stop the profiler, print its report and dump it (text report and
+        flamegraph-compatible collapsed stacks) next to report_path.
+        """
+        if self.profiler is None:
+            return None
+        self.profiler.stop()
+        self.log.info(self.profiler.report())
+        report_path = report_path or self.profiling_config.get('report')
+        if report_path:
+            for path in self.profiler.dump(report_path):
+                self.log.info("Profile written to %s", path)
+        return self.profiler
+
+    def snapshot(self):
+        """
+        Zero-copy, read-only view of the swarm state (one row per drone, see swarm_state.STATE_DTYPE).
+
+        Example:
+            state = swarm.snapshot()
+            airborne = state['id'][state['in_air']]
+        """
+        return self.state.snapshot()
+
+    async def wait_all(self, predicate, timeout=None, drones=None):
+        """
+        Wait until predicate holds for every drone (see Drone.wait_until).
+
+        Returns:
+            bool: True if all drones met the condition before the timeout.
+        """
+        drones = self.active_drones if drones is None else drones
+        results = await asyncio.gather(*[drone.wait_until(predicate, timeout) for drone in drones])
+        if not all(results):
+            late = [drone.id for drone, ok in zip(drones, results) if not ok]
+            self.log.warning("Drones %s did not meet the condition within %s s", late, timeout)
+        return all(results)
+
+    async def wait_any(self, predicate, timeout=None, drones=None):
+        """
+        Wait until predicate holds for at least one drone.
+
+        Returns:
+            Drone: The first drone that met the condition, or None on timeout.
+        """
+        drones = self.active_drones if drones is None else drones
+        tasks = {asyncio.ensure_future(drone.wait_until(predicate)): drone for drone in drones}
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=timeout):
+                await next_done
+                return next(tasks[task] for task in tasks if task.done())
+        except asyncio.TimeoutError:
+            self.log.warning("No drone met the condition within %s s", timeout)
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def _monitor_swarm(self):
-        tasks = [asyncio.ensure_future(drone._start_state_monitoring()) for drone in self.alldrones]
+        tasks = [asyncio.ensure_future(drone._start_state_monitoring()) for drone in self.active_drones]
         await asyncio.gather(*tasks)
-        print("Monitoring started")
+        self.log.info("Monitoring started")
 
     def print_all_internal_statuses(self):
         for drone in self.alldrones:
             drone.print_internal_status()
 
+async def fly_to_local(swarm, local_coords):
+    if swarm.transition_config.get('enabled', False):
+        await swarm.run_transition(local_coords)
+    else:
+        await swarm.run_goto_local(local_coords)
+        await swarm.wait_all(reached_goto_target(1.0), timeout=60)
+
+
 async def run_swarm_mission(swarm):
-    await swarm.connect_swarm()
-    await asyncio.sleep(4)    
+    report = await swarm.connect_swarm()
+    if not report.quorum_met:
+        swarm.log.error("Not enough drones connected, aborting the mission")
+        return
+    await swarm.wait_all(global_position_ok(), timeout=30)
+    if swarm.proximity_config.get('enabled', False):
+        swarm.proximity.start()
+    if swarm.geofence_config.get('enabled', False):
+        swarm.geofence_monitor.start()
     await swarm.takeoff_swarm()
-    await asyncio.sleep(4)
+    await swarm.wait_all(relative_altitude_above(2.0), timeout=30)
     
     # Example formation flight
     formation_coords = [
@@ -178,8 +708,7 @@ async def run_swarm_mission(swarm):
         # Add more coordinates for additional drones
     ]
 
-    await swarm.run_goto_local(local_formation_coords)
-    await asyncio.sleep(10)
+    await fly_to_local(swarm, local_formation_coords)
 
     local_formation_coords = [
         (10, 10, 20),   # 10m east, 0m north, 20m up
@@ -188,28 +717,54 @@ async def run_swarm_mission(swarm):
         # Add more coordinates for additional drones
     ]
 
-    await swarm.run_goto_local(local_formation_coords)
-    await asyncio.sleep(10)
+    await fly_to_local(swarm, local_formation_coords)
     
     # Example orbit formation
-    #await swarm.run_orbit_formation(47.397606, 8.543060, 50, 30)
-    #await asyncio.sleep(60)
+    #await swarm.run_orbit_formation(47.397606, 8.543060, 50, 30, duration=60)
 
     # Example orbit formation using local coordinates
-    #await swarm.run_orbit_formation_local(0, 0, 50, 30, len(swarm.drones))
-    #await asyncio.sleep(60)
+    #await swarm.run_orbit_formation_local(0, 0, 50, 30, duration=60)
     
     await swarm.return_swarm_to_launch()
+    swarm.proximity.stop()
+    swarm.geofence_monitor.stop()
 
     # Print coordinates of drone 0
     #asyncio.ensure_future(swarm._monitor_swarm())
     #await swarm.land_swarm()
 
+async def run_mission_file(swarm, path):
+    report = await swarm.connect_swarm()
+    if not report.quorum_met:
+        swarm.log.error("Not enough drones connected, aborting the mission")
+        return
+    mission = Mission.load(path)
+    if swarm.proximity_config.get('enabled', False):
+        swarm.proximity.start()
+    if swarm.geofence_config.get('enabled', False):
+        swarm.geofence_monitor.start()
+    try:
+        mission_report = await swarm.run_mission(mission)
+    finally:
+        swarm.proximity.stop()
+        swarm.geofence_monitor.stop()
+    return mission_report  # already logged by MissionExecutor.run
+
 async def main():
     config = read_config()
+    setup_logging_from_config(config)
     swarm = DroneSwarm(config)  # Create a swarm of n drones
     swarm.print_all_internal_statuses()
-    await run_swarm_mission(swarm)
+    if swarm.profiling_config.get('enabled', False):
+        swarm.start_profiling()
+    mission_file = config.get('Mission', {}).get('file')
+    try:
+        if mission_file:
+            await run_mission_file(swarm, mission_file)
+        else:
+            await run_swarm_mission(swarm)
+    finally:
+        swarm.stop_profiling()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def ring_phases(num_slots):
+    """(num_slots,) phase of each slot of an evenly spaced ring, in radians counterclockwise from east."""
+    return 2 * np.pi * np.arange(num_slots) / max(num_slots, 1)
+
+
+def ring_positions(center, radius, altitude, phases):
+    """(N, 3) local positions (x east, y north, z up) of the ring slots at the given phases."""
+    phases = np.asarray(phases, dtype=np.float64)
+    return np.column_stack((center[0] + radius * np.cos(phases), center[1] + radius * np.sin(phases),
+                            np.full(len(phases), float(altitude))))
+
+
+class OrbitTrajectory:
+    """
+    Phase-locked circular trajectories of a swarm around one shared center.
+
+    Every drone keeps a fixed phase offset on the same circle and all of
+    them turn by the same angle, so the ring stays evenly spaced. The unit
+    vectors of the phases are computed once; the positions at a time t are
+    one rotation of these arrays, so a tick costs a few array operations
+    whatever the size of the swarm. The angular speed ramps up linearly over
+    the first `ramp` seconds, the drones starting at rest on their slots.
+
+    Args:
+        center (tuple): (x, y) local coordinates of the center in meters.
+        radius (float): Radius in meters.
+        altitude (float): z of the ring (above the origin) in meters.
+        phases (array_like): (N,) phase of each drone in radians, see ring_phases.
+        speed (float): Speed along the circle in m/s, positive counterclockwise.
+        ramp (float): Seconds to reach the speed.
+    """
+
+    def __init__(self, center, radius, altitude, phases, speed=2.0, ramp=2.0):
+        if radius <= 0:
+            raise ValueError(f"Invalid orbit radius {radius} m")
+        self.center = (float(center[0]), float(center[1]))
+        self.radius = float(radius)
+        self.altitude = float(altitude)
+        self.phases = np.asarray(phases, dtype=np.float64)
+        self.speed = speed
+        self.ramp = ramp
+        self.omega = speed / self.radius
+        self._cos = np.cos(self.phases)
+        self._sin = np.sin(self.phases)
+
+    def angle(self, t):
+        """Angle turned by the ring t seconds after the start (t scalar or array)."""
+        t = np.maximum(np.asarray(t, dtype=np.float64), 0.0)
+        if not self.ramp:
+            return self.omega * t
+        return self.omega * np.where(t < self.ramp, t * t / (2 * self.ramp), t - self.ramp / 2)
+
+    def _unit(self, t):
+        # (N, T) components of the unit vectors of the drones, at times t of shape (T,)
+        angle = np.atleast_1d(self.angle(t))
+        c, s = np.cos(angle), np.sin(angle)
+        return (self._cos[:, None] * c[None, :] - self._sin[:, None] * s[None, :],
+                self._sin[:, None] * c[None, :] + self._cos[:, None] * s[None, :])
+
+    def sample(self, times):
+        """(N, T, 3) positions of every drone at each of the times."""
+        x, y = self._unit(times)
+        z = np.full(x.shape, self.altitude)
+        return np.stack((self.center[0] + self.radius * x, self.center[1] + self.radius * y, z), axis=2)
+
+    def positions(self, t):
+        """(N, 3) positions of every drone t seconds after the start."""
+        return self.sample([t])[:, 0]
+
+    def yaw(self, t):
+        """(N,) heading of every drone facing the center, in degrees from north."""
+        x, y = self._unit([t])
+        return np.degrees(np.arctan2(-x[:, 0], -y[:, 0]))
+
+    def spacing(self):
+        """Distance between two neighbouring drones on the ring."""
+        if len(self.phases) < 2:
+            return float('inf')
+        phases = np.sort(np.mod(self.phases, 2 * np.pi))
+        gaps = np.diff(np.append(phases, phases[0] + 2 * np.pi))
+        return float(2 * self.radius * np.sin(gaps.min() / 2))
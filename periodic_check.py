@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from instrumentation import Histogram, JITTER_BUCKETS
+from swarm_logging import get_logger
+
+
+class PeriodicCheck:
+    """
+    Base of the monitors that run check() at a fixed rate in the background.
+
+    The checks are scheduled on drift-free deadlines; a check that overruns
+    skips the deadlines it missed instead of catching up, and a check that
+    raises is logged and does not stop the monitor. Subclasses implement
+    check() and call _observe() at the end of each check they actually ran.
+
+    Args:
+        name (str): Name of the monitor, also the name of its logger.
+        rate_hz (float): Checks per second.
+    """
+
+    def __init__(self, name, rate_hz=10.0):
+        self.name = name
+        self.rate_hz = rate_hz
+        self.checks = 0
+        self.missed = 0
+        self.check_time = Histogram(JITTER_BUCKETS)
+        self.log = get_logger(name)
+        self._task = None
+
+    def check(self):
+        """Run one check now."""
+        raise NotImplementedError
+
+    def _observe(self, start):
+        """Count a check that started at time.perf_counter() start."""
+        self.checks += 1
+        self.check_time.observe(time.perf_counter() - start)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.rate_hz
+        deadline = loop.time()
+        while True:
+            try:
+                self.check()
+            except Exception as error:
+                self.log.warning("%s check failed: %s", self.name.capitalize(), error)
+            deadline += period
+            now = loop.time()
+            if now > deadline:
+                # fell behind: skip the checks that could not run instead of catching up
+                skipped = int((now - deadline) // period) + 1
+                self.missed += skipped
+                deadline += skipped * period
+            await asyncio.sleep(deadline - now)
+
+    def start(self):
+        """Check in the background until stop()."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        return {'checks': self.checks, 'missed': self.missed, 'check_time': self.check_time.summary()}
@@ -0,0 +1,189 @@
+import itertools
+import time
+
+import numpy as np
+
+from periodic_check import PeriodicCheck
+from swarm_logging import get_logger
+from telemetry_hub import Subscription
+
+log = get_logger('proximity')
+
+VIOLATION = 'violation'  # a pair of drones came closer than the threshold
+CLEARED = 'cleared'      # the pair is apart again
+
+# the cell itself plus half of its 26 neighbours: every pair of neighbouring cells is visited once
+_OFFSETS = [(0, 0, 0)] + [offset for offset in itertools.product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+
+
+def close_pairs(positions, threshold):
+    """
+    Every pair of points closer than threshold, using a uniform grid of threshold-sized cells.
+
+    Points are bucketed by cell and sorted by cell key; the candidates of a
+    point are the points of its cell and of its neighbour cells, found with a
+    binary search per neighbour offset. Only nearby points are compared, so
+    the cost grows with the number of points and of close pairs, not with
+    the square of the number of points.
+
+    Args:
+        positions (array_like): (N, 3) local positions; rows with NaN are ignored.
+        threshold (float): Distance in meters.
+
+    Returns:
+        tuple: (P, 2) index pairs (i < j) and their (P,) distances.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    valid = np.flatnonzero(~np.isnan(positions).any(axis=1))
+    if len(valid) < 2:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+    cells = np.floor(positions[valid] / threshold).astype(np.int64)
+    # one spare cell on each side, so the key of a neighbour never wraps to another row
+    cells -= cells.min(axis=0) - 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    points = positions[valid[order]]
+    n = len(points)
+
+    first, second, distances = [], [], []
+    for dx, dy, dz in _OFFSETS:
+        neighbour = keys + (dx * dims[1] + dy) * dims[2] + dz
+        high = np.searchsorted(keys, neighbour, side='right')
+        # within the same cell, only the points sorted after this one
+        low = np.arange(1, n + 1) if (dx, dy, dz) == (0, 0, 0) else np.searchsorted(keys, neighbour, side='left')
+        counts = np.maximum(high - low, 0)
+        total = int(counts.sum())
+        if not total:
+            continue
+        a = np.repeat(np.arange(n), counts)
+        b = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(low, counts)
+        distance = np.linalg.norm(points[a] - points[b], axis=1)
+        close = distance < threshold
+        first.append(a[close])
+        second.append(b[close])
+        distances.append(distance[close])
+
+    if not first:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+    pairs = valid[order[np.column_stack((np.concatenate(first), np.concatenate(second)))]]
+    pairs.sort(axis=1)
+    return pairs, np.concatenate(distances)
+
+
+class ProximityEvent:
+    """
+    Start (VIOLATION) or end (CLEARED) of a separation violation by a pair of drones.
+
+    Attributes:
+        kind (str): VIOLATION or CLEARED.
+        drone_ids (tuple): Ids of the two drones, smaller first.
+        distance (float): Distance between them in meters when the event was raised.
+        time (float): time.monotonic() of the check that raised it.
+    """
+
+    def __init__(self, kind, drone_ids, distance, time):
+        self.kind = kind
+        self.drone_ids = drone_ids
+        self.distance = distance
+        self.time = time
+
+    def as_dict(self):
+        return {'kind': self.kind, 'drone_ids': list(self.drone_ids), 'distance_m': self.distance,
+                'time': self.time}
+
+    def __repr__(self):
+        return f"ProximityEvent({self.kind}, drones {self.drone_ids}, {self.distance:.2f} m)"
+
+
+class ProximityMonitor(PeriodicCheck):
+    """
+    Checks the separation of every pair of drones at a fixed rate.
+
+    Each check indexes the current local positions of the swarm in a uniform
+    grid (see close_pairs) and compares the close pairs with those of the
+    previous check: a pair closer than the threshold raises a VIOLATION
+    event once, and a CLEARED event when it is apart again. Events are
+    published to subscribers like a telemetry topic (bounded queues, a slow
+    consumer loses the oldest events).
+
+    Args:
+        positions (callable): () -> (drone ids (N,), local positions (N, 3)), or None when unknown yet.
+        threshold (float): Minimum separation in meters.
+        rate_hz (float): Checks per second, usually the telemetry rate.
+        maxsize (int): Default queue size of the subscriptions.
+
+    Example:
+        monitor.start()
+        with monitor.subscribe() as events:
+            async for event in events:
+                if event.kind == VIOLATION:
+                    await swarm.executor.run('hold', ...)
+    """
+
+    def __init__(self, positions, threshold=3.0, rate_hz=10.0, maxsize=64):
+        super().__init__('proximity', rate_hz)
+        self.positions = positions
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.violations = {}  # (id, id) -> distance of the pairs currently too close
+        self._latest = None
+        self._subscribers = set()
+
+    @classmethod
+    def from_config(cls, positions, options):
+        return cls(positions,
+                   threshold=options.get('threshold_m', 3.0),
+                   rate_hz=options.get('rate_hz', 10.0),
+                   maxsize=options.get('queue_size', 64))
+
+    def subscribe(self, maxsize=None):
+        """Subscribe to every future ProximityEvent."""
+        subscription = Subscription(self, 'proximity', maxsize or self.maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        self._subscribers.discard(subscription)
+
+    def latest(self, topic='proximity'):
+        """Last event raised, None before the first one."""
+        return self._latest
+
+    def _publish(self, event):
+        self._latest = event
+        for subscription in list(self._subscribers):
+            subscription._push(event)
+
+    def check(self):
+        """
+        Run one check now.
+
+        Returns:
+            list: ProximityEvents raised by this check.
+        """
+        current = self.positions()
+        if current is None:
+            return []
+        start = time.perf_counter()
+        ids, positions = current
+        ids = np.asarray(ids)
+        pairs, distances = close_pairs(positions, self.threshold)
+        close = {(int(a), int(b)): float(d) for (a, b), d in zip(ids[pairs].tolist(), distances.tolist())}
+        now = time.monotonic()
+        events = [ProximityEvent(VIOLATION, pair, distance, now)
+                  for pair, distance in close.items() if pair not in self.violations]
+        events += [ProximityEvent(CLEARED, pair, distance, now)
+                   for pair, distance in self.violations.items() if pair not in close]
+        self.violations = close
+        self._observe(start)
+        for event in events:
+            if event.kind == VIOLATION:
+                log.warning("Drones %s and %s only %.2f m apart (minimum %.2f m)", *event.drone_ids,
+                            event.distance, self.threshold)
+            self._publish(event)
+        return events
+
+    def stats(self):
+        return dict(super().stats(), violations=len(self.violations))
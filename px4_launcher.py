@@ -0,0 +1,278 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+from drone_control import read_config
+from swarm_logging import get_logger, setup_logging_from_config
+
+log = get_logger('launcher')
+
+# Default command lines, formatted with the keys of SwarmLauncher._command_values
+PX4_COMMAND = ['{px4_path}', '-i', '{instance}']
+MAVSDK_SERVER_COMMAND = ['{mavsdk_server_path}', '-p', '{grpc_port}', 'udp://:{udp_port}']
+SIMULATOR_COMMAND = [sys.executable, 'simulation-gazebo']
+
+MAVLINK_MAGIC = (0xFD, 0xFE)  # first byte of MAVLink v2 / v1 frames
+
+
+class LaunchError(Exception):
+    """A process exited or did not become ready in time."""
+
+
+def grid_position(index, distance):
+    """Spawn position of the index-th (0-based) vehicle on the 3xN grid used by the fake backend."""
+    return (index % 3) * distance, (index // 3) * distance
+
+
+class ManagedProcess:
+    """
+    Child process started in its own session with stdout/stderr captured to a log file.
+
+    The process is a plain subprocess.Popen whose exit is polled, not an
+    asyncio subprocess: it is not tied to the event loop that started it, so
+    a process that outlives an asyncio.run (the warm servers of
+    mavsdk_server_pool.py) can still be watched and stopped from the next one.
+
+    Args:
+        name (str): Name used in messages, e.g. 'px4-3'.
+        argv (list): Command line.
+        log_path (str): File receiving stdout and stderr.
+        env (dict): Extra environment variables.
+    """
+
+    def __init__(self, name, argv, log_path, env=None):
+        self.name = name
+        self.argv = [str(arg) for arg in argv]
+        self.log_path = log_path
+        self.env = env or {}
+        self.process = None
+        self._log_file = None
+
+    async def start(self):
+        self._log_file = open(self.log_path, 'ab')
+        env = dict(os.environ, **{key: str(value) for key, value in self.env.items()})
+        try:
+            self.process = subprocess.Popen(self.argv, stdin=subprocess.DEVNULL, stdout=self._log_file,
+                                            stderr=subprocess.STDOUT, env=env, start_new_session=True)
+        except OSError as error:
+            self._log_file.close()
+            raise LaunchError(f"{self.name}: cannot start {self.argv[0]}: {error}") from error
+        log.debug("Started %s (pid %s): %s", self.name, self.process.pid, ' '.join(self.argv))
+        return self
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    async def wait(self, interval=0.05):
+        """Wait for the process to exit and return its exit code."""
+        while self.process.poll() is None:
+            await asyncio.sleep(interval)
+        return self.process.returncode
+
+    async def wait_ready(self, probe, timeout):
+        """
+        Wait for probe() to complete, failing early if the process exits first.
+
+        Raises:
+            LaunchError: The process exited or the probe timed out.
+        """
+        probe_task = asyncio.ensure_future(probe())
+        exit_task = asyncio.ensure_future(self.wait())
+        try:
+            done, _ = await asyncio.wait({probe_task, exit_task}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (probe_task, exit_task):
+                task.cancel()
+        if probe_task in done and not probe_task.cancelled() and probe_task.exception() is None:
+            return
+        if exit_task in done:
+            raise LaunchError(f"{self.name} exited with code {self.process.returncode}, see {self.log_path}")
+        if probe_task in done and probe_task.exception() is not None:
+            raise LaunchError(f"{self.name} readiness probe failed: {probe_task.exception()}")
+        raise LaunchError(f"{self.name} not ready after {timeout} s, see {self.log_path}")
+
+    async def stop(self, timeout=5.0):
+        """Terminate the whole process group, killing it if it does not exit within timeout."""
+        if self.running:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+                await asyncio.wait_for(self.wait(), timeout)
+            except asyncio.TimeoutError:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                await self.wait()
+            except ProcessLookupError:
+                pass
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+
+class _FirstDatagram(asyncio.DatagramProtocol):
+    def __init__(self, received):
+        self.received = received
+
+    def datagram_received(self, data, addr):
+        if data and data[0] in MAVLINK_MAGIC and not self.received.done():
+            self.received.set_result(addr)
+
+
+async def wait_for_mavlink(port, host='0.0.0.0'):
+    """Bind the UDP port PX4 streams to and wait for its first MAVLink frame."""
+    loop = asyncio.get_running_loop()
+    received = loop.create_future()
+    while True:
+        try:
+            transport, _ = await loop.create_datagram_endpoint(lambda: _FirstDatagram(received),
+                                                               local_addr=(host, port))
+            break
+        except OSError:
+            await asyncio.sleep(0.2)  # port still held by a previous run
+    try:
+        return await received
+    finally:
+        transport.close()
+
+
+async def wait_for_tcp(port, host='127.0.0.1', interval=0.1):
+    """Retry a TCP connection until the port accepts it (mavsdk_server gRPC)."""
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(interval)
+            continue
+        writer.close()
+        return
+
+
+class SwarmLauncher:
+    """
+    Starts the PX4 SITL instances and their mavsdk_server processes of a swarm.
+
+    Instances are brought up concurrently, at most max_parallel at a time:
+    each PX4 instance is ready once its first MAVLink frame arrives on
+    UDP_PORT_BASE + i, then its mavsdk_server is started and is ready once
+    GRPC_PORT_BASE + i accepts connections. Each process logs to its own file
+    in log_dir. Any failure tears everything down and raises LaunchError.
+
+    Args:
+        config (dict): Configuration as returned by read_config (Launcher section optional).
+        px4_command, mavsdk_server_command (list): Command templates, formatted with
+            px4_path, mavsdk_server_path, instance, grpc_port, udp_port (stub executables can be used for tests).
+
+    Example:
+        async with SwarmLauncher(config):
+            await run_swarm_mission(DroneSwarm(config))
+    """
+
+    def __init__(self, config, px4_command=None, mavsdk_server_command=None):
+        launcher = config.get('Launcher', {})
+        self.config = config
+        self.num_drones = config['NUM_DRONES']
+        self.max_parallel = launcher.get('max_parallel', 4)
+        self.ready_timeout = launcher.get('ready_timeout_s', 60)
+        self.log_dir = launcher.get('log_dir', 'logs/launcher')
+        self.px4_command = px4_command or launcher.get('px4_command', PX4_COMMAND)
+        self.mavsdk_server_command = mavsdk_server_command or launcher.get('mavsdk_server_command',
+                                                                           MAVSDK_SERVER_COMMAND)
+        self.headless = not config.get('Sim_Env', False)
+        self.processes = []
+
+    def _command_values(self, instance):
+        return {
+            'px4_path': os.path.expanduser(self.config['PX4_gazebo_path']),
+            'mavsdk_server_path': os.path.expanduser(self.config['MavSdkServerPath']),
+            'instance': instance,
+            'grpc_port': self.config['GRPC_PORT_BASE'] + instance,
+            'udp_port': self.config['UDP_PORT_BASE'] + instance,
+        }
+
+    def _process(self, name, template, values, env=None):
+        argv = [arg.format(**values) for arg in template]
+        process = ManagedProcess(name, argv, os.path.join(self.log_dir, f'{name}.log'), env)
+        self.processes.append(process)
+        return process
+
+    async def _start_simulator(self):
+        simulator = self._process('gazebo', SIMULATOR_COMMAND, {})
+        await simulator.start()
+        await asyncio.sleep(3)  # gz has no port to probe, give it time to load the world
+        if not simulator.running:
+            raise LaunchError(f"Gazebo exited with code {simulator.process.returncode}, see {simulator.log_path}")
+
+    async def _start_instance(self, instance, slots):
+        values = self._command_values(instance)
+        x, y = grid_position(instance - 1, self.config['drone_deploy_distance'])
+        env = {
+            'HEADLESS': int(self.headless),
+            'PX4_SYS_AUTOSTART': 4001,
+            'PX4_GZ_MODEL_POSE': f'{x},{y}',
+            'PX4_GZ_MODEL': 'x500',
+        }
+        async with slots:
+            px4 = self._process(f'px4-{instance}', self.px4_command, values, env)
+            log.info("Launching agent %s at position %s,%s", instance, x, y)
+            await px4.start()
+            await px4.wait_ready(lambda: wait_for_mavlink(values['udp_port']), self.ready_timeout)
+
+            server = self._process(f'mavsdk_server-{instance}', self.mavsdk_server_command, values)
+            await server.start()
+            await server.wait_ready(lambda: wait_for_tcp(values['grpc_port']), self.ready_timeout)
+            log.info("Drone %s ready: mavsdk_server at gRPC port %s, UDP port %s",
+                     instance, values['grpc_port'], values['udp_port'])
+
+    async def start(self):
+        """Bring up every instance, raising LaunchError (after tearing down) if any fails."""
+        os.makedirs(self.log_dir, exist_ok=True)
+        try:
+            if not self.headless:
+                await self._start_simulator()
+            slots = asyncio.Semaphore(self.max_parallel)
+            results = await asyncio.gather(*(self._start_instance(i, slots) for i in range(1, self.num_drones + 1)),
+                                           return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                for error in errors:
+                    log.error("%s", error)
+                raise errors[0]
+        except BaseException:
+            await self.stop()
+            raise
+        log.info("Launched %s PX4 instances.", self.num_drones)
+        return self
+
+    async def stop(self):
+        """Terminate every started process, the most recently started first."""
+        await asyncio.gather(*(process.stop() for process in reversed(self.processes)))
+        self.processes = []
+
+    def exited(self):
+        """Processes that exited on their own since the launch."""
+        return [process for process in self.processes if process.process is not None and not process.running]
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+async def main():
+    config = read_config()
+    setup_logging_from_config(config)
+    async with SwarmLauncher(config) as launcher:
+        # keep the swarm up until Ctrl+C or until a process dies
+        while not launcher.exited():
+            await asyncio.sleep(1)
+        for process in launcher.exited():
+            log.error("%s exited with code %s, see %s", process.name, process.process.returncode, process.log_path)
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
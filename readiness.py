@@ -0,0 +1,45 @@
+import time
+
+
+class ReadinessCache:
+    """
+    Last known navigation readiness of a drone: health flags and home position.
+
+    Kept up to date by every health and home sample of the drone's telemetry
+    hub, whose streams keep running once the first gating opened them, so goto
+    and orbit commands can be dispatched immediately while the drone is
+    known-good, and only wait on the telemetry streams when it is not (or the
+    cache went stale because no sample arrived for max_age seconds).
+
+    Args:
+        max_age (float): Seconds after which a health sample is no longer trusted.
+    """
+
+    def __init__(self, max_age=2.0):
+        self.max_age = max_age
+        self.global_position_ok = False
+        self.home_position_ok = False
+        self.home = None         # telemetry.Position of the home
+        self.health_time = None  # time.monotonic() of the last health sample
+
+    def update_health(self, health, now=None):
+        self.global_position_ok = health.is_global_position_ok
+        self.home_position_ok = health.is_home_position_ok
+        self.health_time = time.monotonic() if now is None else now
+
+    def update_home(self, home):
+        self.home = home
+
+    def is_fresh(self, now=None):
+        if self.health_time is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.health_time <= self.max_age
+
+    def is_ready(self, now=None):
+        """True if global and home position are known-good and the home is known."""
+        return (self.global_position_ok and self.home_position_ok and self.home is not None
+                and self.is_fresh(now))
+
+    def invalidate(self):
+        self.health_time = None
@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+
+from mavsdk import core
+from mavsdk import mission
+from mavsdk import telemetry
+
+from flight_recorder import FlightLog
+
+
+class ReplayClock:
+    """
+    Maps the time of a recorded log onto the event loop.
+
+    Args:
+        speed (float): 1.0 replays in real time, N replays N times faster,
+            None (or 0) replays as fast as possible: samples are released one
+            at a time in (time, order) order with a loop iteration between
+            them, so runs are deterministic.
+        t0 (float): Log time the replay starts from (defaults to the first sample).
+    """
+
+    def __init__(self, speed=1.0, t0=None):
+        self.speed = speed or None
+        self.t0 = t0
+        self._wall_start = None
+        self._now = t0
+        self._heap = []
+        self._order = itertools.count()
+        self._driver = None
+
+    def _start(self, t):
+        if self.t0 is None:
+            self.t0 = t
+        if self._now is None:
+            self._now = self.t0
+        if self._wall_start is None:
+            self._wall_start = asyncio.get_running_loop().time()
+
+    def now(self):
+        """Current replay time in log time, None before the replay started."""
+        if self._wall_start is None:
+            return self.t0
+        if self.speed is None:
+            return self._now
+        return self.t0 + (asyncio.get_running_loop().time() - self._wall_start) * self.speed
+
+    async def sleep_until(self, t):
+        self._start(t)
+        if self.speed is not None:
+            delay = self._wall_start + (t - self.t0) / self.speed - asyncio.get_running_loop().time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (t, next(self._order), future))
+        if self._driver is None:
+            self._driver = asyncio.ensure_future(self._drive())
+        await future
+
+    async def _drive(self):
+        try:
+            while self._heap:
+                t, _, future = heapq.heappop(self._heap)
+                self._now = max(self._now, t)
+                if not future.done():
+                    future.set_result(None)
+                # let the woken stream deliver its sample and queue its next one
+                await asyncio.sleep(0)
+        finally:
+            self._driver = None
+
+
+class _ReplayPlugin:
+    def __init__(self, system):
+        self._system = system
+
+    async def _replay(self, kind, make):
+        columns = self._system._columns(kind)
+        times = columns['t']
+        clock = self._system.clock
+        now = clock.now()
+        start = 0 if now is None else int(times.searchsorted(now))
+        for i in range(start, len(times)):
+            await clock.sleep_until(times[i])
+            yield make(columns, i)
+        # the log is over: behave like a live stream with no new data
+        await asyncio.Event().wait()
+
+
+class ReplayCore(_ReplayPlugin):
+    async def connection_state(self):
+        yield core.ConnectionState(True)
+        await asyncio.Event().wait()
+
+
+class ReplayTelemetry(_ReplayPlugin):
+    async def position(self):
+        def make(c, i):
+            return telemetry.Position(float(c['latitude'][i]), float(c['longitude'][i]),
+                                      float(c['absolute_altitude'][i]), float(c['relative_altitude'][i]))
+        async for position in self._replay('position', make):
+            yield position
+
+    async def home(self):
+        home = self._system.home()
+        if home is not None:
+            yield home
+        await asyncio.Event().wait()
+
+    async def health(self):
+        def make(c, i):
+            return telemetry.Health(True, True, True, True, True, True, True)
+        async for health in self._replay('position', make):
+            yield health
+
+    async def armed(self):
+        async for armed in self._replay('armed', lambda c, i: bool(c['armed'][i])):
+            yield armed
+
+    async def in_air(self):
+        async for in_air in self._replay('in_air', lambda c, i: bool(c['in_air'][i])):
+            yield in_air
+
+    async def landed_state(self):
+        async for state in self._replay('landed_state', lambda c, i: telemetry.LandedState(int(c['state'][i]))):
+            yield state
+
+    async def velocity_ned(self):
+        def make(c, i):
+            return telemetry.VelocityNed(float(c['north_m_s'][i]), float(c['east_m_s'][i]), float(c['down_m_s'][i]))
+        async for velocity in self._replay('velocity', make):
+            yield velocity
+
+    async def attitude_euler(self):
+        def make(c, i):
+            return telemetry.EulerAngle(float(c['roll_deg'][i]), float(c['pitch_deg'][i]), float(c['yaw_deg'][i]),
+                                        int(c['t'][i] * 1e6))
+        async for attitude in self._replay('attitude', make):
+            yield attitude
+
+    async def battery(self):
+        def make(c, i):
+            return telemetry.Battery(0, float('nan'), float(c['voltage_v'][i]), float('nan'), float('nan'),
+                                     float(c['remaining_percent'][i]))
+        async for battery in self._replay('battery', make):
+            yield battery
+
+    async def status_text(self):
+        await asyncio.Event().wait()
+        yield
+
+
+class _ReplayCommands:
+    """Accepts every command of a plugin without effect and keeps a trace of the calls."""
+
+    def __init__(self, system, plugin):
+        self._system = system
+        self._plugin = plugin
+
+    def __getattr__(self, name):
+        async def command(*args, **kwargs):
+            self._system.issued_commands.append((self._system.clock.now(), f'{self._plugin}.{name}', args, kwargs))
+        return command
+
+
+class ReplayMission(_ReplayCommands):
+    async def mission_progress(self):
+        yield mission.MissionProgress(0, 0)
+        await asyncio.Event().wait()
+
+
+class ReplaySystem:
+    """
+    Drop-in stand-in for mavsdk.System that replays a FlightRecorder log.
+
+    Telemetry streams yield the recorded samples of one drone through the same
+    async-iterator interface as mavsdk, paced by a ReplayClock shared by every
+    drone of the replay. Commands are accepted without effect and traced in
+    issued_commands, so mission code runs unchanged against recorded data.
+
+    Args:
+        log (FlightLog or str): The recorded log (or its path).
+        drone_id (int): Id of the drone to replay.
+        clock (ReplayClock): Shared clock, a real-time clock is created if None.
+    """
+
+    def __init__(self, log, drone_id, clock=None):
+        self.log = FlightLog(log) if isinstance(log, str) else log
+        self.drone_id = drone_id
+        self.clock = clock or ReplayClock()
+        if self.clock.t0 is None and len(self.log):
+            self.clock.t0 = self.log.time_range()[0]
+        self.issued_commands = []
+        self._cache = {}
+
+        self.core = ReplayCore(self)
+        self.telemetry = ReplayTelemetry(self)
+        self.action = _ReplayCommands(self, 'action')
+        self.mission = ReplayMission(self, 'mission')
+        self.mission_raw = ReplayMission(self, 'mission_raw')
+        self.offboard = _ReplayCommands(self, 'offboard')
+
+    def _columns(self, kind):
+        if kind not in self._cache:
+            self._cache[kind] = self.log.read_kind(kind, drone_ids=[self.drone_id])
+        return self._cache[kind]
+
+    def home(self):
+        """Home position derived from the first recorded position sample."""
+        positions = self._columns('position')
+        if not len(positions['t']):
+            return None
+        return telemetry.Position(float(positions['latitude'][0]), float(positions['longitude'][0]),
+                                  float(positions['absolute_altitude'][0] - positions['relative_altitude'][0]), 0.0)
+
+    async def connect(self, system_address=None):
+        self.issued_commands.append((self.clock.now(), 'connect', (system_address,), {}))
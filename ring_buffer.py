@@ -0,0 +1,114 @@
+import time
+import numpy as np
+
+DEFAULT_CAPACITY = 3000  # 5 minutes of samples at 10 Hz
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, array-backed ring buffer of timestamped samples.
+
+    Storage is a preallocated structured array with a monotonic timestamp
+    column 't' plus the given fields; appending overwrites the oldest sample
+    once the buffer is full, so memory stays bounded.
+
+    Args:
+        fields (list): (name, dtype) pairs of the sample columns.
+        capacity (int): Maximum number of samples kept.
+    """
+
+    def __init__(self, fields, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.dtype = np.dtype([('t', np.float64)] + list(fields))
+        self._data = np.zeros(capacity, dtype=self.dtype)
+        self._columns = [self._data[name] for name in self.dtype.names]
+        self._head = 0  # next slot to write
+        self._size = 0
+
+    def append(self, t, *values):
+        """Store one sample taken at monotonic time t (O(1), no allocation)."""
+        i = self._head
+        self._columns[0][i] = t
+        for column, value in zip(self._columns[1:], values):
+            column[i] = value
+        self._head = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def _segments(self):
+        # the stored samples in chronological order, as at most two views
+        if self._size < self.capacity:
+            return (self._data[:self._size],)
+        return (self._data[self._head:], self._data[:self._head])
+
+    def to_array(self):
+        """Copy of all stored samples in chronological order."""
+        return np.concatenate(self._segments())
+
+    def latest(self):
+        """Most recent sample, or None if the buffer is empty."""
+        if self._size == 0:
+            return None
+        return self._data[(self._head - 1) % self.capacity].copy()
+
+    def last(self, n):
+        """Copy of the last n samples in chronological order."""
+        n = min(n, self._size)
+        start = (self._head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].copy()
+        return np.concatenate((self._data[start:], self._data[:self._head]))
+
+    def window(self, seconds, now=None):
+        """Copy of the samples taken in the last seconds (relative to now, default time.monotonic())."""
+        now = time.monotonic() if now is None else now
+        return self.between(now - seconds, now)
+
+    def between(self, t_start, t_end):
+        """Copy of the samples with t_start <= t <= t_end in chronological order."""
+        parts = []
+        for segment in self._segments():
+            t = segment['t']
+            lo = np.searchsorted(t, t_start, side='left')
+            hi = np.searchsorted(t, t_end, side='right')
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        if not parts:
+            return np.zeros(0, dtype=self.dtype)
+        return np.concatenate(parts)
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+
+# Sample layout of each recorded telemetry topic
+HISTORY_FIELDS = {
+    'position': [('latitude', np.float64), ('longitude', np.float64),
+                 ('absolute_altitude', np.float32), ('relative_altitude', np.float32)],
+    'attitude': [('roll', np.float32), ('pitch', np.float32), ('yaw', np.float32)],
+    'battery': [('remaining_percent', np.float32), ('voltage', np.float32)],
+    'landed_state': [('state', np.int8)],
+}
+
+
+class TelemetryHistory:
+    """
+    Per-drone set of ring buffers, one per recorded topic (see HISTORY_FIELDS).
+
+    Example:
+        recent = drone.history['position'].window(5.0)
+        climb_rate = np.gradient(recent['relative_altitude'], recent['t'])
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.buffers = {topic: RingBuffer(fields, capacity) for topic, fields in HISTORY_FIELDS.items()}
+
+    def __getitem__(self, topic):
+        return self.buffers[topic]
+
+    def window(self, topic, seconds, now=None):
+        return self.buffers[topic].window(seconds, now)
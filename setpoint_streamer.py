@@ -0,0 +1,329 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+from instrumentation import Histogram, JITTER_BUCKETS
+from swarm_logging import get_logger
+
+log = get_logger('offboard')
+
+POSITION = 'position'  # local (x east, y north, z up) positions, sent as global position setpoints
+VELOCITY = 'velocity'  # local (east, north, up) velocities in m/s, sent as NED velocity setpoints
+MODES = (POSITION, VELOCITY)
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class SetpointBuffer:
+    """
+    Time-stamped setpoints of one drone, consumed at every tick of the streamer.
+
+    Each tick sends the latest setpoint due, and keeps sending it until a newer
+    one is due: PX4 leaves offboard mode when the setpoint stream stops. A
+    setpoint overtaken by a newer one before any tick sent it is dropped, and
+    so is the oldest setpoint of a full buffer.
+
+    Args:
+        capacity (int): Setpoints waiting at most.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.current = None
+        self.dropped = 0
+        self._pending = deque()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def push(self, setpoint, due=0.0):
+        """Queue a setpoint to be sent from `due` seconds into the stream on."""
+        if len(self._pending) >= self.capacity:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append((due, setpoint))
+
+    def take(self, now):
+        """
+        Returns:
+            tuple: (setpoint to send at time now, None before the first one; True if it was not sent yet).
+        """
+        fresh = False
+        while self._pending and self._pending[0][0] <= now:
+            if fresh:
+                self.dropped += 1
+            _, self.current = self._pending.popleft()
+            fresh = True
+        return self.current, fresh
+
+
+class StreamReport:
+    """
+    Timing and delivery statistics of a setpoint stream.
+
+    Attributes:
+        rate_hz (float): Nominal tick rate.
+        ticks (int): Ticks run.
+        missed (int): Ticks skipped because the loop was late by a whole period or more.
+        elapsed (float): Duration of the stream in seconds.
+        jitter (Histogram): Lateness of every tick behind its deadline, in seconds.
+        latency (Histogram): Duration of the successful setpoint sends, in seconds.
+        sent (dict): drone id -> setpoints sent successfully.
+        dropped (dict): drone id -> setpoints never sent (previous send still in flight, overtaken in the buffer).
+        failed (dict): drone id -> sends that raised or timed out.
+    """
+
+    def __init__(self, rate_hz, drone_ids):
+        self.rate_hz = rate_hz
+        self.ticks = 0
+        self.missed = 0
+        self.elapsed = 0.0
+        self.jitter = Histogram(JITTER_BUCKETS)
+        self.latency = Histogram(JITTER_BUCKETS)
+        self.sent = dict.fromkeys(drone_ids, 0)
+        self.dropped = dict.fromkeys(drone_ids, 0)
+        self.failed = dict.fromkeys(drone_ids, 0)
+
+    def achieved_rate(self):
+        """Ticks per second actually run."""
+        return self.ticks / self.elapsed if self.elapsed else None
+
+    def as_dict(self):
+        return {
+            'rate_hz': self.rate_hz,
+            'achieved_rate_hz': self.achieved_rate(),
+            'ticks': self.ticks,
+            'missed_ticks': self.missed,
+            'elapsed_s': self.elapsed,
+            'jitter': self.jitter.summary(),
+            'send_latency': self.latency.summary(),
+            'sent': sum(self.sent.values()),
+            'dropped': sum(self.dropped.values()),
+            'failed': sum(self.failed.values()),
+            'drones': {drone_id: {'sent': self.sent[drone_id], 'dropped': self.dropped[drone_id],
+                                  'failed': self.failed[drone_id]} for drone_id in self.sent},
+        }
+
+    def __str__(self):
+        summary = self.as_dict()
+        text = (f"{len(self.sent)} drones at {self.rate_hz:g} Hz: {self.ticks} ticks in {self.elapsed:.2f} s, "
+                f"{self.missed} missed, {summary['sent']} setpoints sent, {summary['dropped']} dropped, "
+                f"{summary['failed']} failed")
+        jitter = summary['jitter']
+        if jitter['count']:
+            text += f"\n  tick jitter p50 {jitter['p50'] * 1e3:.2f} ms, p95 {jitter['p95'] * 1e3:.2f} ms, " \
+                    f"max {jitter['max'] * 1e3:.2f} ms"
+        latency = summary['send_latency']
+        if latency['count']:
+            text += f"\n  send latency p50 {latency['p50'] * 1e3:.2f} ms, p95 {latency['p95'] * 1e3:.2f} ms"
+        return text
+
+
+class SetpointStreamer:
+    """
+    Streams offboard setpoints to a whole swarm from one fixed-rate loop.
+
+    Ticks are scheduled at absolute deadlines (start + k / rate_hz on the event
+    loop clock), so the time spent in a tick does not accumulate as drift; when
+    the loop falls behind by a whole period or more, the missed ticks are
+    skipped and counted rather than sent in a burst. At every tick the setpoint
+    of each drone comes from its buffer (see push) or from the trajectory being
+    followed, the whole swarm is converted to global coordinates in one
+    vectorized call, and the sends go out together as concurrent requests. A
+    drone whose previous send is still in flight skips the tick, counted as a
+    dropped setpoint, so one slow link never delays the others.
+
+    Args:
+        drones (list): Drones to stream to.
+        frame (LocalFrame): Frame of the position setpoints, their z is the altitude above home.
+        rate_hz (float): Tick rate, 20 to 50 Hz for PX4 (at least 2 Hz to stay in offboard mode).
+        mode (str): POSITION or VELOCITY.
+        send_timeout (float): Seconds a send may take before it counts as failed.
+        buffer_capacity (int): Capacity of the per-drone SetpointBuffer.
+
+    Example:
+        streamer = SetpointStreamer(swarm.active_drones, swarm.frame, rate_hz=20)
+        streamer.follow(plan.positions)
+        await streamer.prime()
+        await swarm.executor.run('start_offboard', swarm.active_drones, lambda drone: drone.start_offboard())
+        report = await streamer.run(plan.duration)
+    """
+
+    def __init__(self, drones, frame, rate_hz=20.0, mode=POSITION, send_timeout=1.0, buffer_capacity=64):
+        if mode not in MODES:
+            raise ValueError(f"Invalid setpoint mode '{mode}', expected one of {MODES}")
+        self.drones = list(drones)
+        self.frame = frame
+        self.rate_hz = rate_hz
+        self.mode = mode
+        self.send_timeout = send_timeout
+        self.buffers = [SetpointBuffer(buffer_capacity) for _ in self.drones]
+        self.enabled = np.ones(len(self.drones), dtype=bool)
+        self._index = {drone.id: index for index, drone in enumerate(self.drones)}
+        self._setpoints = np.full((len(self.drones), 3), np.nan)
+        self._yaw = np.zeros(len(self.drones))
+        self._trajectory = None
+        self._heading = None
+        self._in_flight = [None] * len(self.drones)
+        self._stopped = False
+        self.report = StreamReport(rate_hz, [drone.id for drone in self.drones])
+
+    @classmethod
+    def from_config(cls, drones, frame, options):
+        return cls(drones, frame,
+                   rate_hz=options.get('rate_hz', 20.0),
+                   mode=options.get('mode', POSITION),
+                   send_timeout=options.get('send_timeout_s', 1.0),
+                   buffer_capacity=options.get('buffer_capacity', 64))
+
+    def push(self, drone_id, setpoint, due=0.0):
+        """Queue a local (x, y, z) setpoint of one drone, due `due` seconds into the stream."""
+        self.buffers[self._index[drone_id]].push(tuple(setpoint), due)
+
+    def push_all(self, setpoints, due=0.0):
+        """Queue one setpoint per drone, (N, 3) in the order of the drones."""
+        for buffer, setpoint in zip(self.buffers, np.asarray(setpoints, dtype=np.float64).tolist()):
+            buffer.push(tuple(setpoint), due)
+
+    def follow(self, trajectory, heading=None):
+        """
+        Take the setpoints from trajectory(t) instead of the buffers, with t the
+        seconds since the start of the stream; it returns (N, 3) setpoints in
+        the order of the drones (NaN rows are not sent). heading(t) returns the
+        (N,) yaw of the drones in degrees from north, 0 when not given.
+        """
+        self._trajectory = trajectory
+        self._heading = heading
+
+    def disable(self, drone_ids):
+        """Stop streaming to these drones, e.g. the ones that did not enter offboard mode; other ids are ignored."""
+        for drone_id in drone_ids:
+            if drone_id in self._index:
+                self.enabled[self._index[drone_id]] = False
+
+    def stop(self):
+        """End run() at its next tick."""
+        self._stopped = True
+
+    def _update(self, t):
+        if self._trajectory is not None:
+            self._setpoints[:] = self._trajectory(t)
+            if self._heading is not None:
+                self._yaw[:] = self._heading(t)
+            return
+        for index, buffer in enumerate(self.buffers):
+            setpoint, _ = buffer.take(t)
+            if setpoint is not None:
+                self._setpoints[index] = setpoint
+
+    def _commands(self):
+        """(N, 4) arguments of the setpoint sends of every drone."""
+        setpoints = self._setpoints
+        if self.mode == VELOCITY:
+            # local east / north / up to north / east / down
+            return np.column_stack((setpoints[:, 1], setpoints[:, 0], -setpoints[:, 2], self._yaw))
+        commands = np.zeros((len(setpoints), 4))
+        valid = ~np.isnan(setpoints).any(axis=1)
+        if valid.any():
+            commands[valid, :2] = self.frame.to_global(setpoints[valid])[:, :2]
+        commands[:, 2] = setpoints[:, 2]
+        commands[:, 3] = self._yaw
+        commands[~valid] = np.nan
+        return commands
+
+    async def _send(self, index, args):
+        drone = self.drones[index]
+        report = self.report
+        send = drone.send_velocity_setpoint if self.mode == VELOCITY else drone.send_position_setpoint
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(send(*args), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:  # asyncio.TimeoutError included
+            report.failed[drone.id] += 1
+            if report.failed[drone.id] == 1:
+                log.warning("Drone %s setpoint failed: %s", drone.id, _describe(error))
+        else:
+            report.sent[drone.id] += 1
+            report.latency.observe(time.perf_counter() - start)
+
+    def _dispatch(self, t):
+        """Send the setpoints of time t to every enabled drone, without waiting for the sends."""
+        self._update(t)
+        report = self.report
+        commands = self._commands()
+        for index in np.flatnonzero(self.enabled & ~np.isnan(commands).any(axis=1)).tolist():
+            task = self._in_flight[index]
+            if task is not None and not task.done():
+                report.dropped[self.drones[index].id] += 1
+                continue
+            self._in_flight[index] = asyncio.ensure_future(self._send(index, commands[index].tolist()))
+
+    async def _drain(self):
+        pending = [task for task in self._in_flight if task is not None and not task.done()]
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def prime(self):
+        """
+        Send the first setpoint (t = 0) to every enabled drone and wait for it:
+        PX4 only accepts offboard mode once it receives setpoints. The drones
+        without a setpoint or whose send failed are disabled.
+
+        Returns:
+            list: Drones primed successfully.
+        """
+        sent = dict(self.report.sent)
+        self._dispatch(0.0)
+        await self._drain()
+        primed = []
+        for index, drone in enumerate(self.drones):
+            if self.report.sent[drone.id] > sent[drone.id]:
+                primed.append(drone)
+            else:
+                self.enabled[index] = False
+        return primed
+
+    async def run(self, duration):
+        """
+        Stream for `duration` seconds (or until stop()), the trajectory time
+        starting at 0; the last setpoints keep being sent until the end.
+
+        Returns:
+            StreamReport: Cumulative over the runs of this streamer.
+        """
+        loop = asyncio.get_running_loop()
+        report = self.report
+        period = 1.0 / self.rate_hz
+        self._stopped = False
+        start = loop.time()
+        tick = 0
+        while not self._stopped and tick * period <= duration:
+            deadline = start + tick * period
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lateness = loop.time() - deadline
+            if lateness >= period:
+                # the loop stalled: jump to the current tick instead of catching up
+                skipped = min(int(lateness // period), int(duration / period) - tick + 1)
+                report.missed += skipped
+                tick += skipped
+                lateness -= skipped * period
+                if tick * period > duration:
+                    break
+            report.jitter.observe(abs(lateness))
+            self._dispatch(tick * period)
+            report.ticks += 1
+            tick += 1
+        await self._drain()
+        for drone, buffer in zip(self.drones, self.buffers):
+            report.dropped[drone.id] += buffer.dropped
+            buffer.dropped = 0
+        report.elapsed += loop.time() - start
+        log.info("%s", report)
+        return report
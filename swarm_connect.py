@@ -0,0 +1,202 @@
+import asyncio
+import math
+import random
+import time
+
+from swarm_logging import get_logger
+
+log = get_logger('connect')
+
+CONNECTED = 'connected'
+FAILED = 'failed'      # every attempt failed before the deadline
+TIMEOUT = 'timeout'    # still not connected at the deadline
+
+
+class RetryPolicy:
+    """
+    Retry schedule with capped exponential backoff and jitter.
+
+    Args:
+        max_attempts (int): Attempts per drone, None for unlimited (until the deadline).
+        attempt_timeout (float): Seconds allowed to one attempt, None for no limit.
+        backoff (float): Delay after the first failed attempt.
+        backoff_max (float): Upper bound of the delay.
+        jitter (float): The delay is scaled by a random factor in [1 - jitter, 1 + jitter],
+            so drones failing together do not retry in lockstep.
+    """
+
+    def __init__(self, max_attempts=3, attempt_timeout=5.0, backoff=0.5, backoff_max=4.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(max_attempts=options.get('max_attempts', 3),
+                   attempt_timeout=options.get('attempt_timeout_s', 5.0),
+                   backoff=options.get('backoff_s', 0.5),
+                   backoff_max=options.get('backoff_max_s', 4.0),
+                   jitter=options.get('jitter', 0.5))
+
+    def delay(self, attempt):
+        """Delay before retrying after the given (1-based) failed attempt."""
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def can_retry(self, attempt):
+        return self.max_attempts is None or attempt < self.max_attempts
+
+
+class ConnectResult:
+    """Outcome of the connect phase for one drone."""
+
+    def __init__(self, drone_id):
+        self.drone_id = drone_id
+        self.status = TIMEOUT
+        self.attempts = 0
+        self.elapsed = None  # seconds from the start of the phase to the connection
+        self.error = None    # last error, as text
+
+    def as_dict(self):
+        return {'status': self.status, 'attempts': self.attempts, 'elapsed_s': self.elapsed, 'error': self.error}
+
+
+class ConnectReport:
+    """
+    Readiness report of a swarm connect phase.
+
+    Attributes:
+        results (dict): drone id -> ConnectResult.
+        quorum (float): Fraction of drones that had to connect.
+        elapsed (float): Duration of the phase in seconds.
+    """
+
+    def __init__(self, results, quorum, elapsed):
+        self.results = results
+        self.quorum = quorum
+        self.elapsed = elapsed
+
+    @property
+    def connected(self):
+        return [drone_id for drone_id, result in self.results.items() if result.status == CONNECTED]
+
+    @property
+    def not_connected(self):
+        return [drone_id for drone_id, result in self.results.items() if result.status != CONNECTED]
+
+    @property
+    def ratio(self):
+        return len(self.connected) / len(self.results) if self.results else 1.0
+
+    @property
+    def quorum_met(self):
+        return len(self.connected) >= math.ceil(self.quorum * len(self.results))
+
+    def time_to_ready(self):
+        """Time at which the slowest connected drone connected."""
+        times = [result.elapsed for result in self.results.values() if result.status == CONNECTED]
+        return max(times) if times else None
+
+    def as_dict(self):
+        return {
+            'connected': len(self.connected),
+            'total': len(self.results),
+            'quorum': self.quorum,
+            'quorum_met': self.quorum_met,
+            'elapsed_s': self.elapsed,
+            'time_to_ready_s': self.time_to_ready(),
+            'drones': {drone_id: result.as_dict() for drone_id, result in self.results.items()},
+        }
+
+    def __str__(self):
+        text = (f"{len(self.connected)}/{len(self.results)} drones connected in {self.elapsed:.2f} s "
+                f"(quorum {self.quorum:.0%} {'met' if self.quorum_met else 'NOT met'})")
+        for drone_id in self.not_connected:
+            result = self.results[drone_id]
+            text += f"\n  drone {drone_id}: {result.status} after {result.attempts} attempts ({result.error})"
+        return text
+
+
+async def _connect_one(drone, result, policy, started, deadline):
+    loop = asyncio.get_running_loop()
+    while True:
+        result.attempts += 1
+        remaining = deadline - loop.time()
+        attempt_timeout = remaining if policy.attempt_timeout is None else min(policy.attempt_timeout, remaining)
+        # once the link is up, a retry only waits for the vehicle again instead of
+        # connecting the System a second time, which restarts its mavsdk_server
+        attempt = drone.wait_connected() if drone.link_started else drone.connect()
+        try:
+            await asyncio.wait_for(attempt, attempt_timeout)
+        except asyncio.TimeoutError:
+            result.error = f"attempt {result.attempts} timed out after {attempt_timeout:.1f} s"
+            # cancelled inside the metrics timer of connect(), which does not count it
+            drone.metrics.failure(drone.id, 'connect')
+        except asyncio.CancelledError:
+            result.error = f"deadline reached during attempt {result.attempts}"
+            raise
+        except Exception as error:
+            result.error = f"{type(error).__name__}: {error}"
+        else:
+            result.status = CONNECTED
+            result.elapsed = time.monotonic() - started
+            result.error = None
+            return
+        log.warning("Drone %s connect failed: %s", drone.id, result.error)
+        if not policy.can_retry(result.attempts):
+            result.status = FAILED
+            return
+        delay = policy.delay(result.attempts)
+        if loop.time() + delay >= deadline:
+            return  # no time left for another attempt, reported as a timeout
+        drone.metrics.retry(drone.id, 'connect')
+        await asyncio.sleep(delay)
+
+
+async def connect_drones(drones, timeout=15.0, quorum=1.0, policy=None, grace=None):
+    """
+    Connect drones concurrently within a global deadline.
+
+    Every drone retries on its own schedule (see RetryPolicy) until it
+    connects, runs out of attempts or hits the deadline; the phase ends as
+    soon as every drone reached one of these outcomes. With a grace period,
+    the stragglers only get `grace` more seconds once the quorum is met, so
+    time-to-ready follows the slowest healthy drone instead of the dead ones.
+
+    Args:
+        drones (list): Drones to connect.
+        timeout (float): Deadline of the whole phase in seconds.
+        quorum (float): Fraction of the drones required for quorum_met (e.g. 0.9).
+        policy (RetryPolicy): Retry schedule, RetryPolicy() if None.
+        grace (float): Seconds left to the other drones once the quorum is met, None to wait until the deadline.
+
+    Returns:
+        ConnectReport
+    """
+    policy = policy or RetryPolicy()
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    deadline = loop.time() + timeout
+    results = {drone.id: ConnectResult(drone.id) for drone in drones}
+    tasks = [asyncio.ensure_future(_connect_one(drone, results[drone.id], policy, started, deadline))
+             for drone in drones]
+    required = math.ceil(quorum * len(drones))
+    pending = set(tasks)
+    while pending:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        _, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        if grace is not None and sum(result.status == CONNECTED for result in results.values()) >= required:
+            deadline = min(deadline, loop.time() + grace)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    report = ConnectReport(results, quorum, time.monotonic() - started)
+    if report.quorum_met:
+        log.info("%s", report)
+    else:
+        log.error("%s", report)
+    return report
@@ -0,0 +1,333 @@
+import asyncio
+import time
+
+from instrumentation import Histogram, LATENCY_BUCKETS
+from swarm_connect import RetryPolicy
+from swarm_logging import get_logger
+
+log = get_logger('executor')
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+def _count_timeout(drone, command, error):
+    """
+    Count a timed-out attempt as a failure of the command. The timeout cancels
+    the attempt inside its metrics.command timer, which does not count
+    cancellations; the other errors were counted by the timer they went through.
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        drone.metrics.failure(drone.id, command)
+
+
+class CommandResult:
+    """Outcome of one command on one drone."""
+
+    def __init__(self, drone_id, command):
+        self.drone_id = drone_id
+        self.command = command
+        self.ok = False
+        self.value = None
+        self.error = None    # last exception
+        self.attempts = 0
+        self.latency = None  # seconds of the successful attempt (or of the last one)
+
+    def as_dict(self):
+        return {'ok': self.ok, 'attempts': self.attempts, 'latency_s': self.latency,
+                'error': None if self.error is None else _describe(self.error)}
+
+
+class FanOutReport:
+    """
+    Per-drone results of a swarm-wide command, with throughput and latency statistics.
+
+    Attributes:
+        command (str): Name of the command.
+        results (dict): drone id -> CommandResult.
+        elapsed (float): Wall time of the whole fan-out in seconds.
+        max_in_flight (int): Concurrency limit used.
+    """
+
+    def __init__(self, command, results, elapsed, max_in_flight):
+        self.command = command
+        self.results = results
+        self.elapsed = elapsed
+        self.max_in_flight = max_in_flight
+        self.latency = Histogram(LATENCY_BUCKETS)
+        for result in results.values():
+            if result.ok:
+                self.latency.observe(result.latency)
+
+    @property
+    def succeeded(self):
+        return [drone_id for drone_id, result in self.results.items() if result.ok]
+
+    @property
+    def failed(self):
+        return [drone_id for drone_id, result in self.results.items() if not result.ok]
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def throughput(self):
+        """Successful commands per second."""
+        return len(self.succeeded) / self.elapsed if self.elapsed else None
+
+    def as_dict(self):
+        return {
+            'command': self.command,
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'elapsed_s': self.elapsed,
+            'max_in_flight': self.max_in_flight,
+            'throughput_per_s': self.throughput(),
+            'latency': self.latency.summary(),
+            'drones': {drone_id: result.as_dict() for drone_id, result in self.results.items()},
+        }
+
+    def __str__(self):
+        latency = self.latency.summary()
+        text = (f"{self.command}: {len(self.succeeded)}/{len(self.results)} ok in {self.elapsed:.2f} s "
+                f"(max in flight {self.max_in_flight}")
+        if latency['count']:
+            text += f", p50 {latency['p50']:.3f} s, p95 {latency['p95']:.3f} s, {self.throughput():.1f} cmd/s"
+        text += ")"
+        for drone_id in self.failed:
+            result = self.results[drone_id]
+            text += f"\n  drone {drone_id}: {result.as_dict()['error']} after {result.attempts} attempts"
+        return text
+
+
+class SynchronizedReport(FanOutReport):
+    """
+    FanOutReport of a synchronized dispatch (see SwarmExecutor.run_synchronized).
+
+    Attributes:
+        prepare (FanOutReport): Report of the prepare phase; drones that failed it were not fired.
+        deadline (float): Event-loop time (monotonic) the commands were released at.
+        send_times (dict): drone id -> loop time at which its command was sent, as returned by
+            the fire coroutine function right before its system.action call (successful commands only).
+    """
+
+    def __init__(self, command, results, elapsed, max_in_flight, prepare, deadline, send_times):
+        super().__init__(command, results, elapsed, max_in_flight)
+        self.prepare = prepare
+        self.deadline = deadline
+        self.send_times = send_times
+
+    def skew(self):
+        """Spread in seconds between the first and the last command sent."""
+        if not self.send_times:
+            return None
+        return max(self.send_times.values()) - min(self.send_times.values())
+
+    def lateness(self):
+        """drone id -> seconds between the deadline and the sending of its command."""
+        return {drone_id: t - self.deadline for drone_id, t in self.send_times.items()}
+
+    def as_dict(self):
+        report = super().as_dict()
+        report.update(prepare=self.prepare.as_dict(), skew_s=self.skew(), lateness_s=self.lateness())
+        return report
+
+    def __str__(self):
+        text = super().__str__()
+        if self.send_times:
+            text += (f"\n  send skew {self.skew() * 1e3:.3f} ms across {len(self.send_times)} drones, "
+                     f"max lateness {max(self.lateness().values()) * 1e3:.3f} ms")
+        return text
+
+
+class SwarmExecutor:
+    """
+    Fans a command out to many drones with a bounded number of commands in flight.
+
+    Each drone's command runs under a per-command timeout and is retried
+    according to the retry policy; failures are collected per drone in the
+    returned FanOutReport instead of aborting the other drones.
+
+    Args:
+        max_in_flight (int): Commands executing at the same time, None for no limit.
+        timeout (float): Default timeout of one attempt in seconds, None for no limit.
+        timeouts (dict): Per-command timeouts overriding the default, e.g. {'land': 120}.
+        policy (RetryPolicy): Retry schedule (its attempt_timeout is not used),
+            a single attempt by default.
+
+    Example:
+        report = await executor.run('takeoff', swarm.active_drones, lambda drone: drone.takeoff())
+    """
+
+    def __init__(self, max_in_flight=32, timeout=None, timeouts=None, policy=None):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.policy = policy or RetryPolicy(max_attempts=1)
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(max_in_flight=options.get('max_in_flight', 32),
+                   timeout=options.get('timeout_s'),
+                   timeouts=options.get('timeouts_s'),
+                   policy=RetryPolicy.from_config(options.get('retry', {'max_attempts': 1})))
+
+    async def _run_one(self, command, drone, call, slots, timeout, settle=None):
+        result = CommandResult(drone.id, command)
+        while True:
+            result.attempts += 1
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    result.value = await asyncio.wait_for(call(drone), timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:  # asyncio.TimeoutError included
+                    result.error = error
+                else:
+                    result.ok = True
+                    result.error = None
+                finally:
+                    result.latency = time.perf_counter() - start
+            if result.ok:
+                break
+            log.warning("Drone %s %s failed (attempt %s): %s", drone.id, command, result.attempts,
+                        _describe(result.error))
+            _count_timeout(drone, command, result.error)
+            if not self.policy.can_retry(result.attempts):
+                return result
+            drone.metrics.retry(drone.id, command)
+            await asyncio.sleep(self.policy.delay(result.attempts))
+        if settle is not None:
+            # outside the slot: a long wait (e.g. the touchdown) must not hold back the other drones
+            try:
+                await asyncio.wait_for(settle(drone), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                result.ok = False
+                result.error = error
+                log.warning("Drone %s %s did not complete: %s", drone.id, command, _describe(error))
+                drone.metrics.failure(drone.id, command)
+        return result
+
+    async def run(self, command, drones, call, settle=None):
+        """
+        Run call(drone) for every drone.
+
+        Args:
+            command (str): Command name, used for its timeout and in the report.
+            drones (list): Target drones.
+            call (callable): drone -> awaitable running the command on that drone.
+            settle (callable): drone -> awaitable run once the command succeeded, e.g. waiting for
+                the touchdown after a land. It does not count against max_in_flight and is not
+                retried; it has its own timeout of the command.
+
+        Returns:
+            FanOutReport
+        """
+        slots = asyncio.Semaphore(self.max_in_flight or max(1, len(drones)))
+        timeout = self.timeouts.get(command, self.timeout)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self._run_one(command, drone, call, slots, timeout, settle)
+                                         for drone in drones))
+        report = FanOutReport(command, {result.drone_id: result for result in results},
+                              time.perf_counter() - start, self.max_in_flight or len(drones))
+        if report.ok:
+            log.debug("%s", report)
+        else:
+            log.warning("%s", report)
+        return report
+
+    async def _finalize(self, command, drones, finalize, timeout):
+        """Run finalize(drone) on every drone at once, a single attempt each; return the drones it succeeded on."""
+
+        async def finalize_one(drone):
+            try:
+                await asyncio.wait_for(finalize(drone), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                log.warning("Drone %s %s failed: %s", drone.id, command, _describe(error))
+                _count_timeout(drone, command, error)
+                result = CommandResult(drone.id, command)
+                result.attempts = 1
+                result.error = error
+                return result
+            return None
+
+        return await asyncio.gather(*(finalize_one(drone) for drone in drones))
+
+    async def run_synchronized(self, command, drones, prepare, lead_time=0.05, finalize=None):
+        """
+        Two-phase dispatch: resolve every drone's preconditions, then send all the commands at once.
+
+        Phase 1 runs prepare(drone) like run() (bounded concurrency, timeouts,
+        retries); it must return a coroutine function sending the command, e.g.
+        Drone.prepare_takeoff, which returns the event-loop time right before
+        the command went out. Phase 2 runs finalize(drone), if given, on all
+        the prepared drones at once, then releases them together at a monotonic
+        deadline lead_time later, ignoring max_in_flight, and records when each
+        command was actually sent.
+
+        Args:
+            command (str): Command name, used for its timeout and in the report.
+            drones (list): Target drones.
+            prepare (callable): drone -> awaitable returning the fire coroutine function.
+            lead_time (float): Seconds between the end of the preparation and the release.
+            finalize (callable): drone -> awaitable for the last step that must not wait through the
+                whole phase 1, e.g. arming before a takeoff (PX4 disarms a drone left armed on the
+                ground). It is not retried; a drone it fails on is not fired.
+
+        Returns:
+            SynchronizedReport: Also lists the drones that failed to prepare.
+        """
+        start = time.perf_counter()
+        prepared = await self.run(f'prepare_{command}', drones, prepare)
+        ready = [drone for drone in drones if prepared.results[drone.id].ok]
+        loop = asyncio.get_running_loop()
+        timeout = self.timeouts.get(command, self.timeout)
+        failures = {}
+        if finalize is not None:
+            for failure in await self._finalize(command, ready, finalize, timeout):
+                if failure is not None:
+                    failures[failure.drone_id] = failure
+            ready = [drone for drone in ready if drone.id not in failures]
+        release = asyncio.Event()
+        send_times = {}
+
+        async def fire_one(drone):
+            fire = prepared.results[drone.id].value
+            result = CommandResult(drone.id, command)
+            result.attempts = 1
+            await release.wait()
+            fired = time.perf_counter()
+            try:
+                result.value = await asyncio.wait_for(fire(), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                result.error = error
+                log.warning("Drone %s %s failed: %s", drone.id, command, _describe(result.error))
+                _count_timeout(drone, command, error)
+            else:
+                result.ok = True
+                send_times[drone.id] = result.value
+            finally:
+                result.latency = time.perf_counter() - fired
+            return result
+
+        tasks = [asyncio.ensure_future(fire_one(drone)) for drone in ready]
+        await asyncio.sleep(0)  # every task is now waiting on the release
+        deadline = loop.time() + lead_time
+        loop.call_at(deadline, release.set)
+        results = {result.drone_id: result for result in await asyncio.gather(*tasks)}
+        results.update(failures)
+        for drone_id, result in prepared.results.items():
+            if not result.ok:
+                results[drone_id] = result
+        report = SynchronizedReport(command, results, time.perf_counter() - start, len(ready), prepared,
+                                    deadline, send_times)
+        log.info("%s", report)
+        return report
@@ -0,0 +1,240 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOGGER_NAME = 'swarm'
+
+# Topics streamed at telemetry rate: only one record out of N is kept by default
+DEFAULT_SAMPLING = {'position': 10, 'velocity': 10, 'attitude': 10, 'battery': 10}
+
+# attributes every LogRecord has, anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, drone, topic, message and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            't': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-(drone, topic) sampling and token-bucket rate limiting of telemetry records.
+
+    Records of a sampled topic are kept one out of `sampling[topic]`; the
+    remaining records with a topic are limited to `rate` records per second
+    per drone (with bursts of `burst`). Records without a topic (connection,
+    commands, lifecycle) and warnings and errors always pass. Dropped records
+    are counted in `dropped`.
+
+    Args:
+        rate (float): Records per second allowed per drone, None for no limit.
+        burst (int): Size of the token bucket.
+        sampling (dict): topic -> keep one record out of N.
+    """
+
+    def __init__(self, rate=20.0, burst=40, sampling=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sampling = DEFAULT_SAMPLING if sampling is None else sampling
+        self.dropped = {}
+        self._seen = {}
+        self._buckets = {}  # drone -> [tokens, last refill time]
+
+    def _drop(self, key):
+        self.dropped[key] = self.dropped.get(key, 0) + 1
+        return False
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        drone = getattr(record, 'drone', None)
+        topic = getattr(record, 'topic', None)
+        key = (drone, topic)
+        every = self.sampling.get(topic)
+        if every and every > 1:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+            if seen % every:
+                return self._drop(key)
+        if self.rate is None or drone is None or topic is None:
+            return True
+        now = time.monotonic()
+        bucket = self._buckets.get(drone)
+        if bucket is None:
+            bucket = self._buckets[drone] = [self.burst, now]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return self._drop(key)
+        bucket[0] -= 1
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    Records are enqueued unformatted (the message is built by the writer
+    thread) and dropped, with a count, when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Handle on the running pipeline: the queue handler used on the event loop
+    and the QueueListener thread writing the records out.
+    """
+
+    def __init__(self, handler, listener, limiter):
+        self.handler = handler
+        self.listener = listener
+        self.limiter = limiter
+
+    def dropped(self):
+        """Number of records dropped by the rate limiter and by a full queue."""
+        return {'rate_limited': sum(self.limiter.dropped.values()), 'queue_full': self.handler.dropped}
+
+    def stop(self):
+        """Flush the queued records and stop the writer thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_pipeline = None
+
+
+def setup_logging(level='INFO', file=None, console=True, json_console=False, queue_size=10000,
+                  rate_limit_per_s=20.0, burst=40, sampling=None):
+    """
+    Configure the 'swarm' logger with a non-blocking pipeline.
+
+    Callers only enqueue records; a background thread formats them and writes
+    them to the console (plain messages, like the former prints) and/or to a
+    JSON-lines file. Calling it again replaces the previous pipeline.
+
+    Args:
+        level (str): Minimum level; disabled levels cost a single isEnabledFor check.
+        file (str): JSON-lines output file, None for no file.
+        console (bool): Also write to stdout.
+        json_console (bool): Write JSON lines to stdout instead of plain messages.
+        queue_size (int): Records buffered before new ones are dropped.
+        rate_limit_per_s, burst, sampling: See RateLimitFilter.
+
+    Returns:
+        LogPipeline
+    """
+    global _pipeline
+    if _pipeline is not None:
+        shutdown_logging()
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonLinesFormatter() if json_console else logging.Formatter('%(message)s'))
+        handlers.append(stream)
+    if file:
+        directory = os.path.dirname(file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.FileHandler(file)
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    limiter = RateLimitFilter(rate_limit_per_s, burst, sampling)
+    handler.addFilter(limiter)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    _pipeline = LogPipeline(handler, listener, limiter)
+    return _pipeline
+
+
+def logging_configured():
+    """True once setup_logging() started the pipeline."""
+    return _pipeline is not None
+
+
+def setup_logging_from_config(config):
+    """setup_logging() with the keys of the Logging section of config.json."""
+    return setup_logging(**config.get('Logging', {}))
+
+
+def shutdown_logging():
+    """Flush and stop the pipeline (registered at exit)."""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+        logging.getLogger(LOGGER_NAME).handlers = []
+        _pipeline = None
+
+
+atexit.register(shutdown_logging)
+
+
+class DroneLogger(logging.LoggerAdapter):
+    """
+    Logger adapter tagging every record with the drone id.
+
+    Example:
+        log = get_logger(drone_id=1)
+        log.debug("position %s %s", lat, lon, extra={'topic': 'position'})
+    """
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra')
+        kwargs['extra'] = dict(self.extra, **extra) if extra else self.extra
+        return msg, kwargs
+
+
+def get_logger(name=None, drone_id=None):
+    """
+    Logger of the swarm hierarchy ('swarm' or 'swarm.<name>'), tagged with drone_id if given.
+
+    Getting a logger has no side effect: records are written once the program
+    called setup_logging() (see the main() functions and DroneSwarm); until
+    then only warnings and errors reach stderr, through Python's last resort.
+    """
+    logger = logging.getLogger(LOGGER_NAME if name is None else f'{LOGGER_NAME}.{name}')
+    if drone_id is None:
+        return logger
+    return DroneLogger(logger, {'drone': drone_id})
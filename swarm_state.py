@@ -0,0 +1,81 @@
+import math
+import numpy as np
+
+# One row per drone. Positions are NaN until the first telemetry sample arrives.
+STATE_DTYPE = np.dtype([
+    ('id', np.int32),
+    ('latitude', np.float64),
+    ('longitude', np.float64),
+    ('absolute_altitude', np.float64),
+    ('relative_altitude', np.float64),
+    ('velocity_north', np.float64),
+    ('velocity_east', np.float64),
+    ('velocity_down', np.float64),
+    ('battery_percent', np.float64),
+    ('is_connected', np.bool_),
+    ('is_armed', np.bool_),
+    ('in_air', np.bool_),
+    ('last_update', np.float64),  # time.monotonic() of the last telemetry write
+])
+
+_NAN_FIELDS = ('latitude', 'longitude', 'absolute_altitude', 'relative_altitude',
+               'velocity_north', 'velocity_east', 'velocity_down', 'battery_percent', 'last_update')
+
+
+class SwarmState:
+    """
+    Preallocated columnar store for the state of every drone of a swarm.
+
+    Each drone owns one row and its monitors write straight into it, so
+    swarm-wide queries are plain NumPy operations on the columns.
+
+    Args:
+        num_drones (int): Number of rows to allocate.
+        ids (list): Drone ids stored in the id column (defaults to 0..num_drones-1).
+    """
+
+    def __init__(self, num_drones, ids=None):
+        self.array = np.zeros(num_drones, dtype=STATE_DTYPE)
+        for field in _NAN_FIELDS:
+            self.array[field] = np.nan
+        self.array['id'] = np.arange(num_drones) if ids is None else ids
+
+    def row(self, index):
+        """Writable view (numpy.void) over the row of one drone."""
+        return self.array[index]
+
+    def snapshot(self):
+        """Read-only, zero-copy view of the whole store."""
+        view = self.array.view()
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return len(self.array)
+
+
+class StateField:
+    """
+    Descriptor exposing one column of the owner's state row as an attribute.
+
+    Args:
+        field (str): Column name in STATE_DTYPE.
+        cast (type): Python type returned by the getter.
+        nullable (bool): Map NaN to None (and None to NaN) like the former plain attributes.
+    """
+
+    def __init__(self, field, cast=float, nullable=False):
+        self.field = field
+        self.cast = cast
+        self.nullable = nullable
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = obj._state_row[self.field]
+        if self.nullable and math.isnan(value):
+            return None
+        return self.cast(value)
+
+    def __set__(self, obj, value):
+        obj._state_row[self.field] = np.nan if value is None else value
@@ -0,0 +1,192 @@
+import asyncio
+import weakref
+
+from mavsdk import telemetry
+
+from swarm_logging import get_logger
+
+log = get_logger('telemetry')
+
+
+class Subscription:
+    """
+    One consumer of a telemetry topic.
+
+    Items are buffered in a bounded queue; when the consumer falls behind the
+    oldest item is dropped, so a slow consumer never blocks the others.
+    Use as an async iterator, ideally inside a ``with`` block so the
+    subscription is released as soon as the consumer is done.
+    """
+
+    def __init__(self, hub, topic, maxsize):
+        self.hub = hub
+        self.topic = topic
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._closed = False
+
+    def _push(self, item):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def latest(self):
+        """Latest value published on the topic, or None if nothing was received yet."""
+        return self.hub.latest(self.topic)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.hub._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        return await self._queue.get()
+
+
+class TelemetryHub:
+    """
+    Per-drone fan-out of the mavsdk telemetry streams.
+
+    Keeps a single upstream stream per topic (``position``, ``health``, ``home``,
+    ``landed_state``, ...), started on first use, and fans every item out to any
+    number of subscribers. The latest value of each topic is cached so one-shot
+    reads do not have to open a new gRPC stream.
+
+    Args:
+        system: The mavsdk.System (or FakeSystem, ReplaySystem) whose telemetry plugin
+            is streamed. The plugin is looked up when a stream is opened, so the hub
+            can be created before the system is connected, and the system can be
+            replaced (see Drone.connect with a server pool).
+        maxsize (int): Default queue size of each subscription.
+    """
+
+    def __init__(self, system, maxsize=16):
+        self.system = system
+        self.maxsize = maxsize
+        self._latest = {}
+        self._received = {}  # topic -> asyncio.Event set once the first item arrived
+        self._updated = {}   # topic -> asyncio.Event pulsed on every item
+        self._waiters = {}   # topic -> futures of next_update() calls waiting for an item of the topic
+        self._subscribers = {}
+        self._pumps = {}
+        self.observer = None  # optional callable(topic, item), called for every published item
+
+    def _ensure_topic(self, topic):
+        if topic in self._pumps:
+            return
+        if not hasattr(telemetry.Telemetry, topic):
+            raise ValueError(f"Unknown telemetry topic '{topic}'")
+        self._received[topic] = asyncio.Event()
+        self._updated[topic] = asyncio.Event()
+        self._waiters[topic] = set()
+        self._subscribers[topic] = weakref.WeakSet()
+        self._pumps[topic] = asyncio.ensure_future(self._pump(topic))
+
+    async def _pump(self, topic):
+        while True:
+            try:
+                async for item in getattr(self.system.telemetry, topic)():
+                    self._publish(topic, item)
+                # the stream ended, reopen it without spinning
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                log.warning("Telemetry stream '%s' failed: %s, restarting...", topic, error)
+                await asyncio.sleep(1)
+
+    def _publish(self, topic, item):
+        if self.observer is not None:
+            self.observer(topic, item)
+        self._latest[topic] = item
+        self._received[topic].set()
+        updated = self._updated[topic]
+        updated.set()
+        # waiters of this pulse have been woken, the next item needs a fresh event
+        self._updated[topic] = asyncio.Event()
+        for waiter in self._waiters[topic]:
+            if not waiter.done():
+                waiter.set_result(topic)
+        for subscription in list(self._subscribers[topic]):
+            subscription._push(item)
+
+    def _unsubscribe(self, subscription):
+        self._subscribers[subscription.topic].discard(subscription)
+
+    def subscribe(self, topic, maxsize=None):
+        """Subscribe to every future item of a topic."""
+        self._ensure_topic(topic)
+        subscription = Subscription(self, topic, maxsize or self.maxsize)
+        self._subscribers[topic].add(subscription)
+        return subscription
+
+    def latest(self, topic):
+        """Latest cached value of a topic, or None if nothing was received yet (non-blocking)."""
+        self._ensure_topic(topic)
+        return self._latest.get(topic)
+
+    async def get(self, topic):
+        """Latest value of a topic, waiting for the first item if none was received yet."""
+        self._ensure_topic(topic)
+        await self._received[topic].wait()
+        return self._latest[topic]
+
+    async def next(self, topic):
+        """Wait for the next item published on a topic."""
+        self._ensure_topic(topic)
+        await self._updated[topic].wait()
+        return self._latest[topic]
+
+    async def next_update(self, topics=()):
+        """
+        Wait for the next item published on any of the given topics (started if needed).
+
+        Args:
+            topics (iterable): Topics to wait for, every started topic if empty.
+
+        Returns:
+            str: Topic of the item.
+        """
+        topics = list(topics) or list(self._pumps)
+        for topic in topics:
+            self._ensure_topic(topic)
+        waiter = asyncio.get_running_loop().create_future()
+        for topic in topics:
+            self._waiters[topic].add(waiter)
+        try:
+            return await waiter
+        finally:
+            for topic in topics:
+                self._waiters.get(topic, set()).discard(waiter)
+
+    async def wait_for(self, topic, predicate):
+        """Return the first value of a topic (cached or future) that satisfies predicate."""
+        item = await self.get(topic)
+        while not predicate(item):
+            item = await self.next(topic)
+        return item
+
+    def subscriber_count(self, topic):
+        return len(self._subscribers.get(topic, ()))
+
+    def close(self):
+        """Cancel every upstream stream."""
+        for pump in self._pumps.values():
+            pump.cancel()
+        self._pumps.clear()
+        self._received.clear()
+        self._updated.clear()
+        self._waiters.clear()
+        self._subscribers.clear()
@@ -0,0 +1,473 @@
+import heapq
+
+import numpy as np
+
+from swarm_logging import get_logger
+
+log = get_logger('transition')
+
+# Every trajectory has the same eight waypoints: start, start of climb, top of
+# climb, departure (after the delay), detour point (mid-course), end of cruise,
+# start of descent, target. Unused ones coincide with their neighbours, so whole
+# swarms are sampled as plain arrays.
+KNOTS = 8
+
+
+class PlanningError(Exception):
+    """No transition keeping the minimum separation could be found."""
+
+
+def _interpolate(times, points, at):
+    """
+    Positions of piecewise-linear trajectories, each at its own times.
+
+    Args:
+        times (ndarray): (..., K) non-decreasing waypoint times.
+        points (ndarray): (..., K, D) waypoint positions.
+        at (ndarray): (..., S) times; a trajectory stays at its first waypoint
+            before it and at its last one after it.
+
+    Returns:
+        ndarray: (..., S, D) positions, the leading dimensions broadcast.
+    """
+    # a position is the first waypoint plus the covered fraction of every
+    # segment; a segment of no duration is covered as soon as it is passed
+    span = np.diff(times, axis=-1)
+    rate = np.divide(1.0, span, out=np.full_like(span, 1e18), where=span > 0)
+    fraction = np.clip((at[..., :, None] - times[..., None, :-1]) * rate[..., None, :], 0, 1)
+    return points[..., :1, :] + fraction @ np.diff(points, axis=-2)
+
+
+def sample_trajectories(times, waypoints, grid):
+    """
+    Positions of piecewise-linear trajectories at the given times.
+
+    Args:
+        times (ndarray): (K, KNOTS) non-decreasing waypoint times.
+        waypoints (ndarray): (K, KNOTS, 3) waypoint positions.
+        grid (ndarray): (S,) sample times; the drones wait at their first
+            waypoint before it and stay at their last one after it.
+
+    Returns:
+        ndarray: (K, S, 3) positions.
+    """
+    return _interpolate(times, waypoints, np.asarray(grid, dtype=np.float64)[None, :])
+
+
+def closest_approach(times_a, points_a, times_b, points_b):
+    """
+    Exact smallest distance between pairs of piecewise-linear trajectories.
+
+    Between two consecutive waypoint times of either trajectory both move in
+    straight lines, so their offset is linear in time and its minimum has a
+    closed form; no sampling is involved.
+
+    Args:
+        times_a, times_b (ndarray): (..., K) waypoint times of the two trajectories of each pair.
+        points_a, points_b (ndarray): (..., K, D) their waypoints.
+
+    Returns:
+        ndarray: (...) smallest distance of each pair, the leading dimensions broadcast.
+    """
+    shape = np.broadcast_shapes(times_a.shape[:-1], times_b.shape[:-1])
+    at = np.sort(np.concatenate((np.broadcast_to(times_a, shape + times_a.shape[-1:]),
+                                 np.broadcast_to(times_b, shape + times_b.shape[-1:])), axis=-1), axis=-1)
+    offset = _interpolate(times_a, points_a, at) - _interpolate(times_b, points_b, at)
+    start, change = offset[..., :-1, :], np.diff(offset, axis=-2)
+    squared = (change ** 2).sum(axis=-1)
+    alpha = np.clip(np.divide(-(start * change).sum(axis=-1), squared, out=np.zeros_like(squared),
+                              where=squared > 0), 0, 1)
+    return np.linalg.norm(start + alpha[..., None] * change, axis=-1).min(axis=-1)
+
+
+class TransitionPlan:
+    """
+    Time-parameterized, deconflicted trajectories of a formation change.
+
+    Attributes:
+        times (ndarray): (N, KNOTS) waypoint times in seconds from the start of the transition.
+        waypoints (ndarray): (N, KNOTS, 3) local waypoint positions (x east, y north, z up).
+        delays (ndarray): (N,) departure delay of each drone at the top of its climb, in seconds.
+        layers (ndarray): (N,) cruise layer of each drone, -1 for the straight lines flown without layers.
+        detours (ndarray): (N,) lateral offset of the mid-course point in meters.
+        min_separation (float): Separation the plan guarantees.
+        clearance (float): Smallest distance between two drones over the plan.
+    """
+
+    def __init__(self, times, waypoints, delays, layers, detours, min_separation, clearance):
+        self.times = times
+        self.waypoints = waypoints
+        self.delays = delays
+        self.layers = layers
+        self.detours = detours
+        self.min_separation = min_separation
+        self.clearance = clearance
+
+    @property
+    def duration(self):
+        """Time at which the last drone reaches its target."""
+        return float(self.times[:, -1].max()) if len(self.times) else 0.0
+
+    def positions(self, t):
+        """(N, 3) positions of every drone t seconds after the start of the transition."""
+        return sample_trajectories(self.times, self.waypoints, [t])[:, 0]
+
+    def waypoint_sequence(self, index):
+        """List of (t, x, y, z) waypoints of one drone, without the repeated ones."""
+        sequence = []
+        for t, point in zip(self.times[index].tolist(), self.waypoints[index].tolist()):
+            if not sequence or sequence[-1][1:] != tuple(point):
+                sequence.append((t, *point))
+            else:
+                sequence[-1] = (t, *point)  # waiting at the same point: keep the departure time
+        return sequence
+
+    def as_dict(self):
+        return {
+            'drones': len(self.times),
+            'duration_s': self.duration,
+            'min_separation_m': self.min_separation,
+            'clearance_m': self.clearance,
+            'delayed': int((self.delays > 0).sum()),
+            'layers': int(self.layers.max()) + 1 if len(self.layers) else 0,
+            'detoured': int((self.detours != 0).sum()),
+        }
+
+    def __str__(self):
+        summary = self.as_dict()
+        return (f"transition of {summary['drones']} drones in {summary['duration_s']:.1f} s, clearance "
+                f"{summary['clearance_m']:.2f} m (min {self.min_separation:.2f} m): {summary['delayed']} delayed, "
+                f"{summary['detoured']} detoured, {summary['layers']} layers")
+
+
+class TransitionPlanner:
+    """
+    Plans formation changes that keep every pair of drones min_separation apart.
+
+    Every drone first flies a straight line to its target, all of them leaving
+    and arriving together. When the slots were assigned by minimum sum of
+    squared distances and both formations are spaced sqrt(2) * min_separation
+    or more, these lines never come closer than min_separation (Turpin, Michael
+    and Kumar, CAPT), which is checked in closed form and is the common case.
+
+    Otherwise the swarm flies in three phases: every drone climbs straight up
+    to a cruise layer, all of them reaching it together; they cruise to the
+    vertical of their targets, each in its layer; then they all start their
+    descent together. The layers are layer_spacing apart, so only the drones
+    of a layer can meet during the cruise, and vertical moves started or
+    ended together never cross as long as drones stacked above one another
+    keep their order, which the layers respect. The drones are given, longest
+    flight first, their cheapest cruise clear of the drones already placed in
+    the same layer: the synchronized straight line, or a full-speed flight with
+    a lateral detour and a departure delay, in the lowest layer possible. Every
+    check is the exact closest approach of piecewise-linear paths, computed
+    for batches of alternatives at once; a drone with no clear cruise in the
+    num_layers layers opens a layer above, up to max_layers layers below
+    max_altitude. A transition needing more, or drones stacked at their starts
+    in the opposite order at their targets, has no plan and raises
+    PlanningError instead of climbing without bound.
+
+    Args:
+        min_separation (float): Minimum distance between two drones in meters.
+        speed (float): Horizontal speed in m/s.
+        climb_rate (float): Vertical speed in m/s.
+        num_layers (int): Cruise layers used before opening more.
+        layer_spacing (float): Height between two layers, 2 * min_separation by default.
+        max_layers (int): Cruise layers a plan may use at most, num_layers by default; raise it
+            to let crowded transitions climb higher (a 500-drone swap can need about 20 layers).
+        max_altitude (float): Highest cruise altitude in the local frame, None for no limit.
+        max_delay (float): Longest departure delay in seconds.
+        delay_step (float): Delay increment in seconds.
+        detour_offsets (tuple): Lateral offsets of the mid-course point tried, in meters.
+    """
+
+    PAIR_CHUNK = 4096  # pairs compared at once when measuring the clearance of a plan
+    BATCH = 8  # cheapest cruise alternatives tried first, and first drones they are checked against
+
+    def __init__(self, min_separation=3.0, speed=5.0, climb_rate=2.0, num_layers=3, layer_spacing=None,
+                 max_delay=20.0, delay_step=1.0, detour_offsets=None, max_layers=None, max_altitude=None):
+        self.min_separation = min_separation
+        self.speed = speed
+        self.climb_rate = climb_rate
+        self.num_layers = num_layers
+        self.max_layers = max_layers or num_layers
+        self.max_altitude = max_altitude
+        self.layer_spacing = layer_spacing or 2 * min_separation
+        if self.layer_spacing < min_separation:
+            raise ValueError(f"Layer spacing {self.layer_spacing} m is below the minimum separation "
+                             f"{min_separation} m")
+        self.max_delay = max_delay
+        self.delay_step = delay_step
+        if detour_offsets is None:
+            detour_offsets = (2 * min_separation, -2 * min_separation, 4 * min_separation, -4 * min_separation)
+        self.detour_offsets = tuple(detour_offsets)
+
+    @classmethod
+    def from_config(cls, options):
+        return cls(min_separation=options.get('min_separation_m', 3.0),
+                   speed=options.get('speed_m_s', 5.0),
+                   climb_rate=options.get('climb_rate_m_s', 2.0),
+                   num_layers=options.get('layers', 3),
+                   layer_spacing=options.get('layer_spacing_m'),
+                   max_delay=options.get('max_delay_s', 20.0),
+                   delay_step=options.get('delay_step_s', 1.0),
+                   detour_offsets=options.get('detour_offsets_m'),
+                   max_layers=options.get('max_layers'),
+                   max_altitude=options.get('max_altitude_m'))
+
+    def _check_spacing(self, points, name):
+        """Smallest distance between two of the points, which must be min_separation apart."""
+        if len(points) < 2:
+            return float('inf')
+        distance = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2)
+        np.fill_diagonal(distance, np.inf)
+        i, j = np.unravel_index(distance.argmin(), distance.shape)
+        if distance[i, j] < self.min_separation:
+            raise PlanningError(f"{name} positions {i} and {j} are only {distance[i, j]:.2f} m apart "
+                                f"(minimum separation {self.min_separation} m)")
+        return float(distance[i, j])
+
+    def _straight_lines(self, starts, targets):
+        """Straight lines flown by every drone at once, all leaving and arriving at the same time."""
+        n = len(starts)
+        waypoints = np.empty((n, KNOTS, 3))
+        waypoints[:, :4] = starts[:, None]
+        waypoints[:, 4] = (starts + targets) / 2
+        waypoints[:, 5:] = targets[:, None]
+        duration = max(float(np.max(np.linalg.norm(targets[:, :2] - starts[:, :2], axis=1) / self.speed, initial=0)),
+                       float(np.max(np.abs(targets[:, 2] - starts[:, 2]) / self.climb_rate, initial=0)))
+        times = np.tile([0, 0, 0, 0, duration / 2, duration, duration, duration], (n, 1))
+        return times, waypoints
+
+    def _cruises(self, starts, targets):
+        """
+        Horizontal cruise alternatives of every drone, timed from the top of the climb.
+
+        Returns:
+            tuple: times (N, C, 4) and points (N, C, 4, 2) of the departure,
+            departure after the delay, mid-course point and end of cruise, and
+            the (detour, delay) arrays (C,) of the alternatives; alternative 0
+            is the straight line synchronized with the whole swarm.
+        """
+        detours, delays = np.meshgrid((0.0,) + self.detour_offsets,
+                                      np.arange(0.0, self.max_delay + 1e-9, self.delay_step), indexing='ij')
+        detours, delays = np.append(0.0, detours.ravel()), np.append(0.0, delays.ravel())
+        course = targets - starts
+        length = np.linalg.norm(course, axis=1)
+        normal = np.where(length[:, None] > 0, np.column_stack((-course[:, 1], course[:, 0])), (1.0, 0.0))
+        normal /= np.maximum(np.linalg.norm(normal, axis=1), 1e-12)[:, None]
+        middle = (starts + targets)[:, None] / 2 + normal[:, None] * detours[None, :, None]
+
+        n, c = len(starts), len(detours)
+        points = np.empty((n, c, 4, 2))
+        points[:, :, 0] = starts[:, None]
+        points[:, :, 1] = starts[:, None]
+        points[:, :, 2] = middle
+        points[:, :, 3] = targets[:, None]
+        legs = np.linalg.norm(np.diff(points[:, :, 1:], axis=2), axis=3) / self.speed
+        times = np.zeros((n, c, 4))
+        times[:, :, 1] = delays
+        times[:, :, 2:] = delays[None, :, None] + np.cumsum(legs, axis=2)
+        synchronized = length.max(initial=0) / self.speed
+        times[:, 0] = (0.0, 0.0, synchronized / 2, synchronized)
+        return times, points, (detours, delays)
+
+    def _stacking_order(self, starts, targets, priority):
+        """
+        Order in which the drones are placed: longest flight first, but a drone
+        stacked under another one (closer than min_separation horizontally, at
+        the start or at the target) always before it, as its layer must be lower.
+
+        Returns:
+            tuple: order (N,) and the list of the drones each one must be under.
+        """
+        n = len(starts)
+        below = [[] for _ in range(n)]
+        above = [[] for _ in range(n)]
+        for points in (starts, targets):
+            horizontal = np.linalg.norm(points[:, None, :2] - points[None, :, :2], axis=2)
+            for i, j in zip(*np.nonzero(np.triu(horizontal < self.min_separation, k=1))):
+                lower, upper = (i, j) if points[i, 2] < points[j, 2] else (j, i)
+                below[upper].append(lower)
+                above[lower].append(upper)
+        waiting = np.array([len(set(drones)) for drones in below])
+        ready = [(priority[i], i) for i in np.flatnonzero(waiting == 0).tolist()]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, i = heapq.heappop(ready)
+            order.append(i)
+            for j in set(above[i]):
+                waiting[j] -= 1
+                if not waiting[j]:
+                    heapq.heappush(ready, (priority[j], j))
+        if len(order) < n:
+            stuck = np.flatnonzero(waiting > 0)[:2].tolist()
+            raise PlanningError(f"Drones {stuck} are stacked in opposite orders at their starts and targets")
+        return order, [sorted(set(drones)) for drones in below]
+
+    def _clearance(self, times, waypoints):
+        """Exact smallest distance between two drones of a plan (inf below two drones)."""
+        low = waypoints.min(axis=1) - self.min_separation
+        high = waypoints.max(axis=1) + self.min_separation
+        overlap = np.all(low[:, None] <= high[None, :], axis=2) & np.all(high[:, None] >= low[None, :], axis=2)
+        first, second = np.nonzero(np.triu(overlap, k=1))
+        clearance = float('inf')
+        for start in range(0, len(first), self.PAIR_CHUNK):
+            a, b = first[start:start + self.PAIR_CHUNK], second[start:start + self.PAIR_CHUNK]
+            clearance = min(clearance, float(closest_approach(times[a], waypoints[a], times[b], waypoints[b]).min()))
+        return clearance
+
+    def plan(self, starts, targets):
+        """
+        Plan the transition of N drones from their current positions to their slots.
+
+        Args:
+            starts (array_like): (N, 3) current local positions.
+            targets (array_like): (N, 3) target local positions, in the same drone order.
+
+        Returns:
+            TransitionPlan
+
+        Raises:
+            PlanningError: Two starts or two targets are closer than the minimum
+                separation, drones stacked at their starts are stacked in the
+                opposite order at their targets, or the plan needs more layers
+                than max_layers and max_altitude allow.
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 3)
+        n = len(starts)
+        if np.isnan(starts).any():
+            raise PlanningError("Missing start position (no telemetry yet)")
+        self._check_spacing(starts, 'Start')
+        self._check_spacing(targets, 'Target')
+
+        # synchronized straight lines: the distance between two drones is then a
+        # quadratic function of time, so their clearance has a closed form
+        offset = starts[:, None] - starts[None, :]
+        change = (targets[:, None] - targets[None, :]) - offset
+        squared = (change ** 2).sum(axis=2)
+        alpha = np.clip(np.divide(-(offset * change).sum(axis=2), squared, out=np.zeros_like(squared),
+                                  where=squared > 0), 0, 1)
+        distance = np.linalg.norm(offset + alpha[..., None] * change, axis=2)
+        np.fill_diagonal(distance, np.inf)
+        clearance = float(distance.min()) if n > 1 else float('inf')
+        if clearance >= self.min_separation:
+            times, waypoints = self._straight_lines(starts, targets)
+            plan = TransitionPlan(times, waypoints, np.zeros(n), np.full(n, -1), np.zeros(n),
+                                  self.min_separation, clearance)
+            log.info("%s", plan)
+            return plan
+
+        plan = self._layered(starts, targets)
+        log.info("%s", plan)
+        return plan
+
+    def _layer_limit(self, starts, targets):
+        """Number of cruise layers allowed by max_layers and max_altitude, and the text of that limit."""
+        limit, reasons = self.max_layers, [f"max_layers {self.max_layers}"]
+        if self.max_altitude is not None:
+            base = max(starts[:, 2].max(), targets[:, 2].max())
+            limit = min(limit, int(np.floor((self.max_altitude - base) / self.layer_spacing + 1e-9)) + 1)
+            reasons.append(f"max_altitude {self.max_altitude} m")
+        return limit, ', '.join(reasons)
+
+    def _layered(self, starts, targets):
+        """Climb, cruise in layers, descend (see the class documentation)."""
+        n = len(starts)
+        limit, reasons = self._layer_limit(starts, targets)
+        cruise_times, cruise_points, (detours, delays) = self._cruises(starts[:, :2], targets[:, :2])
+        arrival = cruise_times[:, :, -1]
+        # extra time spent climbing to a layer and descending from it
+        layer_cost = 2 * self.layer_spacing / self.climb_rate
+        ranked = np.argsort(arrival, axis=1, kind='stable')
+        priority = np.empty(n, dtype=int)
+        priority[np.argsort(-np.linalg.norm(targets - starts, axis=1), kind='stable')] = np.arange(n)
+        order, below = self._stacking_order(starts, targets, priority)
+
+        # horizontal box of all the alternatives of each drone, grown by min_separation, and of the chosen cruise
+        options_low = cruise_points.min(axis=(1, 2)) - self.min_separation
+        options_high = cruise_points.max(axis=(1, 2)) + self.min_separation
+        chosen = np.zeros(n, dtype=int)
+        layer = np.full(n, -1)
+        chosen_low = np.full((n, 2), np.inf)
+        chosen_high = np.full((n, 2), -np.inf)
+        for i in order:
+            lowest = max((layer[j] + 1 for j in below[i]), default=0)
+            if lowest >= limit:
+                raise PlanningError(f"Drone {i} is stacked above drones in the top layer allowed "
+                                    f"({max(limit, 0)} layers, {reasons})")
+            # below the limit, an empty layer always exists at the top
+            top = min(max(self.num_layers - 1, layer.max() + 1, lowest), limit - 1)
+            others = np.flatnonzero(np.all(chosen_low <= options_high[i], axis=1)
+                                    & np.all(chosen_high >= options_low[i], axis=1))
+            others = others[layer[others] >= lowest]
+            paths = cruise_times[others, chosen[others]], cruise_points[others, chosen[others]]
+
+            # the synchronized straight line when it fits in the lowest layer
+            rivals = layer[others] == lowest
+            closest = closest_approach(cruise_times[i, 0], cruise_points[i, 0], paths[0][rivals], paths[1][rivals])
+            option, level = 0, lowest
+            if (closest < self.min_separation).any():
+                # otherwise the cheapest alternative clear of its layer, going up
+                # while a higher layer can still be cheaper; the cheapest
+                # alternatives are tried before the others, and checked against
+                # the drones of the layer in growing batches, so that blocked
+                # ones are dropped before they are compared with the next drones
+                best, level = np.inf, None
+                for candidate in range(lowest, top + 1):
+                    cheaper = ranked[i][arrival[i, ranked[i]] + layer_cost * candidate < best]
+                    if not len(cheaper):
+                        break
+                    rivals = np.flatnonzero(layer[others] == candidate)
+                    for options in (cheaper[:self.BATCH], cheaper[self.BATCH:]):
+                        first, size = 0, self.BATCH
+                        while len(options) and first < len(rivals):
+                            rival = rivals[first:first + size]
+                            closest = closest_approach(cruise_times[i, options][:, None],
+                                                       cruise_points[i, options][:, None],
+                                                       paths[0][rival][None], paths[1][rival][None])
+                            options = options[~(closest < self.min_separation).any(axis=1)]
+                            first, size = first + size, 2 * size
+                        if len(options):
+                            option, level = int(options[0]), candidate
+                            best = arrival[i, option] + layer_cost * candidate
+                            break
+                if level is None:
+                    raise PlanningError(f"No cruise of drone {i} clears the other drones in the "
+                                        f"{limit} layers allowed ({reasons})")
+            chosen[i] = option
+            layer[i] = level
+            chosen_low[i] = cruise_points[i, option].min(axis=0)
+            chosen_high[i] = cruise_points[i, option].max(axis=0)
+
+        if layer.max() >= self.num_layers:
+            log.info("Transition uses %s cruise layers, more than the %s preferred", layer.max() + 1,
+                     self.num_layers)
+        index = np.arange(n)
+        cruise_times = cruise_times[index, chosen]
+        cruise_points = cruise_points[index, chosen]
+        altitude = max(starts[:, 2].max(), targets[:, 2].max()) + layer * self.layer_spacing
+        climb_end = float((altitude - starts[:, 2]).max()) / self.climb_rate
+        descent_start = climb_end + float(cruise_times[:, -1].max())
+
+        times = np.empty((n, KNOTS))
+        waypoints = np.empty((n, KNOTS, 3))
+        times[:, 0] = 0.0
+        times[:, 1] = climb_end - (altitude - starts[:, 2]) / self.climb_rate
+        times[:, 2:6] = climb_end + cruise_times
+        times[:, 6] = descent_start
+        times[:, 7] = descent_start + (altitude - targets[:, 2]) / self.climb_rate
+        waypoints[:, :2] = starts[:, None]
+        waypoints[:, 2:6, :2] = cruise_points
+        waypoints[:, 2:7, 2] = altitude[:, None]
+        waypoints[:, 6, :2] = targets[:, :2]
+        waypoints[:, 7] = targets
+
+        clearance = self._clearance(times, waypoints)
+        if clearance < self.min_separation - 1e-6:
+            raise PlanningError(f"Planned transition only keeps {clearance:.2f} m between two drones "
+                                f"(minimum separation {self.min_separation} m)")
+        return TransitionPlan(times, waypoints, delays[chosen], layer, detours[chosen], self.min_separation,
+                              clearance)